@@ -0,0 +1,68 @@
+"""
+Benchmarks the time `import tradester` takes in a fresh interpreter (python -X importtime) and fails when it is
+over budget, or when a module that should only be imported on first use (numba, matplotlib, sqlalchemy, tqdm,
+pyarrow) is imported with tradester. numba is imported and the kernels compiled by the first call of a
+lazy_jit function, or ahead of time by `python -m tradester.utils.compilation`.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 10 --budget-ms 600 --top 15
+"""
+import subprocess
+import argparse
+import sys
+import re
+
+
+DEFERRED = ['numba', 'matplotlib', 'sqlalchemy', 'tqdm', 'pyarrow', 'psycopg2']
+LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(module = 'tradester'):
+    """
+    returns {module : cumulative microseconds} of one `import module` in a fresh interpreter, and the top level
+    modules it left in sys.modules (importtime also lists the imports that failed)
+    """
+    code = f'import {module}, sys; print(" ".join(sys.modules))'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output = True, text = True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    loaded = set([name.split('.')[0] for name in result.stdout.split()])
+    return times, loaded
+
+
+def run(runs, budget_ms, top):
+    samples = [measure() for _ in range(runs)]
+    totals = sorted([s['tradester'] / 1000 for s, _ in samples])
+    median = totals[len(totals) // 2]
+    print(f'import tradester: median {median:.0f}ms  min {totals[0]:.0f}ms  max {totals[-1]:.0f}ms  ({runs} runs, budget {budget_ms:.0f}ms)')
+
+    last, loaded = samples[-1]
+    roots = {}
+    for name, us in last.items():
+        root = name.split('.')[0]
+        roots[root] = max(roots.get(root, 0), us)
+    print('slowest top level imports:')
+    for name, us in sorted(roots.items(), key = lambda x: -x[1])[:top]:
+        print(f'    {name:<24}{us / 1000:>8.1f}ms')
+
+    deferred = [m for m in DEFERRED if m in loaded]
+    if len(deferred) > 0:
+        print(f'imported with tradester, should be deferred to first use: {deferred}')
+    over = median > budget_ms
+    if over:
+        print(f'over budget by {median - budget_ms:.0f}ms')
+    return 1 if over or len(deferred) > 0 else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type = int, default = 5)
+    parser.add_argument('--budget-ms', type = float, default = 750)
+    parser.add_argument('--top', type = int, default = 10)
+    args = parser.parse_args()
+    sys.exit(run(args.runs, args.budget_ms, args.top))
@@ -25,7 +25,7 @@ class ATR(Indicator):
         hc = abs(high[1:] - pC)
         lc = abs(low[1:] - pC)
         hl = high[1:] - low[1:]
-        tr = np.maximum(hl, hc, lc)
+        tr = np.maximum(np.maximum(hl, hc), lc)
 
         return get_mean(tr, self.period)
 
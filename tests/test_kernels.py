@@ -0,0 +1,208 @@
+"""
+Compares every full series kernel and every single step kernel of tradester.utils.kernels with pandas, on
+series with NaN gaps, runs of equal values (ties) and a constant stretch.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradester.utils.kernels import (
+    rolling_sum, rolling_mean, rolling_var, rolling_std, rolling_min, rolling_max, rolling_rank, rolling_slope,
+    rolling_cov, rolling_corr, rolling_moments, bollinger, ewma, ewm_var, ewm_std, true_range, atr, rsi,
+    cross_rank, RollingKernel, RollingPairKernel, EWMKernel, ATRKernel, RSIKernel,
+)
+from tradester.utils.series import rolling_mean_std, rolling_min_max
+
+
+T, N, WINDOW, MIN_PERIODS = 400, 4, 20, 5
+
+
+def _series(seed, gaps = True):
+    rng = np.random.default_rng(seed)
+    x = 100 + np.round(rng.standard_normal((T, N)).cumsum(axis = 0), 1)
+    x[60:75, 1] = x[60, 1]
+    x[:, 2] = np.round(x[:, 2])
+    if gaps:
+        x[rng.random((T, N)) < 0.08] = np.nan
+        x[120:135, 3] = np.nan
+    return x
+
+
+@pytest.fixture(scope = 'module')
+def data():
+    x = _series(0)
+    y = 0.5 * x + _series(1)
+    rng = np.random.default_rng(2)
+    high = x + np.abs(rng.standard_normal((T, N)))
+    low = x - np.abs(rng.standard_normal((T, N)))
+    return {'x': x, 'y': y, 'high': high, 'low': low, 'close': x, 'dense': _series(3, gaps = False)}
+
+
+def _close(a, b, tol = 1e-8):
+    np.testing.assert_allclose(a, b, rtol = tol, atol = tol, equal_nan = True)
+
+
+def _true_range(high, low, close):
+    high, low, close = pd.DataFrame(high), pd.DataFrame(low), pd.DataFrame(close)
+    previous = close.shift()
+    return pd.concat([high - low, (high - previous).abs(), (low - previous).abs()]).groupby(level = 0).max()
+
+
+def _rsi(close, window):
+    change = pd.DataFrame(close).diff()
+    gain = change.clip(lower = 0).ewm(alpha = 1 / window, adjust = False, min_periods = window).mean()
+    loss = (-change.clip(upper = 0)).ewm(alpha = 1 / window, adjust = False, min_periods = window).mean()
+    return (100 - 100 / (1 + gain / loss)).values
+
+
+@pytest.mark.parametrize('name, kernel', [
+    ('sum', rolling_sum), ('mean', rolling_mean), ('var', rolling_var), ('std', rolling_std),
+    ('min', rolling_min), ('max', rolling_max), ('rank', rolling_rank),
+])
+@pytest.mark.parametrize('min_periods', [None, MIN_PERIODS])
+def test_rolling(data, name, kernel, min_periods):
+    expected = getattr(pd.DataFrame(data['x']).rolling(WINDOW, min_periods = min_periods), name)().values
+    _close(kernel(data['x'], WINDOW, min_periods), expected)
+
+
+def test_rolling_ddof(data):
+    rolling = pd.DataFrame(data['x']).rolling(WINDOW, min_periods = MIN_PERIODS)
+    _close(rolling_var(data['x'], WINDOW, MIN_PERIODS, ddof = 0), rolling.var(ddof = 0).values)
+    _close(rolling_std(data['x'], WINDOW, MIN_PERIODS, ddof = 0), rolling.std(ddof = 0).values)
+
+
+def test_rolling_series(data):
+    x = data['x'][:, 0]
+    _close(rolling_mean(x, WINDOW), pd.Series(x).rolling(WINDOW).mean().values)
+    _close(rolling_rank(x, WINDOW, MIN_PERIODS), pd.Series(x).rolling(WINDOW, min_periods = MIN_PERIODS).rank().values)
+
+
+def test_rolling_moments(data):
+    rolling = pd.DataFrame(data['x']).rolling(WINDOW, min_periods = MIN_PERIODS)
+    total, mean, std = rolling_moments(data['x'], WINDOW, ['sum', 'mean', 'std'], min_periods = MIN_PERIODS)
+    _close(total, rolling.sum().values)
+    _close(mean, rolling.mean().values)
+    _close(std, rolling.std().values)
+
+
+def test_rolling_slope(data):
+    x = data['dense']
+    expected = pd.DataFrame(x).rolling(WINDOW).apply(lambda v: np.polyfit(np.arange(WINDOW), v, 1)[0], raw = True)
+    _close(rolling_slope(x, WINDOW), expected.values, 1e-6)
+
+
+def test_rolling_cov_corr(data):
+    x, y = pd.DataFrame(data['x']), pd.DataFrame(data['y'])
+    _close(rolling_cov(data['x'], data['y'], WINDOW, MIN_PERIODS), x.rolling(WINDOW, min_periods = MIN_PERIODS).cov(y).values)
+    _close(rolling_corr(data['x'], data['y'], WINDOW, MIN_PERIODS), x.rolling(WINDOW, min_periods = MIN_PERIODS).corr(y).values, 1e-6)
+
+
+def test_bollinger(data):
+    rolling = pd.DataFrame(data['x']).rolling(WINDOW)
+    middle, upper, lower = bollinger(data['x'], WINDOW, k = 2)
+    _close(middle, rolling.mean().values)
+    _close(upper, (rolling.mean() + 2 * rolling.std()).values)
+    _close(lower, (rolling.mean() - 2 * rolling.std()).values)
+
+
+@pytest.mark.parametrize('adjust', [True, False])
+@pytest.mark.parametrize('ignore_na', [True, False])
+def test_ewm(data, adjust, ignore_na):
+    ewm = pd.DataFrame(data['x']).ewm(span = 10, adjust = adjust, ignore_na = ignore_na, min_periods = MIN_PERIODS)
+    options = {'span': 10, 'adjust': adjust, 'ignore_na': ignore_na, 'min_periods': MIN_PERIODS}
+    _close(ewma(data['x'], **options), ewm.mean().values)
+    _close(ewm_var(data['x'], **options), ewm.var().values)
+    _close(ewm_std(data['x'], **options), ewm.std().values)
+    _close(ewm_var(data['x'], bias = True, **options), ewm.var(bias = True).values)
+
+
+def test_true_range_atr(data):
+    tr = _true_range(data['high'], data['low'], data['close'])
+    _close(true_range(data['high'], data['low'], data['close']), tr.values)
+    _close(atr(data['high'], data['low'], data['close'], 14), tr.ewm(alpha = 1 / 14, adjust = False, min_periods = 14).mean().values)
+
+
+@pytest.mark.parametrize('series', ['x', 'dense'])
+def test_rsi(data, series):
+    _close(rsi(data[series], 14), _rsi(data[series], 14))
+
+
+def test_cross_rank(data):
+    _close(cross_rank(data['x']), pd.DataFrame(data['x']).rank(axis = 1).values)
+
+
+def test_rolling_kernel(data):
+    x = data['x']
+    kernel = RollingKernel(WINDOW, N, min_periods = MIN_PERIODS)
+    rolling = pd.DataFrame(x).rolling(WINDOW, min_periods = MIN_PERIODS)
+    expected = {name: getattr(rolling, name)().values for name in ['sum', 'mean', 'var', 'std', 'min', 'max', 'rank']}
+    for i in range(T):
+        kernel.push(x[i])
+        for name, values in expected.items():
+            _close(getattr(kernel, name), values[i])
+
+
+def test_rolling_kernel_late_rank(data):
+    # the sorted windows are built the first time rank is read
+    x = data['x']
+    kernel = RollingKernel(WINDOW, N, min_periods = MIN_PERIODS)
+    expected = pd.DataFrame(x).rolling(WINDOW, min_periods = MIN_PERIODS).rank().values
+    for i in range(T):
+        kernel.push(x[i])
+        if i >= 150:
+            _close(kernel.rank, expected[i])
+
+
+def test_rolling_kernel_slope(data):
+    x = data['dense']
+    kernel = RollingKernel(WINDOW, N)
+    expected = rolling_slope(x, WINDOW)
+    for i in range(T):
+        kernel.push(x[i])
+        _close(kernel.slope, expected[i])
+
+
+def test_rolling_pair_kernel(data):
+    x, y = pd.DataFrame(data['x']), pd.DataFrame(data['y'])
+    kernel = RollingPairKernel(WINDOW, N, MIN_PERIODS)
+    cov = x.rolling(WINDOW, min_periods = MIN_PERIODS).cov(y).values
+    corr = x.rolling(WINDOW, min_periods = MIN_PERIODS).corr(y).values
+    for i in range(T):
+        kernel.push(data['x'][i], data['y'][i])
+        _close(kernel.cov, cov[i])
+        _close(kernel.corr, corr[i], 1e-6)
+
+
+def test_ewm_kernel(data):
+    ewm = pd.DataFrame(data['x']).ewm(span = 10, min_periods = MIN_PERIODS)
+    mean, std = ewm.mean().values, ewm.std().values
+    kernel = EWMKernel(N, span = 10, min_periods = MIN_PERIODS)
+    for i in range(T):
+        kernel.push(data['x'][i])
+        _close(kernel.mean, mean[i])
+        _close(kernel.std, std[i])
+
+
+def test_atr_rsi_kernels(data):
+    tr = _true_range(data['high'], data['low'], data['close'])
+    expected_atr = tr.ewm(alpha = 1 / 14, adjust = False, min_periods = 14).mean().values
+    expected_rsi = _rsi(data['x'], 14)
+    atr_kernel, rsi_kernel = ATRKernel(14, N), RSIKernel(14, N)
+    for i in range(T):
+        atr_kernel.push(data['high'][i], data['low'][i], data['close'][i])
+        rsi_kernel.push(data['x'][i])
+        _close(atr_kernel.atr, expected_atr[i])
+        _close(rsi_kernel.rsi, expected_rsi[i])
+
+
+@pytest.mark.parametrize('p', [0, 1, 3, WINDOW])
+def test_series_rolling(data, p):
+    s = data['dense'][:, 1]
+    rolling = pd.Series(s).rolling(p if p > 0 else len(s), min_periods = 1)
+    total, mean, std = rolling_mean_std(s, p)
+    _close(total, rolling.sum().values)
+    _close(mean, rolling.mean().values)
+    _close(std, rolling.std(ddof = 0).values)
+    mins, maxs = rolling_min_max(s, p)
+    _close(mins, rolling.min().values)
+    _close(maxs, rolling.max().values)
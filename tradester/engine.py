@@ -1,11 +1,11 @@
-from tradester.finance.factories import SecuritiesFactory, FuturesFactory, ClockManager, Worker
+from tradester.finance.factories import SecuritiesFactory, FuturesFactory, StreamingFactory, ClockManager, DEFAULT_MANAGER
+from tradester.finance.assets import ActivationQueue
+from tradester.feeds.static import FuturesTS, SecuritiesTS
 
 from .portfolio import Portfolio
-from .metrics import Metrics
+from .metrics import Metrics, OnlineMetrics
 from .oms import OMS
 
-from tqdm import tqdm as tqdmr
-
 import pandas as pd
 import time
 
@@ -27,7 +27,29 @@ class Engine():
     end_date : string (YYYY-MM-DD)
         date at which to end trading
     bulk_load : boolean
-        bulk load the data (or not if False)
+        bulk load the data, if False the bars are streamed one stream_window at a time (see StreamingFactory)
+    stream_window : str
+        pandas frequency of the windows streamed when bulk_load is False, 'MS' loads a month at a time
+    cache : int
+        if not None, every price Stream keeps only the last cache bars (must cover adv_period and any indicator lookback)
+    columnar : boolean
+        hold the bulk loaded data in a ColumnarStore per universe rather than one Worker per contract
+    load_processes : int
+        number of processes bulk loading each universe (see ParallelLoader)
+    load_threads : int
+        number of concurrent queries when load_processes is 1 (see PrefetchPipeline)
+    bar_store : str
+        if not None, root directory of the memory-mapped bar stores to load (bulk or streamed) from instead of the database (see BarStore)
+    array_clock : boolean
+        run the ClockManager over a datetime64 array with an integer cursor (see ClockManager)
+    batch_orders : boolean
+        price all single sided orders on the book in one vectorized pass (see OMS)
+    record_holdings : boolean
+        record every open position on each bar, if False only values and the trading log are kept (see Portfolio)
+    spill_dir : str
+        if not None, directory the portfolio recorders spill to as .npy chunks (see Recorder)
+    online_metrics : boolean
+        update Sharpe, Sortino, drawdown and Calmar after every reconcile (see OnlineMetrics)
     adv_participation : float
         see OMS
     adv_period : int
@@ -41,8 +63,10 @@ class Engine():
     
     Attributes
     ----------
-    manager : tradester.factories.Worker.manager
-        the central manager for all Workers, construction method exploits memory management of python
+    manager : tradester.finance.factories.ClockManager
+        the central manager for all Workers, DEFAULT_MANAGER
+    activations : tradester.finance.assets.ActivationQueue
+        flips the tradeable flag of the assets of every universe when they start or stop trading
     universes : dict
         dictionary of all tradeable universes, format : {'name' : tradester.finance.Universe, ... }
     feed_factories : dict
@@ -53,6 +77,8 @@ class Engine():
         central order management system
     metrics : tradester.Metrics
         class for metrics
+    online_metrics : tradester.OnlineMetrics, None
+        running portfolio statistics if online_metrics is True
     strategy : tradester.strategy.Strategy
         user-defined strategy
 
@@ -71,6 +97,7 @@ class Engine():
             start_date = None, 
             end_date = None, 
             bulk_load = True, 
+            stream_window = 'MS',
             cache = None, 
             adv_participation = .1, 
             adv_period = 21, 
@@ -78,11 +105,25 @@ class Engine():
             progress_bar = True, 
             print_trades = False, 
             fee_structure = None,
+            columnar = False,
+            load_processes = 4,
+            load_threads = 4,
+            bar_store = None,
+            array_clock = False,
+            batch_orders = False,
+            record_holdings = True,
+            spill_dir = None,
+            online_metrics = False,
             ):
         self.starting_cash = starting_cash
         self.start_date = start_date
         self.end_date = end_date
         self.bulk_load = bulk_load
+        self.stream_window = stream_window
+        self.columnar = columnar
+        self.load_processes = load_processes
+        self.load_threads = load_threads
+        self.bar_store = bar_store
         self.cache = cache
         self.adv_participation = adv_participation
         self.adv_period = adv_period
@@ -90,12 +131,15 @@ class Engine():
         self.progress_bar = progress_bar if print_trades == False else False
         self.print_trades = print_trades
 
-        self.manager = Worker(None).manager
+        self.manager = DEFAULT_MANAGER
+        self.manager.array_backed = array_clock
         self.universes = {} 
         self.feed_factories = {}
-        self.portfolio = Portfolio(starting_cash, print_trades = print_trades)
-        self.oms = OMS(adv_participation = adv_participation, adv_period = adv_period, adv_oi = adv_oi, fee_structure=fee_structure)
+        self.activations = ActivationQueue(self.manager)
+        self.portfolio = Portfolio(starting_cash, print_trades = print_trades, record_holdings = record_holdings, spill_dir = spill_dir)
+        self.oms = OMS(adv_participation = adv_participation, adv_period = adv_period, adv_oi = adv_oi, fee_structure=fee_structure, batch = batch_orders)
         self.metrics = Metrics(self.portfolio, self.oms, start_date, end_date)
+        self.online_metrics = OnlineMetrics() if online_metrics else None
         self.strategy = None
 
 
@@ -106,6 +150,11 @@ class Engine():
         for universe in self.universes.values():
             name = universe.name
             universe.set_manager(self.manager)
+            self.activations.register(name, universe.assets.values())
+            universe.set_activations(self.activations)
+            if self.cache is not None:
+                for stream in universe.streams.values():
+                    stream.set_cache(self.cache)
             
             if self.bulk_load:
                 print('Bulk loading tradeable securities and futures')
@@ -114,17 +163,42 @@ class Engine():
                                list(universe.assets.keys()),
                                start_date = self.start_date,
                                end_date = self.end_date,
-                               cache = self.cache
+                               cache = self.cache,
+                               columnar = self.columnar,
+                               processes = self.load_processes,
+                               threads = self.load_threads,
+                               bar_store = self.bar_store,
                             )
                 elif universe.id_type == 'SEC':
                     self.feed_factories[name] = SecuritiesFactory(
                                 list(universe.assets.keys()),
                                 start_date = self.start_date,
                                 end_date = self.end_date,
-                                cache = self.cache
+                                cache = self.cache,
+                                columnar = self.columnar,
+                                processes = self.load_processes,
+                                threads = self.load_threads,
+                                bar_store = self.bar_store,
                             )
-                self.feed_factories[name].set_streams(universe.streams)
-                master_feed_range +=  self.feed_factories[name].feed_range
+            else:
+                print('Streaming tradeable securities and futures')
+                if universe.id_type == 'FUT':
+                    feed, fields = FuturesTS, ['open', 'high', 'low', 'close', 'volume', 'open_interest']
+                elif universe.id_type == 'SEC':
+                    feed, fields = SecuritiesTS, ['open', 'high', 'low', 'close', 'volume']
+                self.feed_factories[name] = StreamingFactory(
+                            feed,
+                            fields,
+                            list(universe.assets.keys()),
+                            start_date = self.start_date,
+                            end_date = self.end_date,
+                            window = self.stream_window,
+                            threads = self.load_threads,
+                            manager = self.manager,
+                            bar_store = self.bar_store,
+                        )
+            self.feed_factories[name].set_streams(universe.streams)
+            master_feed_range +=  self.feed_factories[name].feed_range
 
         self.portfolio._connect(self.manager)
         self.oms._connect(self.manager, self.portfolio)
@@ -136,7 +210,7 @@ class Engine():
 
     def set_strategy(self, strategy):
         self.strategy = strategy
-        self.strategy._connect(self.manager, self.oms, self.portfolio)
+        self.strategy._connect(self.manager, self.oms, self.portfolio, sources = list(self.feed_factories.values()))
         self.strategy.initialize()
     
     def run(self, fast_forward = False, metrics = True):
@@ -147,6 +221,7 @@ class Engine():
         start = time.time()
 
         if self.progress_bar:
+            from tqdm import tqdm as tqdmr
             pbar = tqdmr(total = len(self.manager.calendar), ascii = True)
 
         while cont:
@@ -161,18 +236,25 @@ class Engine():
                 for _, factory in list(self.feed_factories.items()):
                     factory.check_all()
 
+                deltas = self.activations.update()
+                incremental = self.activations.incremental
                 active_assets = []
                 inactive_assets = []
                 for name, universe in list(self.universes.items()):
                     universe.refresh()
                     tradeable = universe.tradeable
-                    self.feed_factories[name].set_active(tradeable)
+                    if incremental:
+                        self.feed_factories[name].activate(*deltas[name])
+                    else:
+                        self.feed_factories[name].set_active(tradeable)
                     for asset in tradeable + universe.active_list:
                         active_assets.append(asset)
                     inactive_assets.extend(universe.inactive_list)
                 active_assets = list(set(active_assets)) 
                 self.oms.process()
                 self.portfolio.reconcile()
+                if self.online_metrics is not None:
+                    self.online_metrics.update(self.portfolio.value)
 
                 self.strategy.indicators.set_inactive(inactive_assets)
                 self.strategy.refresh(active_assets)
@@ -192,6 +274,9 @@ class Engine():
                 pbar.update(1)
         if self.progress_bar:
             pbar.close()
+        for factory in self.feed_factories.values():
+            if isinstance(factory, StreamingFactory):
+                factory.close()
         print('Total Time:', round((time.time() - start)/60, 2), 'minutes')
 
         if metrics:
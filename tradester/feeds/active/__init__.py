@@ -1,3 +1,4 @@
 from .price import *
 from .stream import *
 from .indicator import *
+from .panel import *
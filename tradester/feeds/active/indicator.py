@@ -1,6 +1,9 @@
 from tradester.finance.assets import Future, Security
+from tradester.utils.rolling import RollingMoments, RollingExtrema, ExponentialAverage
 from .stream import Stream
 
+import numpy as np
+
 
 class Indicator():
     
@@ -14,6 +17,8 @@ class Indicator():
             setattr(self, i, Stream(None))
             if normalizer is not None:
                 setattr(self, f'{i}_helper', Stream(None))
+                if getattr(normalizer, 'stateful', False):
+                    setattr(self, f'{i}_normalizer', normalizer.spawn())
     
     @property
     def pointer(self):
@@ -43,39 +48,227 @@ class Indicator():
     @property
     def should_refresh(self):
         should_refresh = True
-        if isinstance(self.data, (Future, Security)) or isinstance(self.data, list) and isinstance(self.data[0], (Future, Security)):
+        if isinstance(self.data, (Future, Security)):
             should_refresh = self.data.tradeable
+        elif isinstance(self.data, list) and len(self.data) > 0 and isinstance(self.data[0], (Future, Security)):
+            should_refresh = all([d.tradeable for d in self.data])
         return should_refresh
 
+    def _normalize(self, attribute, v):
+        helper = getattr(self, attribute+'_helper')
+        helper.push(v)
+        if getattr(self.normalizer, 'stateful', False):
+            return getattr(self, attribute+'_normalizer').update(v)
+        return self.normalizer.normalize(helper.ts)
+
     def refresh(self):
         if self.override or self.should_refresh:
             if len(self.attributes) == 1:
                 if self.normalizer is None:
                     getattr(self, self.attributes[0]).push(self.calculate())
                 else:
-                    getattr(self, self.attributes[0]+'_helper').push(self.calculate())
-                    getattr(self, self.attributes[0]).push(
-                            self.normalizer.normalize(
-                                getattr(self, self.attributes[0]+'_helper').ts
-                                )
-                            )
+                    getattr(self, self.attributes[0]).push(self._normalize(self.attributes[0], self.calculate()))
             else:
                 for a, v in list(self.calculate().items()):
                     if self.normalizer is None:
                         getattr(self, a).push(v)
                     else:
-                        getattr(self, a+'_helper').push(self.calculate())
-                        getattr(self, a).push(
-                                self.normalizer.normalize(
-                                    getattr(self, a+'_helper').ts
-                                    )
-                                )
+                        getattr(self, a).push(self._normalize(a, v))
             self._pointer += 1
     
     def calculate(self):
         raise NotImplementedError("For each active indicator, you must implement a calculate(self, data) method")
 
 
+class IncrementalIndicator(Indicator):
+    """
+    An IncrementalIndicator keeps its own rolling state and is updated with one bar at a time instead of
+    recomputing over the full price history on every refresh. Subclasses implement update(bar), which is only
+    called when a new bar has been pushed onto the asset's price stream, so refreshing twice without new data
+    does not double count a bar. Bars missed between refreshes are replayed in order, every attribute aligned
+    with field on the clock of a timed price stream, otherwise on push count: an attribute that skipped a NaN
+    while field did not (or the other way around) is None in the replayed bars rather than taken from another
+    bar.
+
+    ...
+
+    Parameters
+    ----------
+    data : tradester.finance.Asset
+        asset whose price stream feeds the indicator
+    normalizer : tradester.utils.Normalizer, optional
+        see Indicator
+    attributes : list, optional
+        see Indicator
+    override : boolean, optional
+        see Indicator
+    field : String, optional (default : 'close')
+        the price attribute used to detect a new bar
+
+    Attributes
+    ----------
+    bar : Dictionary
+        the most recent bar of the asset's price stream
+
+    Methods
+    -------
+    update(bar : Dictionary)
+        consumes one new bar and returns the indicator value (or a dictionary for multiple attributes)
+    """
+
+    def __init__(self, data, normalizer = None, attributes = ['_indicator'], override = False, field = 'close'):
+        super().__init__(data, normalizer = normalizer, attributes = attributes, override = override)
+        self.field = field
+        self._seen = 0
+        self._seen_attributes = {}
+        self._last = 0
+
+    @property
+    def bar(self):
+        return self.data.price_stream.v
+
+    def _missed_bars(self, price, missed):
+        streams = {a: getattr(price, a) for a in price.attributes}
+        pushed = {a: s.pointer - self._seen_attributes.get(a, 0) for a, s in streams.items()}
+        if missed == 1 and all(n == 1 for n in pushed.values()):
+            if not price.timed or len({s.clock[-1] for s in streams.values() if len(s.clock) > 0}) == 1:
+                return [price.v]
+
+        columns = {}
+        if price.timed:
+            clock = streams[self.field].window(missed)[1]
+            for a, s in streams.items():
+                values, times = s.window(pushed[a])
+                i = np.searchsorted(times, clock)
+                found = i < len(times)
+                found[found] = times[i[found]] == clock[found]
+                columns[a] = [values[j] if f else None for j, f in zip(i, found)]
+            missed = len(clock)
+        else:
+            for a, s in streams.items():
+                ts = s.ts
+                columns[a] = [ts[-back] if pushed[a] == missed and len(ts) >= back else None for back in range(missed, 0, -1)]
+        return [{a: columns[a][k] for a in streams} for k in range(missed)]
+
+    def calculate(self):
+        price = self.data.price_stream
+        pointer = getattr(price, self.field).pointer
+        missed = pointer - self._seen
+        if missed > 0:
+            for bar in self._missed_bars(price, missed):
+                self._last = self.update(bar)
+        self._seen = pointer
+        self._seen_attributes = {a: getattr(price, a).pointer for a in price.attributes}
+        return self._last
+
+    def update(self, bar):
+        raise NotImplementedError("For each incremental indicator, you must implement an update(self, bar) method")
+
+
+class StreamingSMA(IncrementalIndicator):
+    """Rolling mean of field over the last period bars, same as get_mean(field.ts, period)"""
+
+    def __init__(self, data, period, field = 'close', normalizer = None):
+        super().__init__(data, normalizer = normalizer, field = field)
+        self.period = period
+        self._moments = RollingMoments(period)
+
+    def update(self, bar):
+        self._moments.push(bar[self.field])
+        return self._moments.mean
+
+
+class StreamingEMA(IncrementalIndicator):
+    """Exponential moving average of field, same as vectorized_ema(field.ts, period)[-1]"""
+
+    def __init__(self, data, period, field = 'close', normalizer = None):
+        super().__init__(data, normalizer = normalizer, field = field)
+        self.period = period
+        self._ema = ExponentialAverage(period)
+
+    def update(self, bar):
+        self._ema.push(bar[self.field])
+        return self._ema.value
+
+
+class StreamingStd(IncrementalIndicator):
+    """Rolling population standard deviation of field over the last period bars, same as get_std(field.ts, period)"""
+
+    def __init__(self, data, period, field = 'close', normalizer = None):
+        super().__init__(data, normalizer = normalizer, field = field)
+        self.period = period
+        self._moments = RollingMoments(period)
+
+    def update(self, bar):
+        self._moments.push(bar[self.field])
+        return self._moments.std
+
+
+class StreamingMin(IncrementalIndicator):
+    """Rolling minimum of field over the last period bars, same as get_min(field.ts, period)"""
+
+    def __init__(self, data, period, field = 'close', normalizer = None):
+        super().__init__(data, normalizer = normalizer, field = field)
+        self.period = period
+        self._extrema = RollingExtrema(period)
+
+    def update(self, bar):
+        self._extrema.push(bar[self.field])
+        return self._extrema.min
+
+
+class StreamingMax(IncrementalIndicator):
+    """Rolling maximum of field over the last period bars, same as get_max(field.ts, period)"""
+
+    def __init__(self, data, period, field = 'close', normalizer = None):
+        super().__init__(data, normalizer = normalizer, field = field)
+        self.period = period
+        self._extrema = RollingExtrema(period)
+
+    def update(self, bar):
+        self._extrema.push(bar[self.field])
+        return self._extrema.max
+
+
+class StreamingZScore(IncrementalIndicator):
+    """Z-score of the latest field value over the last period bars, same as MeanStdNormalizer(roll_period = period).normalize(field.ts)"""
+
+    def __init__(self, data, period, field = 'close', normalizer = None):
+        super().__init__(data, normalizer = normalizer, field = field)
+        self.period = period
+        self._moments = RollingMoments(period)
+
+    def update(self, bar):
+        x = bar[self.field]
+        self._moments.push(x)
+        std = self._moments.std
+        if np.isclose(self._moments.sum, 0) or np.isclose(std, 0):
+            return 0
+        return (x - self._moments.mean) / std
+
+
+class StreamingATR(IncrementalIndicator):
+    """
+    Average true range over the last period bars, the mean of max(high - low, |high - prev close|, |low - prev close|).
+    Returns 0 until two bars have been seen.
+    """
+
+    def __init__(self, data, period, normalizer = None):
+        super().__init__(data, normalizer = normalizer, field = 'close')
+        self.period = period
+        self._moments = RollingMoments(period)
+        self._prev_close = None
+
+    def update(self, bar):
+        high, low, close = bar['high'], bar['low'], bar['close']
+        prev_close = self._prev_close
+        self._prev_close = close
+        if prev_close is None:
+            return 0
+        self._moments.push(max(high - low, abs(high - prev_close), abs(low - prev_close)))
+        return self._moments.mean
+
+
 class IndicatorGroup():
     """
     IndicatorGroup helps organize and store indicators by refreshing baskets of them at a time
@@ -0,0 +1,472 @@
+from tradester.finance.assets import Future, Security
+from .indicator import Indicator
+
+import pandas as pd
+import numpy as np
+
+__all__ = ['PricePanel', 'PanelWindow', 'PanelColumns', 'PanelColumn', 'PanelIndicator', 'PanelSlot']
+
+
+class PricePanel():
+    """
+    A PricePanel holds the price streams of many assets as one (time x field x asset) matrix aligned on the clock:
+    every update() adds one row, holding the value each asset pushed since the previous update and NaN for the
+    assets that did not get a bar. The row is copied in one assignment from the row of the ColumnarStore of a
+    source (see set_sources) for the identifiers it holds, and the price streams of the other assets are read in
+    one pass over their pointers. The PanelIndicators of a Strategy that are computed over the same assets share
+    one PricePanel (see PanelIndicator.share), holding the union of their fields and their longest lookback.
+
+    ...
+
+    Parameters
+    ----------
+    assets : list
+        tradester.finance.Asset of every column
+    fields : list, optional (default : ['open', 'high', 'low', 'close', 'volume'])
+        price attributes to hold
+    lookback : Integer, optional
+        rows to keep, every row if None
+    capacity : Integer, optional (default : 5000)
+        initial rows of the matrix when lookback is None
+
+    Attributes
+    ----------
+    identifiers : list
+        identifiers of the columns
+    len : Integer
+        rows held
+    [fields]
+        (time x asset) view of each field (ex: panel.close), at most lookback rows
+
+    Methods
+    -------
+    update(step : Integer, optional, now : DateTime, optional)
+        adds the row of the current bar, once per clock step if step is given
+    field(name : String, lookback : Integer, optional)
+        returns the (time x asset) view of a field, at most lookback rows
+    require(fields : list, lookback : Integer)
+        extends the fields and lookback held before the first update
+    set_sources(sources : list)
+        sets the ColumnarStores (or objects with a store attribute, ex: the feed factories) rows are copied from
+    tradeable()
+        returns the boolean vector of the assets that are tradeable
+    """
+
+    def __init__(self, assets, fields = ['open', 'high', 'low', 'close', 'volume'], lookback = None, capacity = 5000):
+        self.assets = list(assets)
+        self.identifiers = [a.identifier for a in self.assets]
+        self.fields = list(fields)
+        self.lookback = lookback
+        self.capacity = capacity
+        self._field_index = {f: k for k, f in enumerate(self.fields)}
+        self._matrix = None
+        self._seen = None
+        self._streams = None
+        self._rows = 0
+        self._step = None
+        self._sources = []
+        self._index = {}
+
+    def __getattr__(self, name):
+        if name in self.__dict__.get('_field_index', {}):
+            return self.field(name)
+        raise AttributeError(name)
+
+    @property
+    def len(self):
+        return self._rows if self.lookback is None else min(self._rows, self.lookback)
+
+    def field(self, name, lookback = None):
+        n = self.len if lookback is None else min(self.len, lookback)
+        if self._matrix is None:
+            return np.empty((0, len(self.assets)))
+        return self._matrix[self._rows - n:self._rows, self._field_index[name]]
+
+    def require(self, fields, lookback):
+        fields = [f for f in fields if f not in self._field_index]
+        longer = self.lookback is not None and (lookback is None or lookback > self.lookback)
+        if len(fields) == 0 and not longer:
+            return
+        if self._matrix is not None:
+            raise ValueError('The fields and lookback of a PricePanel can only be extended before its first update')
+        self.fields.extend(fields)
+        self._field_index = {f: k for k, f in enumerate(self.fields)}
+        self.lookback = lookback if longer else self.lookback
+
+    def set_sources(self, sources):
+        self._sources = [] if sources is None else list(sources)
+        self._index = {}
+
+    def __make_room(self):
+        matrix = self._matrix
+        if self.lookback is not None:
+            matrix[:self.lookback] = matrix[self._rows - self.lookback:self._rows]
+            matrix[self.lookback:] = np.nan
+            self._rows = self.lookback
+        else:
+            grown = np.full((2 * matrix.shape[0],) + matrix.shape[1:], np.nan)
+            grown[:self._rows] = matrix[:self._rows]
+            self._matrix = grown
+
+    def __source_index(self, source, store):
+        cached = self._index.get(id(source))
+        if cached is None or cached[0] is not store or cached[1] != len(store):
+            ids = np.array([store.index.get(i, -1) for i in self.identifiers], dtype = np.int64)
+            columns = np.flatnonzero(ids >= 0)
+            fields = [(k, store.fields.index(f)) for k, f in enumerate(self.fields) if f in store.fields]
+            cached = (store, len(store), columns, ids[columns], fields)
+            self._index[id(source)] = cached
+        return cached[2:]
+
+    def __fill_sources(self, row, now):
+        served = np.zeros(len(self.assets), dtype = bool)
+        now = pd.Timestamp(now).value if now is not None and now != 'END' else None
+        for source in self._sources:
+            store = getattr(source, 'store', source)
+            if store is None or not hasattr(store, 'row'):
+                continue
+            columns, ids, fields = self.__source_index(source, store)
+            keep = ~served[columns]
+            columns, ids = columns[keep], ids[keep]
+            served[columns] = True
+            if now is None or store.row_time != now or len(columns) == 0:
+                continue
+            block = store.row[ids]
+            for k, f in fields:
+                row[k, columns] = block[:, f]
+        return served
+
+    def __fill_streams(self, row, pending):
+        if self._streams is None:
+            self._streams = [getattr(a.price_stream, f) for f in self.fields for a in self.assets]
+        flat = np.flatnonzero(np.tile(pending, len(self.fields)))
+        if len(flat) == 0:
+            return
+        streams = self._streams
+        pointers = np.fromiter((streams[j].pointer for j in flat), dtype = np.int64, count = len(flat))
+        seen = self._seen.reshape(-1)
+        new = pointers > seen[flat]
+        changed = flat[new]
+        if len(changed) > 0:
+            row.reshape(-1)[changed] = [streams[j].v for j in changed]
+            seen[changed] = pointers[new]
+
+    def update(self, step = None, now = None):
+        if step is not None:
+            if step == self._step:
+                return
+            self._step = step
+        if self._matrix is None:
+            rows = 2 * self.lookback if self.lookback is not None else self.capacity
+            self._matrix = np.full((rows, len(self.fields), len(self.assets)), np.nan)
+            self._seen = np.zeros((len(self.fields), len(self.assets)), dtype = np.int64)
+        if self._rows == self._matrix.shape[0]:
+            self.__make_room()
+        row = self._matrix[self._rows]
+        served = self.__fill_sources(row, now)
+        self.__fill_streams(row, ~served)
+        self._rows += 1
+
+    def tradeable(self):
+        return np.fromiter((bool(a.tradeable) for a in self.assets), dtype = bool, count = len(self.assets))
+
+
+class PanelWindow():
+    """
+    The part of a (possibly shared) PricePanel that a PanelIndicator calculates on: its own fields, at most its
+    own lookback rows, with the same attributes as a PricePanel (ex: window.close).
+    """
+
+    def __init__(self, panel, fields, lookback):
+        self.panel = panel
+        self.fields = list(fields)
+        self.lookback = lookback
+
+    def __getattr__(self, name):
+        if name in self.__dict__.get('fields', []):
+            return self.panel.field(name, self.lookback)
+        raise AttributeError(name)
+
+    @property
+    def assets(self):
+        return self.panel.assets
+
+    @property
+    def identifiers(self):
+        return self.panel.identifiers
+
+    @property
+    def len(self):
+        return self.panel.len if self.lookback is None else min(self.panel.len, self.lookback)
+
+    def field(self, name):
+        return self.panel.field(name, self.lookback)
+
+    def tradeable(self):
+        return self.panel.tradeable()
+
+
+class PanelColumns():
+    """
+    The values a PanelIndicator pushed for its assets, kept in one (time x asset) matrix grown by doubling. Each
+    column is filled on its own like a Stream, an asset only gets a row when it is pushed a value that is not
+    NaN, so column k holds the ts of asset k. push() writes the values of many assets in one assignment.
+
+    ...
+
+    Parameters
+    ----------
+    n : Integer
+        number of assets
+    capacity : Integer, optional (default : 5000)
+        initial rows of the matrix
+
+    Attributes
+    ----------
+    counts : np.Array
+        values pushed to each column, the pointer of its PanelColumn
+
+    Methods
+    -------
+    push(ks : np.Array, values : np.Array)
+        appends values[m] to column ks[m], the columns must be unique
+    append(k : Integer, x : Float)
+        appends x to column k
+    ts(k : Integer)
+        returns the values of column k
+    last(ks : np.Array)
+        returns the most recent value of each column ks, NaN if it is empty
+    column(k : Integer)
+        returns the PanelColumn of column k
+    """
+
+    def __init__(self, n, capacity = 5000):
+        self.counts = np.zeros(n, dtype = np.int64)
+        self.capacity = capacity
+        self._matrix = None
+
+    def push(self, ks, values):
+        values = np.asarray(values, dtype = np.float64)
+        keep = values == values
+        ks, values = ks[keep], values[keep]
+        if len(ks) == 0:
+            return
+        rows = self.counts[ks]
+        if self._matrix is None:
+            self._matrix = np.full((self.capacity, len(self.counts)), np.nan)
+        if rows.max() >= self._matrix.shape[0]:
+            grown = np.full((max(2 * self._matrix.shape[0], rows.max() + 1), len(self.counts)), np.nan)
+            grown[:self._matrix.shape[0]] = self._matrix
+            self._matrix = grown
+        self._matrix[rows, ks] = values
+        self.counts[ks] = rows + 1
+
+    def append(self, k, x):
+        if x is None or x != x:
+            return
+        row = self.counts[k]
+        if self._matrix is None or row >= self._matrix.shape[0]:
+            self.push(np.array([k]), np.array([x], dtype = np.float64))
+            return
+        self._matrix[row, k] = x
+        self.counts[k] = row + 1
+
+    def ts(self, k):
+        if self._matrix is None:
+            return np.empty(0)
+        return self._matrix[:self.counts[k], k]
+
+    def last(self, ks):
+        rows = self.counts[ks]
+        last = np.full(len(ks), np.nan)
+        if self._matrix is not None:
+            has = rows > 0
+            last[has] = self._matrix[rows[has] - 1, ks[has]]
+        return last
+
+    def column(self, k):
+        return PanelColumn(self, k)
+
+
+class PanelColumn():
+    """
+    Column k of a PanelColumns, with the pointer, v and ts of a Stream, these are the streams of a PanelSlot
+    """
+
+    cache = None
+
+    def __init__(self, columns, k):
+        self.columns = columns
+        self.k = k
+
+    @property
+    def pointer(self):
+        return int(self.columns.counts[self.k])
+
+    @property
+    def v(self):
+        return self.columns.last(np.array([self.k]))[0] if self.pointer > 0 else None
+
+    @property
+    def ts(self):
+        return self.columns.ts(self.k)
+
+    @property
+    def len(self):
+        return self.pointer
+
+    def push(self, x):
+        self.columns.append(self.k, x)
+
+
+class PanelIndicator():
+    """
+    A PanelIndicator computes an indicator for many assets at once: once per bar its PricePanel is updated and
+    calculate(window) returns one value per asset as a vector (or a dictionary of vectors for multiple
+    attributes), with NumPy or numba rather than one Python call per asset. Strategy.add(indicator, identifiers,
+    base = 'panel') registers one PanelSlot per asset in the strategy's SignalGroup, so get_indicators and
+    get_indicator_tree return the panel values like those of any other Indicator, and shares the PricePanel
+    with the strategy's other PanelIndicators over the same assets. The SignalGroup pushes the values of all
+    the slots it refreshes with one push() per bar rather than refreshing every slot.
+
+    ...
+
+    Parameters
+    ----------
+    assets : list
+        tradester.finance.Asset the indicator is computed for
+    fields : list, optional (default : ['open', 'high', 'low', 'close', 'volume'])
+        price attributes of the panel
+    lookback : Integer, optional
+        rows of the panel to keep, every row if None
+    normalizer : tradester.utils.Normalizer, optional
+        applied to every slot, see Indicator
+    attributes : list, optional (default : ['_indicator'])
+        see Indicator
+    override : boolean, optional (default : False)
+        see Indicator
+
+    Attributes
+    ----------
+    panel : PricePanel
+        the prices of the assets, possibly shared
+    window : PanelWindow
+        the fields and lookback of the panel passed to calculate()
+    values : dict
+        attribute -> vector of the last calculated values
+    columns : dict
+        attribute -> PanelColumns of the values pushed to the slots
+    pointers : np.Array
+        number of pushes of every slot
+    slots : list
+        PanelSlot of every asset
+
+    Methods
+    -------
+    refresh()
+        updates the panel and recalculates the values, once per bar
+    push(ks : list, optional)
+        refreshes, then pushes the values of the slots ks (every slot if None) that should refresh
+    share(panels : dict)
+        uses the PricePanel of panels that has the same assets, or adds this one to panels
+    calculate(window : PanelWindow)
+        returns the vector (or dictionary of vectors) of values, must be implemented
+    """
+
+    def __init__(self, assets, fields = ['open', 'high', 'low', 'close', 'volume'], lookback = None, normalizer = None, attributes = ['_indicator'], override = False):
+        self.assets = list(assets)
+        self.fields = list(fields)
+        self.lookback = lookback
+        self.panel = PricePanel(self.assets, fields = fields, lookback = lookback)
+        self.window = PanelWindow(self.panel, fields, lookback)
+        self.normalizer = normalizer
+        self.attributes = attributes
+        self.override = override
+        self.values = {a: np.full(len(self.assets), np.nan) for a in attributes}
+        self.columns = {a: PanelColumns(len(self.assets)) for a in attributes}
+        self.pointers = np.zeros(len(self.assets), dtype = np.int64)
+        self.slots = [PanelSlot(self, k) for k in range(len(self.assets))]
+        self._gated = np.array([isinstance(a, (Future, Security)) for a in self.assets], dtype = bool)
+        self._step = None
+
+    def share(self, panels):
+        key = tuple(self.panel.identifiers)
+        panel = panels.get(key)
+        if panel is None:
+            panels[key] = self.panel
+        elif panel is not self.panel:
+            if self.panel.len > 0:
+                raise ValueError('A PanelIndicator can only share its PricePanel before it is refreshed')
+            panel.require(self.fields, self.lookback)
+            self.panel = panel
+            self.window = PanelWindow(panel, self.fields, self.lookback)
+        return self.panel
+
+    def refresh(self):
+        manager = self.assets[0].manager if len(self.assets) > 0 else None
+        step, now = None, None
+        if manager is not None:
+            step, now = manager.index, getattr(manager, 'now', None)
+            if step == self._step:
+                return
+            self._step = step
+        self.panel.update(step = step, now = now)
+        values = self.calculate(self.window)
+        if len(self.attributes) == 1 and not isinstance(values, dict):
+            values = {self.attributes[0]: values}
+        for a in self.attributes:
+            self.values[a] = np.broadcast_to(np.asarray(values[a], dtype = np.float64), (len(self.assets),))
+
+    def __should_refresh(self, ks):
+        refresh = np.ones(len(ks), dtype = bool)
+        gated = np.flatnonzero(self._gated[ks])
+        refresh[gated] = [bool(self.assets[k].tradeable) for k in ks[gated]]
+        return refresh
+
+    def push(self, ks = None):
+        ks = np.arange(len(self.assets)) if ks is None else np.unique(np.asarray(ks, dtype = np.int64))
+        self.refresh()
+        if not self.override:
+            ks = ks[self.__should_refresh(ks)]
+        for a in self.attributes:
+            values = self.values[a][ks]
+            if self.normalizer is not None:
+                values = np.array([self.slots[k]._normalize(a, v) for k, v in zip(ks, values)], dtype = np.float64)
+            self.columns[a].push(ks, values)
+        self.pointers[ks] += 1
+        return ks
+
+    def calculate(self, window):
+        raise NotImplementedError("For each panel indicator, you must implement a calculate(self, window) method returning one value per asset")
+
+
+class PanelSlot(Indicator):
+    """
+    The Indicator of one asset of a PanelIndicator, its streams are column k of the PanelIndicator's
+    PanelColumns. A SignalGroup pushes all the slots of a panel at once (see PanelIndicator.push), refresh()
+    pushes this slot alone like Indicator.refresh
+    """
+
+    def __init__(self, panel, k):
+        super().__init__(panel.assets[k], normalizer = panel.normalizer, attributes = panel.attributes, override = panel.override)
+        self.panel = panel
+        self.k = k
+        for a in self.attributes:
+            setattr(self, a, panel.columns[a].column(k))
+
+    @property
+    def pointer(self):
+        return int(self.panel.pointers[self.k])
+
+    def refresh(self):
+        self.panel.refresh()
+        if self.override or self.should_refresh:
+            for a in self.attributes:
+                v = self.panel.values[a][self.k]
+                getattr(self, a).push(v if self.normalizer is None else self._normalize(a, v))
+            self.panel.pointers[self.k] += 1
+
+    def calculate(self):
+        if len(self.attributes) == 1:
+            return self.panel.values[self.attributes[0]][self.k]
+        return {a: self.panel.values[a][self.k] for a in self.attributes}
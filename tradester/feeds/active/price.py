@@ -1,4 +1,4 @@
-from .stream import Stream 
+from .stream import Stream, TimedStream
 import numpy as np
 
 ATTRIBUTES = {
@@ -22,6 +22,8 @@ class Price():
         Prices contract as String
     bar_type : String
         type of data to handle, either: minute, hourly, daily, or tick
+    timed : Boolean, optional (default : False)
+        use TimedStreams so arithmetic between attributes of different contracts aligns on the clock
 
     Attributes
     ----------
@@ -43,19 +45,33 @@ class Price():
         for each attribute, if the attribute is not volume, fill in the previous value
     push(bar : Dictionary) 
         pushes a new dataset onto each attribute
+    reserve(n : Integer)
+        preallocates each attribute's Stream to hold n more values
+    set_cache(cache : Integer)
+        replaces each (empty) attribute Stream with a ring buffer of length cache
+    set_manager(manager : ClockManager)
+        sets the clock of each attribute if the Price is timed
 
     See Also
     --------
     tradester.feeds.active.Stream
 
     """
-    def __init__(self, bar_type, cache = None, contract = None, multiplier = 1):
+    def __init__(self, bar_type, cache = None, contract = None, multiplier = 1, timed = False):
         self.contract = contract
         self.bar_type = bar_type
         self.multiplier = multiplier
         self.attributes = ATTRIBUTES[bar_type]
+        self.cache = cache
+        self.timed = timed
+        self.manager = None
         for a in ATTRIBUTES[bar_type]:
-            setattr(self, a, Stream(cache))
+            setattr(self, a, self.__stream(cache))
+
+    def __stream(self, cache):
+        if self.timed:
+            return TimedStream(cache, manager = self.manager)
+        return Stream(cache)
 
     def __repr__(self):
         return f'<PriceStream ({self.bar_type})>'
@@ -82,3 +98,20 @@ class Price():
     def push(self, bar):
         for a, v in list(bar.items()):
             getattr(self, a).push(v)
+
+    def reserve(self, n):
+        for a in self.attributes:
+            getattr(self, a).reserve(n)
+
+    def set_cache(self, cache):
+        if any(getattr(self, a).pointer > 0 for a in self.attributes):
+            raise ValueError('The cache of a Price stream can only be set before data is pushed')
+        self.cache = cache
+        for a in self.attributes:
+            setattr(self, a, self.__stream(cache))
+
+    def set_manager(self, manager):
+        self.manager = manager
+        if self.timed:
+            for a in self.attributes:
+                getattr(self, a).set_manager(manager)
@@ -1,5 +1,3 @@
-from numba import jit
-
 import numpy as np
 import math
 
@@ -14,18 +12,21 @@ class Stream():
     Parameters
     ----------
     cache : Integer, None
-        amount of data to keep in memory
+        amount of data to keep in memory (at least 1), if None keep all data. A cached stream is a bounded ring
+        buffer backed by a mirrored array of length 2 * cache so ts is always a contiguous view.
+    capacity : Integer, None
+        initial size of the buffer when cache is None (default: 64), grows by doubling when exceeded
     
     Attributes
     ----------
     ts : np.Array
-        np.Array of data stored in time series
+        np.Array of data stored in time series (at most the last cache values), a view into the buffer
     v : Integer, None
         most recent entry in the stream, otherwise None
     len : Integer
         length of the stream data
     pointer : Integer
-        maintains the current 'time' within the Stream
+        maintains the current 'time' within the Stream, counts every push even if the value was evicted
         
     Methods
     -------
@@ -33,24 +34,33 @@ class Stream():
         fills in most recent value
     push(x)
         pushes datapoint x onto the stream assuming it is none None or 'nan'
+    reserve(n)
+        sizes an uncached buffer to hold n more values so pushing them never reallocates, the allocation is
+        exact while the stream is empty (a factory that knows the bar count), afterwards it only grows
 
     """
 
-    def __init__(self, cache):
-        self._stream = np.empty([5000]) 
+    def __init__(self, cache = None, capacity = None):
+        if cache is not None and cache < 1:
+            raise ValueError(f'The cache of a Stream must be None or at least 1, not {cache}')
+        self.cache = cache
         self._pointer = 0
+        self._head = 0
+        if cache is not None:
+            self._stream = np.empty([2 * cache])
+        else:
+            self._stream = np.empty([64 if capacity is None else max(capacity, 1)])
     
     @property
     def ts(self):
-        if self.pointer > 0:
-            return self._stream[:(self.pointer)]
-        else:
-            return np.array([])
+        return self._view(self._stream)
 
     @property
     def v(self):
         if self.pointer > 0:
-           return self._stream[self.pointer-1]
+            if self.cache is None:
+                return self._stream[self._pointer - 1]
+            return self._stream[self._head + self.cache - 1]
         else:
             return None
 
@@ -61,63 +71,261 @@ class Stream():
     @property
     def pointer(self):
         return self._pointer
+
+    def _view(self, buffer):
+        if self.cache is None:
+            return buffer[:self._pointer]
+        if self._pointer < self.cache:
+            return buffer[:self._head]
+        return buffer[self._head:self._head + self.cache]
+
+    def _align(self, other):
+        a = self.ts
+        b = other.ts
+        n = min(len(a), len(b))
+        return a[len(a) - n:], b[len(b) - n:]
     
     def __add__(self, other):
         if self.pointer == 0 or other.pointer == 0:
             return None
-        shift = self.pointer - other.pointer
-        if shift > 0:
-            return self.ts[abs(shift):] + other.ts
-        elif shift < 0:
-            return self.ts + other.ts[abs(shift):]
-        else:
-            return self.ts + other.ts
+        a, b = self._align(other)
+        return a + b
 
     def __sub__(self, other):
-        shift = self.pointer - other.pointer
         if self.pointer == 0 or other.pointer == 0:
             return None
-        if shift > 0:
-            return self.ts[abs(shift):] - other.ts
-        elif shift < 0:
-            return self.ts - other.ts[abs(shift):]
-        else:
-            return self.ts - other.ts
+        a, b = self._align(other)
+        return a - b
 
     def __mul__(self, other):
-        shift = self.pointer - other.pointer
         if self.pointer == 0 or other.pointer == 0:
             return None
-        if shift > 0:
-            return self.ts[abs(shift):] * other.ts
-        elif shift < 0:
-            return self.ts * other.ts[abs(shift):]
-        else:
-            return self.ts * other.ts
+        a, b = self._align(other)
+        return a * b
 
     def __truediv__(self, other):
-        shift = self.pointer - other.pointer
         if self.pointer == 0 or other.pointer == 0:
             return None
-        if shift > 0:
-            return self.ts[abs(shift):] / other.ts
-        elif shift < 0:
-            return self.ts / other.ts[abs(shift):]
-        else:
-            return self.ts / other.ts
+        a, b = self._align(other)
+        return a / b
+
+    def _resize(self, size):
+        stream = np.empty([size])
+        stream[:self._pointer] = self._stream[:self._pointer]
+        self._stream = stream
 
-    def _check_cache(self):
-        if not self.cache is None:
-            self._stream = self._stream[-self.cache:]
+    def reserve(self, n):
+        if self.cache is None:
+            size = self._pointer + max(n, 0)
+            if self._pointer == 0 and size != self._stream.size:
+                self._resize(max(size, 1))
+            elif size > self._stream.size:
+                self._resize(max(size, 2 * self._stream.size))
     
     def push(self, x):
-        if str(x) != 'nan' and not x is None:
-            if self._stream.size == self._pointer:
-                self._stream = np.concatenate([self._stream, np.empty([self._stream.size*2])])
-            self._stream[self.pointer] = x
+        if x is not None and x == x:
+            if self.cache is None:
+                if self._stream.size == self._pointer:
+                    self._resize(self._stream.size * 2)
+                self._stream[self._pointer] = x
+            else:
+                self._stream[self._head] = x
+                self._stream[self._head + self.cache] = x
+                self._head = self._head + 1 if self._head + 1 < self.cache else 0
             self._pointer += 1
         else:
             pass
             #raise ValueError('The input type is not in (int, float)')
-        
 
+
+class TimedStream(Stream):
+    """
+    A TimedStream is a Stream that also records the clock index (see ClockManager.index) of every push. Arithmetic
+    between TimedStreams is lazy: a + b returns a StreamExpression that is aligned on clock index, rather than on
+    push count, and only evaluated over the trailing window that is asked for.
+    
+    ...
+
+    Parameters
+    ----------
+    cache : Integer, None
+        amount of data to keep in memory, if None keep all data
+    capacity : Integer, None
+        initial size of the buffer when cache is None
+    manager : ClockManager, optional
+        the central clock, if None the push count is used as the clock index
+
+    Attributes
+    ----------
+    clock : np.Array
+        clock index of each value in ts
+
+    Methods
+    -------
+    set_manager(manager : ClockManager)
+        sets the clock used to stamp pushes
+    window(n : Integer, None)
+        returns (values, clock) views of the last n values, all values if n is None
+    """
+
+    def __init__(self, cache = None, capacity = None, manager = None):
+        super().__init__(cache, capacity = capacity)
+        self.manager = manager
+        self._clock = np.empty(self._stream.size, dtype = np.int64)
+
+    @property
+    def clock(self):
+        return self._view(self._clock)
+
+    def set_manager(self, manager):
+        self.manager = manager
+
+    def window(self, n = None):
+        ts = self.ts
+        clock = self.clock
+        if n is not None and n < len(ts):
+            return ts[len(ts) - n:], clock[len(clock) - n:]
+        return ts, clock
+
+    def _resize(self, size):
+        clock = np.empty(size, dtype = np.int64)
+        clock[:self._pointer] = self._clock[:self._pointer]
+        self._clock = clock
+        super()._resize(size)
+
+    def push(self, x):
+        if x is not None and x == x:
+            i = self._pointer if self.cache is None else self._head
+            t = self.manager.index if self.manager is not None else self._pointer
+            super().push(x)
+            self._clock[i] = t
+            if self.cache is not None:
+                self._clock[i + self.cache] = t
+
+    def __add__(self, other):
+        return StreamExpression(np.add, self, other)
+
+    def __radd__(self, other):
+        return StreamExpression(np.add, other, self)
+
+    def __sub__(self, other):
+        return StreamExpression(np.subtract, self, other)
+
+    def __rsub__(self, other):
+        return StreamExpression(np.subtract, other, self)
+
+    def __mul__(self, other):
+        return StreamExpression(np.multiply, self, other)
+
+    def __rmul__(self, other):
+        return StreamExpression(np.multiply, other, self)
+
+    def __truediv__(self, other):
+        return StreamExpression(np.true_divide, self, other)
+
+    def __rtruediv__(self, other):
+        return StreamExpression(np.true_divide, other, self)
+
+
+class StreamExpression():
+    """
+    A lazy binary operation between TimedStreams, StreamExpressions or scalars. Nothing is computed until the
+    expression is evaluated, and then only over the requested trailing window. Operands are aligned on the clock
+    index of each value; values whose clock index is missing from the other side are dropped. Results are written
+    into a buffer owned by the expression, so the returned arrays are views that are overwritten by the next
+    evaluation (copy them to keep them).
+
+    ...
+
+    Parameters
+    ----------
+    op : np.ufunc
+        binary ufunc applied to the aligned operands (np.add, np.subtract, ...)
+    left : TimedStream, StreamExpression, float
+        left operand
+    right : TimedStream, StreamExpression, float
+        right operand
+
+    Attributes
+    ----------
+    ts : np.Array
+        the expression evaluated over every aligned value
+    v : float, None
+        the expression at the latest value of each operand, None if those values are not aligned
+
+    Methods
+    -------
+    window(n : Integer, None)
+        returns (values, clock) of the expression over the last n values of each operand
+    evaluate(n : Integer, None)
+        returns the values of window(n)
+    """
+
+    def __init__(self, op, left, right):
+        for operand in [left, right]:
+            if isinstance(operand, Stream) and not isinstance(operand, TimedStream):
+                raise ValueError('A StreamExpression can only be built from TimedStreams, StreamExpressions or scalars')
+        self.op = op
+        self.left = left
+        self.right = right
+        self._out = np.empty(0)
+
+    @staticmethod
+    def _is_series(operand):
+        return isinstance(operand, (TimedStream, StreamExpression))
+
+    def _buffer(self, n):
+        if self._out.size < n:
+            self._out = np.empty(max(n, 2 * self._out.size))
+        return self._out[:n]
+
+    def window(self, n = None):
+        if not self._is_series(self.left):
+            rv, rc = self.right.window(n)
+            return self.op(self.left, rv, out = self._buffer(len(rv))), rc
+        if not self._is_series(self.right):
+            lv, lc = self.left.window(n)
+            return self.op(lv, self.right, out = self._buffer(len(lv))), lc
+
+        lv, lc = self.left.window(n)
+        rv, rc = self.right.window(n)
+        if len(lc) == len(rc) and (len(lc) == 0 or (lc[0] == rc[0] and lc[-1] == rc[-1])) and np.array_equal(lc, rc):
+            return self.op(lv, rv, out = self._buffer(len(lv))), lc
+        clock, li, ri = np.intersect1d(lc, rc, assume_unique = True, return_indices = True)
+        return self.op(lv[li], rv[ri], out = self._buffer(len(clock))), clock
+
+    def evaluate(self, n = None):
+        return self.window(n)[0]
+
+    @property
+    def ts(self):
+        return self.evaluate()
+
+    @property
+    def v(self):
+        values = self.evaluate(1)
+        return values[-1] if len(values) > 0 else None
+
+    def __add__(self, other):
+        return StreamExpression(np.add, self, other)
+
+    def __radd__(self, other):
+        return StreamExpression(np.add, other, self)
+
+    def __sub__(self, other):
+        return StreamExpression(np.subtract, self, other)
+
+    def __rsub__(self, other):
+        return StreamExpression(np.subtract, other, self)
+
+    def __mul__(self, other):
+        return StreamExpression(np.multiply, self, other)
+
+    def __rmul__(self, other):
+        return StreamExpression(np.multiply, other, self)
+
+    def __truediv__(self, other):
+        return StreamExpression(np.true_divide, self, other)
+
+    def __rtruediv__(self, other):
+        return StreamExpression(np.true_divide, other, self)
@@ -2,3 +2,8 @@ from .feed import *
 from .futures import *
 from .securities import *
 from .symbols import *
+from .cache import *
+from .fetch import *
+from .loader import *
+from .pipeline import *
+from .barstore import *
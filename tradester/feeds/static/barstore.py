@@ -0,0 +1,263 @@
+from .feed import CustomFeed
+from .futures import FuturesTS
+from .securities import SecuritiesTS
+from .pipeline import PrefetchPipeline
+from time import time
+
+import pandas as pd
+import numpy as np
+import shutil
+import json
+import os
+
+__all__ = ['BarStore', 'export_bar_store', 'BAR_STORE_FEEDS']
+
+# datatable -> (feed, identity field, fields)
+BAR_STORE_FEEDS = {
+    'futures': (FuturesTS, 'contract', ['open', 'high', 'low', 'close', 'volume', 'open_interest']),
+    'securities': (SecuritiesTS, 'ticker', ['open', 'high', 'low', 'close', 'volume']),
+}
+
+
+class BarStore():
+    """
+    A BarStore is a read-only, memory-mapped copy of a ts_{bar}_{datatable} table for backtests on machines
+    without database access. Every (datatable, bar) has its own directory holding:
+
+        meta.json       fields, identifiers (and the fields each one has no values for), row count and date range
+        calendar.npy    sorted distinct dates of the table (int64 nanoseconds)
+        index.npy       offsets, the rows of identifiers[i] are [index[i], index[i + 1])
+        date.i8         raw int64 nanosecond date of every row, rows are sorted by (identifier, date)
+        {field}.f8      raw float64 values of every row, one file per field
+
+    so opening a contract is a slice of memory-mapped arrays, with no parsing. Stores are written with
+    export_bar_store (or BarStore.write).
+
+    ...
+
+    Parameters
+    ----------
+    path : String
+        root directory of the bar stores
+    datatable : String, optional (default : 'futures')
+        table the store was exported from
+    bar : String, optional (default : 'daily')
+        type of bar data in the store
+
+    Attributes
+    ----------
+    directory : String
+        directory of the (datatable, bar) store
+    meta : dict
+        contents of meta.json
+    identifiers : list
+        identifiers in the store
+    fields : list
+        fields in the store
+    calendar : np.Array (datetime64[ns])
+        every date in the store
+
+    Methods
+    -------
+    get(identifier : String, fields : list, start_date : String, end_date : String)
+        returns (dates, {field : values}) of identifier as memory-mapped views, None if it is not in the store
+    split(identifiers : list, fields : list, start_date : String, end_date : String)
+        returns the split (see TSFeed.split) of identifiers, identifiers with no bars in the range are left out
+    loader(fields : list, start_date : String, end_date : String)
+        returns an object whose load(identifiers) returns split(identifiers, ...), used in place of a
+        ParallelLoader by the factories
+    write(path : String, split : dict, datatable : String, bar : String, fields : list)
+        writes a store from a split, see export_bar_store
+    """
+
+    def __init__(self, path, datatable = 'futures', bar = 'daily'):
+        self.directory = os.path.join(os.path.expanduser(path), datatable, bar)
+        meta = os.path.join(self.directory, 'meta.json')
+        if not os.path.exists(meta):
+            raise ValueError(f'There is no {bar} {datatable} bar store in {path}')
+        with open(meta) as f:
+            self.meta = json.load(f)
+        self.identifiers = self.meta['identifiers']
+        self.fields = self.meta['fields']
+        self._ids = {identifier: i for i, identifier in enumerate(self.identifiers)}
+        self._absent = self.meta.get('absent', {})
+        self._index = np.load(os.path.join(self.directory, 'index.npy'))
+        self.calendar = np.load(os.path.join(self.directory, 'calendar.npy'), mmap_mode = 'r').view('datetime64[ns]')
+        self._columns = {}
+
+    def __contains__(self, identifier):
+        return identifier in self._ids
+
+    def __len__(self):
+        return len(self.identifiers)
+
+    def _column(self, name):
+        if name not in self._columns:
+            dtype, suffix = (np.int64, 'i8') if name == 'date' else (np.float64, 'f8')
+            if self.meta['rows'] == 0:
+                self._columns[name] = np.empty(0, dtype = dtype)
+            else:
+                self._columns[name] = np.memmap(os.path.join(self.directory, f'{name}.{suffix}'), dtype = dtype, mode = 'r', shape = (self.meta['rows'],))
+        return self._columns[name]
+
+    def get(self, identifier, fields = None, start_date = None, end_date = None):
+        i = self._ids.get(identifier)
+        if i is None:
+            return None
+        lo, hi = int(self._index[i]), int(self._index[i + 1])
+        dates = self._column('date')[lo:hi]
+        if start_date is not None:
+            lo += int(np.searchsorted(dates, pd.Timestamp(start_date).value, side = 'left'))
+        if end_date is not None:
+            hi = int(self._index[i]) + int(np.searchsorted(dates, pd.Timestamp(end_date).value, side = 'right'))
+        fields = [f for f in (self.fields if fields is None else fields) if f in self.fields and f not in self._absent.get(identifier, [])]
+        return self._column('date')[lo:hi].view('datetime64[ns]'), {f: self._column(f)[lo:hi] for f in fields}
+
+    def split(self, identifiers, fields = None, start_date = None, end_date = None):
+        split = {}
+        for identifier in identifiers:
+            bars = self.get(identifier, fields = fields, start_date = start_date, end_date = end_date)
+            if bars is not None and len(bars[0]) > 0:
+                split[identifier] = bars
+        return split
+
+    def loader(self, fields = None, start_date = None, end_date = None):
+        return _BarStoreLoader(self, fields, start_date, end_date)
+
+    @staticmethod
+    def write(path, split, datatable = 'futures', bar = 'daily', fields = None):
+        writer = _BarStoreWriter(path, datatable, bar, fields if fields is not None else BAR_STORE_FEEDS[datatable][2])
+        writer.append(split)
+        return writer.close()
+
+
+class _BarStoreLoader():
+
+    def __init__(self, store, fields, start_date, end_date):
+        self.store = store
+        self.fields = fields
+        self.start_date = start_date
+        self.end_date = end_date
+        self.errors = []
+
+    def load(self, identifiers):
+        return self.store.split(identifiers, fields = self.fields, start_date = self.start_date, end_date = self.end_date)
+
+
+class _BarStoreWriter():
+    """appends splits to the raw row files of a new store, close() writes the index, calendar and meta.json"""
+
+    def __init__(self, path, datatable, bar, fields):
+        self.path = path
+        self.datatable = datatable
+        self.bar = bar
+        self.fields = list(fields)
+        self.directory = os.path.join(os.path.expanduser(path), datatable, bar)
+        self.tmp = self.directory + f'.{os.getpid()}.tmp'
+        shutil.rmtree(self.tmp, ignore_errors = True)
+        os.makedirs(self.tmp)
+        self.files = {f: open(os.path.join(self.tmp, f'{f}.f8'), 'wb') for f in self.fields}
+        self.files['date'] = open(os.path.join(self.tmp, 'date.i8'), 'wb')
+        self.identifiers = []
+        self.counts = []
+        self.absent = {}
+        self.calendar = np.array([], dtype = np.int64)
+
+    def append(self, split):
+        calendar = [self.calendar]
+        for identifier in sorted(split):
+            dates, columns = split[identifier]
+            dates = np.asarray(dates, dtype = 'datetime64[ns]').view(np.int64)
+            order = np.argsort(dates, kind = 'stable')
+            np.ascontiguousarray(dates[order]).tofile(self.files['date'])
+            for f in self.fields:
+                values = np.asarray(columns[f], dtype = np.float64)[order] if f in columns else np.full(len(dates), np.nan)
+                np.ascontiguousarray(values).tofile(self.files[f])
+            if any(f not in columns for f in self.fields):
+                self.absent[identifier] = [f for f in self.fields if f not in columns]
+            self.identifiers.append(identifier)
+            self.counts.append(len(dates))
+            calendar.append(dates)
+        self.calendar = np.unique(np.concatenate(calendar))
+
+    def discard(self):
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.tmp, ignore_errors = True)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        index = np.concatenate([[0], np.cumsum(self.counts, dtype = np.int64)]).astype(np.int64)
+        np.save(os.path.join(self.tmp, 'index.npy'), index)
+        np.save(os.path.join(self.tmp, 'calendar.npy'), self.calendar)
+        meta = {
+            'version': 1,
+            'datatable': self.datatable,
+            'bar': self.bar,
+            'fields': self.fields,
+            'identifiers': self.identifiers,
+            'absent': self.absent,
+            'rows': int(index[-1]),
+            'start': str(pd.Timestamp(self.calendar[0])) if len(self.calendar) > 0 else None,
+            'end': str(pd.Timestamp(self.calendar[-1])) if len(self.calendar) > 0 else None,
+            'created': time(),
+        }
+        with open(os.path.join(self.tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+        os.replace(self.tmp, self.directory)
+        return BarStore(self.path, self.datatable, self.bar)
+
+
+def export_bar_store(path, datatable = 'futures', bar = 'daily', identifiers = None, start_date = None, end_date = None, credentials = None, chunk_size = 50, threads = 4):
+    """
+    Exports ts_{bar}_{datatable} (see dba/DMS/models.py) into a BarStore under path, replacing any existing
+    store of the same (datatable, bar). Chunks of chunk_size identifiers are fetched concurrently and appended as
+    they arrive, so the table is never held in memory at once.
+
+    ...
+
+    Parameters
+    ----------
+    path : String
+        root directory of the bar stores
+    datatable : String, optional (default : 'futures')
+        'futures' or 'securities'
+    bar : String, optional (default : 'daily')
+        type of bar data to export
+    identifiers : list, optional
+        identifiers to export, every identifier in the table if None
+    start_date : String, optional
+        a YYYY-MM-DD string representing a start date
+    end_date : String, optional
+        a YYYY-MM-DD string representing a end date
+    credentials : dictionary, optional
+        credentials to pass into the connector
+    chunk_size : Integer, optional (default : 50)
+        identifiers per query
+    threads : Integer, optional (default : 4)
+        number of concurrent queries
+
+    Returns
+    -------
+    BarStore
+    """
+    if datatable not in BAR_STORE_FEEDS:
+        raise ValueError(f'Can not export {datatable}, only {list(BAR_STORE_FEEDS)} are supported')
+    feed, identity_field, fields = BAR_STORE_FEEDS[datatable]
+    if identifiers is None:
+        query = f"select distinct {identity_field} from ts_{bar}_{datatable};"
+        identifiers = sorted(CustomFeed(query, credentials = credentials).data[identity_field].tolist())
+
+    writer = _BarStoreWriter(path, datatable, bar, fields)
+    pipeline = PrefetchPipeline(feed, fields, concurrency = threads, chunk_size = chunk_size, start_date = start_date, end_date = end_date, bar = bar, credentials = credentials, force_fast = True)
+    for chunk, split in pipeline.run(identifiers):
+        print('Exported', chunk[0], '->', chunk[-1], pipeline.progress)
+        writer.append(split)
+    if len(pipeline.errors) > 0:
+        writer.discard()
+        chunk, error, trace = pipeline.errors[0]
+        raise ValueError(f'Unable to export {chunk[0]} -> {chunk[-1]} ({error!r}), no store was written\n{trace}')
+    return writer.close()
@@ -0,0 +1,179 @@
+from urllib.parse import quote
+from time import time
+
+import pandas as pd
+import numpy as np
+import shutil
+import json
+import os
+
+__all__ = ['FeedCache', 'set_feed_cache']
+
+
+class FeedCache():
+    """
+    A FeedCache is an on-disk columnar cache of time series feeds. Every (datatable, bar, identifier) gets its
+    own directory holding one memory-mappable .npy file per field plus the int64 dates, and a meta.json
+    recording which date range has been fetched from the database. A request is answered from disk when it is
+    covered, otherwise only the missing head (before the cached range) and tail (after the last date known to be
+    complete, at most yesterday) are fetched and merged in. Entries are evicted least recently used first once the cache is larger than
+    max_bytes.
+
+    ...
+
+    Parameters
+    ----------
+    path : String
+        root directory of the cache
+    max_bytes : Integer, optional
+        maximum size of the cache on disk, unbounded if None
+
+    Attributes
+    ----------
+    default : FeedCache, None
+        the cache TSFeeds use when none is passed in, see set_feed_cache
+
+    Methods
+    -------
+    missing(datatable : String, bar : String, identifier : String, fields : list, start_date : String, end_date : String)
+        returns what must be fetched to answer the request, [] if it is covered: ('full', None), ('head', before)
+        for the rows before the cached range and ('tail', after) for the rows after the last complete date
+    load(datatable : String, bar : String, identifier : String, fields : list, start_date : String, end_date : String)
+        returns (dates, {field : values}) of the cached request
+    store(datatable : String, bar : String, identifier : String, dates : np.Array, columns : dict, start_date : String, end_date : String, checked : Boolean)
+        merges freshly fetched rows into the entry, if checked the database was queried up to end_date so no
+        rows are missing up to min(end_date, yesterday)
+    evict()
+        removes least recently used entries until the cache is under max_bytes
+    clear()
+        removes every entry
+    """
+    default = None
+
+    def __init__(self, path, max_bytes = None):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok = True)
+
+    def _entry(self, datatable, bar, identifier):
+        return os.path.join(self.path, quote(str(datatable), safe = ''), quote(str(bar), safe = ''), quote(str(identifier), safe = ''))
+
+    def _meta(self, entry):
+        try:
+            with open(os.path.join(entry, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _stamp(date):
+        return None if date is None else pd.Timestamp(date).value
+
+    def missing(self, datatable, bar, identifier, fields, start_date, end_date):
+        meta = self._meta(self._entry(datatable, bar, identifier))
+        if meta is None or meta['last'] is None or not set(fields).issubset(meta['fields']):
+            return [('full', None)]
+
+        start, end = self._stamp(start_date), self._stamp(end_date)
+        ranges = []
+        if meta['start'] is not None and (start is None or start < meta['start']):
+            ranges.append(('head', pd.Timestamp(meta['start'])))
+        checked = max(meta['last'], meta.get('checked') or meta['last'])
+        if end is None or end > checked:
+            ranges.append(('tail', pd.Timestamp(checked)))
+        return ranges
+
+    def load(self, datatable, bar, identifier, fields, start_date, end_date):
+        entry = self._entry(datatable, bar, identifier)
+        meta = self._meta(entry)
+        dates = np.load(os.path.join(entry, 'date.npy'), mmap_mode = 'r')
+        if meta is None or len(dates) != meta['rows']:
+            raise ValueError(f'The cache entry for {identifier} is incomplete')
+        lo = 0 if start_date is None else np.searchsorted(dates, self._stamp(start_date), side = 'left')
+        hi = len(dates) if end_date is None else np.searchsorted(dates, self._stamp(end_date), side = 'right')
+        columns = {f: np.load(os.path.join(entry, f'{f}.npy'), mmap_mode = 'r')[lo:hi] for f in fields}
+        os.utime(os.path.join(entry, 'meta.json'))
+        return dates[lo:hi], columns
+
+    def _save(self, entry, name, array):
+        tmp = os.path.join(entry, f'.{name}.{os.getpid()}.npy')
+        np.save(tmp, array)
+        os.replace(tmp, os.path.join(entry, f'{name}.npy'))
+
+    def store(self, datatable, bar, identifier, dates, columns, start_date, end_date = None, checked = True):
+        entry = self._entry(datatable, bar, identifier)
+        meta = self._meta(entry)
+        dates = np.asarray(dates, dtype = np.int64)
+        columns = {f: np.asarray(v, dtype = np.float64) for f, v in columns.items()}
+        start = self._stamp(start_date)
+        if checked:
+            yesterday = (pd.Timestamp.now().normalize() - pd.Timedelta(days = 1)).value
+            checked = yesterday if end_date is None else min(self._stamp(end_date), yesterday)
+        else:
+            checked = None
+
+        if meta is not None and set(columns).issubset(meta['fields']) and os.path.exists(os.path.join(entry, 'date.npy')):
+            old_dates = np.load(os.path.join(entry, 'date.npy'))
+            keep = ~np.isin(old_dates, dates)
+            dates = np.concatenate([old_dates[keep], dates])
+            columns = {f: np.concatenate([np.load(os.path.join(entry, f'{f}.npy'))[keep], v]) for f, v in columns.items()}
+            start = None if meta['start'] is None or start is None else min(meta['start'], start)
+            checked = max([c for c in [meta.get('checked'), checked] if c is not None], default = None)
+
+        order = np.argsort(dates, kind = 'stable')
+        dates = dates[order]
+        os.makedirs(entry, exist_ok = True)
+        for f, v in columns.items():
+            self._save(entry, f, v[order])
+        self._save(entry, 'date', dates)
+
+        meta = {
+            'fields': list(columns),
+            'start': start,
+            'last': int(dates[-1]) if len(dates) > 0 else None,
+            'checked': checked,
+            'rows': len(dates),
+            'bytes': int(dates.nbytes * (len(columns) + 1)),
+            'stored': time(),
+        }
+        tmp = os.path.join(entry, f'.meta.{os.getpid()}.json')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(entry, 'meta.json'))
+
+    def entries(self):
+        for table in os.scandir(self.path):
+            if not table.is_dir():
+                continue
+            for bar in os.scandir(table.path):
+                if not bar.is_dir():
+                    continue
+                for entry in os.scandir(bar.path):
+                    meta = os.path.join(entry.path, 'meta.json')
+                    if entry.is_dir() and os.path.exists(meta):
+                        yield entry.path, os.path.getmtime(meta), self._meta(entry.path)
+
+    @property
+    def size(self):
+        return sum([meta['bytes'] for _, _, meta in self.entries() if meta is not None])
+
+    def evict(self):
+        if self.max_bytes is None:
+            return
+        entries = sorted([(used, path, meta['bytes']) for path, used, meta in self.entries() if meta is not None])
+        size = sum([e[2] for e in entries])
+        for _, path, nbytes in entries:
+            if size <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors = True)
+            size -= nbytes
+
+    def clear(self):
+        for path, _, _ in list(self.entries()):
+            shutil.rmtree(path, ignore_errors = True)
+
+
+def set_feed_cache(path, max_bytes = None):
+    """sets (or with path = None removes) the FeedCache every TSFeed consults by default, returns it"""
+    FeedCache.default = None if path is None else FeedCache(path, max_bytes = max_bytes)
+    return FeedCache.default
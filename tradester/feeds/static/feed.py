@@ -1,5 +1,9 @@
 import tradester.utils.svconfig as sv
+from .cache import FeedCache
+from .fetch import fetch_columns
+from .loader import split_frame, wide_frame
 import pandas as pd
+import numpy as np
 import tempfile
 import warnings
 import subprocess
@@ -46,9 +50,12 @@ class Feed():
         ensure that identifiers past in is valid entry type, allow try_tmp_query and set type
     __tmp_query(query : String)
         returns pd.DataFrame using a copy into local memory table to create dataframe, works best for large
-        amount of data pulled
+        amount of data pulled. Postgres uses a binary COPY (or ADBC) parsed straight into typed columns and
+        only falls back to a csv copy for unsupported column types
+    _query_columns(query : String)
+        returns the query result as a dictionary of typed np.Arrays (see tradester.feeds.static.fetch)
     __pd_query(query : String)
-        returns pd.read_sql_query(query, ...)
+        returns pd.read_sql_query(query, ...) on the pooled engine
     _query(query : String)
         handles potential errors with tmp_query, if error tries pd_query, if another error kills thread
 
@@ -92,22 +99,25 @@ class Feed():
     def __tmp_query(self, query):
         if self.connector.credentials['s_type'] != 'mssql+pyodbc':
             query = query.replace(';','')
-            cnx = self.connector.engine().raw_connection()
-            cur = cnx.cursor()
-            if self.connector.s_type == 'postgres':
-                with tempfile.TemporaryFile() as tmpfile:
-                    copy_sql = "copy ({}) to stdout with csv {}".format(query, "HEADER")
-                    cur.copy_expert(copy_sql, file=tmpfile)
-                    tmpfile.seek(0)
-                    cnx.close()
+            try:
+                return pd.DataFrame(self._query_columns(query))
+            except ValueError as e:
+                fallback = "a csv copy" if self.connector.s_type == 'postgres' else "fetching rows"
+                warnings.warn(f"Unable to fetch typed columns ({e}), alternating to {fallback}", RuntimeWarning)
+            with self.connector.connect() as cnx:
+                cur = cnx.cursor()
+                try:
+                    if self.connector.s_type == 'postgres':
+                        with tempfile.TemporaryFile() as tmpfile:
+                            copy_sql = "copy ({}) to stdout with csv {}".format(query, "HEADER")
+                            cur.copy_expert(copy_sql, file=tmpfile)
+                            tmpfile.seek(0)
+                            return pd.read_csv(tmpfile)
+                    cur.execute(query)
+                    columns = [i[0] for i in cur.description]
+                    return pd.DataFrame(cur.fetchall(), columns = columns)
+                finally:
                     cur.close()
-                    return pd.read_csv(tmpfile)
-            else:
-                cur.execute(query)
-                columns = [i[0] for i in cur.description]
-                data = cur.fetchall()
-                df = pd.DataFrame(data, columns = columns)
-                return df
         else:
             query = query.replace(';','')
             path = f'c:/users/will/appdata/local/temp/{str(datetime.now().timestamp()).replace(".","-")}.csv'
@@ -129,9 +139,11 @@ class Feed():
 
             
 
+    def _query_columns(self, query):
+        return fetch_columns(self.connector, query)
+
     def __pd_query(self, query):
-        cnx = self.connector.cnx()
-        return pd.read_sql_query(query, self.connector.cnx()) 
+        return pd.read_sql_query(query, self.connector.engine())
 
 
     def _query(self, query):
@@ -220,22 +232,55 @@ class TSFeed(Feed):
         ignore identifiers input, pass in empty list from constructor
     force_fast : boolean, optional (default : False)
         force use of __tmp_query
+    feed_cache : tradester.feeds.static.FeedCache, optional
+        on-disk cache to answer the query from, FeedCache.default (see set_feed_cache) if None
     
+    Attributes
+    ----------
+    split : dict
+        identifier -> (np.Array (datetime64[ns]) of dates, {field : np.Array}), the query result split by identifier
+        with one sort (see tradester.feeds.static.loader.split_columns)
+    data : pd.DataFrame
+        the split laid out by date, with (identifier, field) columns if there are multiple identifiers, built on
+        first access
+
     Methods
     -------
     __gather_data()
-        returns dataframe using query type, from the proper datatable format
+        returns the split of the query result, from the proper datatable format
+    _fetch()
+        returns the query result as a DataFrame of date, identity_field and field columns, from the feed cache
+        if there is one
+    _calendar()
+        returns the sorted distinct dates (np.Array of datetime64[ns]) the query would return, without fetching
+        any fields
+    __cached_query(cache : FeedCache, fields : list)
+        returns the same rows as the query, fetching only what the cache is missing
     """
     
 
-    def __init__(self, identifiers, fields, datatable, identity_field, credentials, bar, start_date, end_date, override = False, optional_id = False, force_fast = False):
+    def __init__(self, identifiers, fields, datatable, identity_field, credentials, bar, start_date, end_date, override = False, optional_id = False, force_fast = False, feed_cache = None):
         db = f'ts_{bar}_{datatable}' if bar is not None else f'ts_{datatable}'
         super().__init__(identifiers, fields, db, identity_field, credentials, optional_id = optional_id)
         self.bar = bar
         self.try_tmp_query = force_fast or len(identifiers) > 5
         self.start_date = start_date
         self.end_date = end_date
-        self._data = None if override else self.__gather_data() 
+        self.feed_cache = feed_cache
+        self._data = None
+        self._split = None if override else self.__gather_data() 
+
+    @property
+    def data(self):
+        if self._data is None and self._split is not None:
+            self._data = wide_frame(self._split, by_identifier = self.identifiers_type is list and len(self.identifiers) > 1, identity_field = self.identity_field)
+        return super().data
+
+    @property
+    def split(self):
+        if self._split is None:
+            raise NotImplementedError("You did not set ``_split``")
+        return self._split
 
     def __handle_fields(self, query):
         if self.connector.credentials['s_type'] == 'mssql+pyodbc':
@@ -247,32 +292,88 @@ class TSFeed(Feed):
             query = query.replace("open_interest", f"{self.datatable}.[open_interest] as 'open_interest'")
         return query
 
-    def __gather_data(self):
-        self.complete_fields = f'date, {self.identity_field}, {self.fields}'
-        if self.identifiers_type is list:
-            query = "select date, {}, {} from {} where {} in ({})".format(self.identity_field, self.__handle_fields(self.fields), self.datatable, self.identity_field, str(self.identifiers).strip('[]'))
+    def __build_query(self, identifiers, after = None, before = None):
+        if type(identifiers) is list:
+            query = "select date, {}, {} from {} where {} in ({})".format(self.identity_field, self.__handle_fields(self.fields), self.datatable, self.identity_field, str(identifiers).strip('[]'))
         else:
-            query = "select date, {}, {} from {} where {} = '{}'".format(self.identity_field, self.__handle_fields(self.fields), self.datatable, self.identity_field, self.identifiers)
+            query = "select date, {}, {} from {} where {} = '{}'".format(self.identity_field, self.__handle_fields(self.fields), self.datatable, self.identity_field, identifiers)
         
-        if self.start_date:
+        date_format = '%Y-%m-%d' if self.bar == 'daily' else '%Y-%m-%d %H:%M:%S'
+        if after is not None:
+            query += " and date > '{}'".format(after.strftime(date_format))
+        elif self.start_date:
             query += " and date >= '{}'".format(self.start_date)
-        if self.end_date:
+        if before is not None:
+            query += " and date < '{}'".format(before.strftime(date_format))
+        elif self.end_date:
             query += " and date <= '{}'".format(self.end_date)
+        return query
 
-        date_format = '%Y-%m-%d' if self.bar == 'daily' else '%Y-%m-%d %H:%M'
-        df = self._query(query).set_index(['date', self.identity_field]).stack().reset_index()
-        df.columns = ['date', self.identity_field, 'field', 'value']
-
-        if self.identifiers_type is list and len(self.identifiers) > 1:
-            cols = [self.identity_field, 'field']
-        else:
-            cols = 'field'
-        
-        df = df.pivot_table(index = 'date', columns = cols, values = 'value')
-        df.index = pd.to_datetime(df.index, format=date_format)
+    def _calendar(self):
+        self.complete_fields = 'date'
+        query = self.__build_query(self.identifiers).replace("select date, {}, {} from".format(self.identity_field, self.__handle_fields(self.fields)), "select distinct date from", 1)
+        df = self._query(query)
+        return np.unique(pd.to_datetime(df['date']).values.astype('datetime64[ns]'))
+
+    def __cached_query(self, cache, fields):
+        identifiers = self.identifiers if self.identifiers_type is list else [self.identifiers]
+        full, heads, tails = [], {}, {}
+        for i in identifiers:
+            for kind, bound in cache.missing(self.datatable, self.bar, i, fields, self.start_date, self.end_date):
+                if kind == 'full':
+                    full.append(i)
+                elif kind == 'head':
+                    heads[i] = bound
+                else:
+                    tails[i] = bound
+
+        fetches = []
+        if len(full) > 0:
+            fetches.append((full, self.__build_query(full), self.start_date, True))
+        if len(heads) > 0:
+            fetches.append((list(heads), self.__build_query(list(heads), before = max(heads.values())), self.start_date, False))
+        if len(tails) > 0:
+            after = min(tails.values())
+            fetches.append((list(tails), self.__build_query(list(tails), after = after), after, True))
+
+        for group, query, start, checked in fetches:
+            df = self._query(query)
+            ids = df[self.identity_field].values
+            dates = pd.to_datetime(df['date']).values.astype('datetime64[ns]').view(np.int64)
+            values = df[fields].to_numpy(dtype = np.float64)
+            for i in group:
+                rows = ids == i
+                cache.store(self.datatable, self.bar, i, dates[rows], {f: values[rows, k] for k, f in enumerate(fields)}, start, end_date = self.end_date, checked = checked)
+        frames = []
+        for i in identifiers:
+            dates, columns = cache.load(self.datatable, self.bar, i, fields, self.start_date, self.end_date)
+            frame = pd.DataFrame({f: np.asarray(v) for f, v in columns.items()})
+            frame.insert(0, self.identity_field, i)
+            frame.insert(0, 'date', np.asarray(dates).view('datetime64[ns]'))
+            frames.append(frame)
+        if len(fetches) > 0:
+            cache.evict()
+        return pd.concat(frames, ignore_index = True)
+
+    def _fetch(self):
+        self.complete_fields = f'date, {self.identity_field}, {self.fields}'
+        cache = self.feed_cache if self.feed_cache is not None else FeedCache.default
+        fields = [f.strip() for f in self.fields.split(',')]
 
+        df = None
+        if cache is not None and '*' not in fields:
+            try:
+                df = self.__cached_query(cache, fields)
+            except Exception as e:
+                warnings.warn(f"Unable to use the feed cache ({e}), querying the database directly", RuntimeWarning)
+        if df is None:
+            df = self._query(self.__build_query(self.identifiers))
         return df
 
+    def __gather_data(self):
+        fields = [f.strip() for f in self.fields.split(',')]
+        return split_frame(self._fetch(), self.identity_field, fields = None if '*' in fields else fields, name = f'rows in {self.datatable}')
+
 class CustomFeed(Feed):
     """
     Custom Feeds class (input query) 
@@ -0,0 +1,384 @@
+from ...utils.compilation import lazy_jit, register_warmup
+
+import functools
+import numpy as np
+
+__all__ = ['fetch_columns', 'parse_copy_binary', 'PG_TYPES']
+
+# postgres type oid -> parser kind
+PG_TYPES = {
+    16: 'bool',
+    20: 'int8',
+    21: 'int2',
+    23: 'int4',
+    700: 'float4',
+    701: 'float8',
+    1700: 'numeric',
+    1082: 'date',
+    1114: 'timestamp',
+    1184: 'timestamp',
+    25: 'text',
+    1042: 'text',
+    1043: 'text',
+}
+
+_KINDS = {'bool': 0, 'int2': 1, 'int4': 2, 'int8': 3, 'float4': 4, 'float8': 5, 'numeric': 6, 'date': 7, 'timestamp': 8, 'text': 9}
+_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+
+
+@lazy_jit(nopython = True, cache = True)
+def _u16(b, p):
+    return (np.int64(b[p]) << 8) | np.int64(b[p + 1])
+
+
+@lazy_jit(nopython = True, cache = True)
+def _i16(b, p):
+    v = _u16(b, p)
+    return v - 65536 if v >= 32768 else v
+
+
+@lazy_jit(nopython = True, cache = True)
+def _i32(b, p):
+    v = (np.int64(b[p]) << 24) | (np.int64(b[p + 1]) << 16) | (np.int64(b[p + 2]) << 8) | np.int64(b[p + 3])
+    return v - 4294967296 if v >= 2147483648 else v
+
+
+@lazy_jit(nopython = True, cache = True)
+def _u64(b, p):
+    v = np.uint64(0)
+    for k in range(8):
+        v = (v << np.uint64(8)) | np.uint64(b[p + k])
+    return v
+
+
+@lazy_jit(nopython = True, cache = True)
+def _scan(b, start, kinds):
+    # complete tuples from start: their number, the position after the last of them, their text bytes and
+    # whether the trailer was reached, a tuple cut by the end of b is left for the next chunk
+    p = start
+    n = 0
+    text = 0
+    while p + 2 <= len(b):
+        fields = _i16(b, p)
+        if fields == -1:
+            return n, p + 2, text, True
+        q = p + 2
+        size = 0
+        for c in range(fields):
+            if q + 4 > len(b):
+                return n, p, text, False
+            length = _i32(b, q)
+            q += 4
+            if length > 0:
+                q += length
+                if kinds[c] == 9:
+                    size += length
+        if q > len(b):
+            break
+        p = q
+        n += 1
+        text += size
+    return n, p, text, False
+
+
+@lazy_jit(nopython = True, cache = True)
+def _parse(b, start, n, row, kinds, slots, floats, times, hashes, offsets, lengths, text, position, scratch):
+    word = scratch.view(np.uint64)
+    single = scratch[:4].view(np.uint32)
+    double = scratch.view(np.float64)
+    real = scratch[:4].view(np.float32)
+    p = start
+    for r in range(row, row + n):
+        fields = _i16(b, p)
+        p += 2
+        for c in range(fields):
+            length = _i32(b, p)
+            p += 4
+            kind = kinds[c]
+            slot = slots[c]
+            if kind == 9:
+                h = np.uint64(14695981039346656037)
+                if length < 0:
+                    h = np.uint64(0)
+                for k in range(max(length, 0)):
+                    h = (h ^ np.uint64(b[p + k])) * np.uint64(1099511628211)
+                    text[position + k] = b[p + k]
+                hashes[slot, r] = h
+                offsets[slot, r] = position
+                lengths[slot, r] = length
+                position += max(length, 0)
+            elif length < 0:
+                if kind >= 7:
+                    times[slot, r] = -9223372036854775808
+                else:
+                    floats[slot, r] = np.nan
+            elif kind == 0:
+                floats[slot, r] = 1.0 if b[p] != 0 else 0.0
+            elif kind == 1:
+                floats[slot, r] = _i16(b, p)
+            elif kind == 2:
+                floats[slot, r] = _i32(b, p)
+            elif kind == 3:
+                word[0] = _u64(b, p)
+                floats[slot, r] = word.view(np.int64)[0]
+            elif kind == 4:
+                single[0] = np.uint32(_i32(b, p) & 0xFFFFFFFF)
+                floats[slot, r] = real[0]
+            elif kind == 5:
+                word[0] = _u64(b, p)
+                floats[slot, r] = double[0]
+            elif kind == 6:
+                ndigits = _i16(b, p)
+                weight = _i16(b, p + 2)
+                sign = _u16(b, p + 4)
+                if sign == 0xC000:
+                    floats[slot, r] = np.nan
+                else:
+                    v = 0.0
+                    for k in range(ndigits):
+                        v = v * 10000.0 + _u16(b, p + 8 + 2 * k)
+                    v *= 10000.0 ** (weight - ndigits + 1)
+                    floats[slot, r] = -v if sign == 0x4000 else v
+            elif kind == 7:
+                times[slot, r] = (_i32(b, p) + 10957) * 86400000000000
+            elif kind == 8:
+                word[0] = _u64(b, p)
+                times[slot, r] = (word.view(np.int64)[0] + 946684800000000) * 1000
+            p += max(length, 0)
+    return position
+
+
+@lazy_jit(nopython = True, cache = True)
+def _same_bytes(b, offsets, lengths, representatives):
+    for r in range(len(offsets)):
+        i = representatives[r]
+        if lengths[r] != lengths[i]:
+            return False
+        for k in range(max(lengths[r], 0)):
+            if b[offsets[r] + k] != b[offsets[i] + k]:
+                return False
+    return True
+
+
+def _decode(b, hashes, offsets, lengths):
+    # text is grouped by hash, every row is checked against the first row of its group so a collision (or a
+    # string hashing to 0 like NULL) falls back to grouping on the bytes themselves
+    unique, first, inverse = np.unique(hashes, return_index = True, return_inverse = True)
+    if not _same_bytes(b, offsets, lengths, first[inverse]):
+        keys = [None if lengths[r] < 0 else bytes(b[offsets[r]:offsets[r] + lengths[r]]) for r in range(len(offsets))]
+        codes = {}
+        inverse = np.array([codes.setdefault(k, len(codes)) for k in keys], dtype = np.int64)
+        first = np.unique(inverse, return_index = True)[1]
+    values = np.empty(len(first), dtype = object)
+    for k, i in enumerate(first):
+        values[k] = None if lengths[i] < 0 else bytes(b[offsets[i]:offsets[i] + lengths[i]]).decode()
+    return values[inverse]
+
+
+def parse_copy_binary(data, names, types):
+    """
+    Parses the output of COPY ... TO STDOUT WITH (FORMAT BINARY) into typed columns without going through text.
+
+    ...
+
+    Parameters
+    ----------
+    data : bytes, bytearray, memoryview
+        the full COPY output
+    names : list
+        column names
+    types : list
+        parser kind of every column (see PG_TYPES), numbers are float64 (NaN for NULL), dates and timestamps
+        datetime64[ns] (NaT for NULL) and text an object array
+
+    Returns
+    -------
+    dict of column name -> np.Array
+    """
+    parser = _CopyParser(names, types)
+    parser.write(data)
+    return parser.columns()
+
+
+class _CopyParser():
+    """
+    File-like sink for cursor.copy_expert parsing a binary COPY as its chunks arrive. Complete tuples are
+    written into typed column buffers growing by doubling, text is copied into one byte buffer, and only the
+    partial tuple at the end of a chunk is carried over to the next one, so the whole output is never held.
+
+    ...
+
+    Parameters
+    ----------
+    names : list
+        column names
+    types : list
+        parser kind of every column (see PG_TYPES)
+
+    Methods
+    -------
+    write(chunk)
+        parses the complete tuples of carry + chunk
+    columns()
+        returns the parsed columns as a dict of column name -> np.Array
+    """
+
+    def __init__(self, names, types):
+        self.names = names
+        self.kinds = np.array([_KINDS[t] for t in types], dtype = np.int64)
+        groups = [k == 9 for k in self.kinds], [7 <= k <= 8 for k in self.kinds], [k < 7 for k in self.kinds]
+        self.slots = np.zeros(len(self.kinds), dtype = np.int64)
+        for group in groups:
+            self.slots[np.flatnonzero(group)] = np.arange(sum(group))
+        n_text, n_time, n_float = [sum(g) for g in groups]
+
+        self.n = 0
+        self.capacity = 0
+        self.floats = np.empty((n_float, 0))
+        self.times = np.empty((n_time, 0), dtype = np.int64)
+        self.hashes = np.empty((n_text, 0), dtype = np.uint64)
+        self.offsets = np.empty((n_text, 0), dtype = np.int64)
+        self.lengths = np.empty((n_text, 0), dtype = np.int64)
+        self.text = np.empty(0, dtype = np.uint8)
+        self.position = 0
+        self.carry = b''
+        self.started = False
+        self.done = False
+        self.scratch = np.zeros(8, dtype = np.uint8)
+
+    def __grow(self, a, capacity):
+        grown = np.empty(a.shape[:-1] + (capacity,), dtype = a.dtype)
+        grown[..., :self.n] = a[..., :self.n]
+        return grown
+
+    def __reserve(self, rows, text):
+        if rows > self.capacity:
+            self.capacity = max(rows, 2 * self.capacity)
+            for name in ['floats', 'times', 'hashes', 'offsets', 'lengths']:
+                setattr(self, name, self.__grow(getattr(self, name), self.capacity))
+        if text > len(self.text):
+            grown = np.empty(max(text, 2 * len(self.text)), dtype = np.uint8)
+            grown[:self.position] = self.text[:self.position]
+            self.text = grown
+
+    def write(self, chunk):
+        if self.done:
+            return len(chunk)
+        b = np.frombuffer(self.carry + bytes(chunk) if self.carry else chunk, dtype = np.uint8)
+        start = 0
+        if not self.started:
+            if len(b) >= 11 and bytes(b[:11]) != _SIGNATURE:
+                raise ValueError('The input is not in the postgres binary COPY format')
+            if len(b) < 19 or len(b) < 19 + _i32(b, 15):
+                self.carry = bytes(b)
+                return len(chunk)
+            start = 19 + _i32(b, 15)
+            self.started = True
+
+        n, end, text, self.done = _scan(b, start, self.kinds)
+        self.__reserve(self.n + n, self.position + text)
+        self.position = _parse(
+            b, start, n, self.n, self.kinds, self.slots, self.floats, self.times, self.hashes, self.offsets,
+            self.lengths, self.text, self.position, self.scratch
+        )
+        self.n += n
+        self.carry = bytes(b[end:]) if not self.done else b''
+        return len(chunk)
+
+    def columns(self):
+        if not self.started:
+            raise ValueError('The input is not in the postgres binary COPY format')
+        if len(self.carry) > 0:
+            raise ValueError('The COPY output ends in the middle of a tuple')
+        columns = {}
+        for name, kind, slot in zip(self.names, self.kinds, self.slots):
+            if kind == 9:
+                columns[name] = _decode(self.text, self.hashes[slot, :self.n], self.offsets[slot, :self.n], self.lengths[slot, :self.n])
+            elif kind >= 7:
+                columns[name] = self.times[slot, :self.n].view('datetime64[ns]')
+            else:
+                columns[name] = self.floats[slot, :self.n]
+        return columns
+
+
+def _fetch_copy(cnx, query):
+    cur = cnx.cursor()
+    try:
+        cur.execute("select * from ({}) as q limit 0".format(query))
+        names = [d[0] for d in cur.description]
+        types = [PG_TYPES.get(d[1]) for d in cur.description]
+        if None in types:
+            raise ValueError(f'Unsupported column types for a binary COPY: {[d[0] for d in cur.description if d[1] not in PG_TYPES]}')
+        parser = _CopyParser(names, types)
+        cur.copy_expert("copy ({}) to stdout with (format binary)".format(query), parser)
+    finally:
+        cur.close()
+    return parser.columns()
+
+
+@functools.lru_cache(maxsize = None)
+def _adbc():
+    # imported on first use, pyarrow takes longer to import than the rest of tradester
+    try:
+        import adbc_driver_postgresql.dbapi as adbc
+    except:
+        adbc = None
+    return adbc
+
+
+def _fetch_arrow(connector, query):
+    with connector.arrow() as cnx:
+        with cnx.cursor() as cur:
+            cur.execute(query)
+            table = cur.fetch_arrow_table()
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def _fetch_rows(cnx, query):
+    cur = cnx.cursor()
+    try:
+        cur.execute(query)
+        names = [d[0] for d in cur.description]
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    if len(rows) == 0:
+        return {name: np.empty(0) for name in names}
+    return {name: np.array(column) for name, column in zip(names, zip(*rows))}
+
+
+def fetch_columns(connector, query, arrow = True):
+    """
+    Runs query and returns its result as typed columns. Postgres uses ADBC (Arrow) if adbc_driver_postgresql is
+    installed and arrow is True, otherwise a binary COPY parsed by parse_copy_binary. Other servers fetch rows
+    with a cursor and transpose them into arrays.
+
+    ...
+
+    Parameters
+    ----------
+    connector : tradester.utils.svconfig.connector
+        connector of the database
+    query : String
+        select statement (without a trailing ;)
+    arrow : boolean, optional (default : True)
+        use ADBC when it is available
+
+    Returns
+    -------
+    dict of column name -> np.Array
+    """
+    query = query.replace(';', '')
+    if connector.s_type == 'postgres' and arrow and _adbc() is not None:
+        return _fetch_arrow(connector, query)
+    with connector.connect() as cnx:
+        if connector.s_type == 'postgres':
+            return _fetch_copy(cnx, query)
+        return _fetch_rows(cnx, query)
+
+
+@register_warmup
+def _warmup():
+    # a COPY output holding no rows: signature, flags, header extension length and the trailer
+    empty = _SIGNATURE + (0).to_bytes(4, 'big') + (0).to_bytes(4, 'big') + (-1).to_bytes(2, 'big', signed = True)
+    parse_copy_binary(empty, list(_KINDS), list(_KINDS))
@@ -9,5 +9,5 @@ class FuturesMeta(MetaFeed):
 
 class FuturesTS(TSFeed):
 
-    def __init__(self, identifiers, fields = 'open, high, low, close, volume', start_date = None, end_date = None, bar = 'daily', credentials = None, force_fast = True):
-        super().__init__(identifiers, fields, "futures", "contract", credentials, bar, start_date, end_date, force_fast = force_fast)
+    def __init__(self, identifiers, fields = 'open, high, low, close, volume', start_date = None, end_date = None, bar = 'daily', credentials = None, force_fast = True, feed_cache = None, override = False):
+        super().__init__(identifiers, fields, "futures", "contract", credentials, bar, start_date, end_date, force_fast = force_fast, feed_cache = feed_cache, override = override)
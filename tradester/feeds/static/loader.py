@@ -0,0 +1,99 @@
+import pandas as pd
+import numpy as np
+
+__all__ = ['split_columns', 'split_frame', 'wide_frame']
+
+
+def split_columns(ids, dates, columns, name = 'rows'):
+    """
+    Splits long query output into per identifier column arrays with one sort by (identifier, date), without
+    stacking or pivoting. Rows where every field is NaN are dropped, as are fields that are NaN for every row of an
+    identifier. Duplicate (identifier, date) rows are printed, like the chunks the factories are unable to load (a
+    warning would be hidden by the Engine's warning filter), and the last one is kept rather than averaged.
+
+    ...
+
+    Parameters
+    ----------
+    ids : np.Array
+        identifier of every row
+    dates : np.Array
+        date of every row, anything pd.to_datetime understands
+    columns : dict
+        field -> np.Array of values of every row
+    name : String, optional (default : 'rows')
+        what the rows are, used when reporting duplicates
+
+    Returns
+    -------
+    dict of identifier -> (np.Array (datetime64[ns]) of sorted dates, {field : np.Array (float64)})
+    """
+    ids = np.asarray(ids)
+    dates = pd.to_datetime(np.asarray(dates)).values.astype('datetime64[ns]').view(np.int64)
+    fields = list(columns)
+    values = np.empty((len(fields), len(dates)))
+    for k, f in enumerate(fields):
+        values[k] = np.asarray(columns[f], dtype = np.float64)
+
+    keep = ~np.all(np.isnan(values), axis = 0) if len(fields) > 0 else np.ones(len(dates), dtype = bool)
+    keys, codes = np.unique(ids[keep], return_inverse = True)
+    keys = keys.tolist()
+    dates, values = dates[keep], values[:, keep]
+    order = np.lexsort((dates, codes))
+    codes, dates, values = codes[order], dates[order], values[:, order]
+
+    same = (codes[1:] == codes[:-1]) & (dates[1:] == dates[:-1])
+    if same.any():
+        duplicated = np.flatnonzero(same)
+        examples = ', '.join([f'{keys[codes[i]]} @ {pd.Timestamp(dates[i])}' for i in duplicated[:5]])
+        print(f'Found {len(duplicated)} duplicate (identifier, date) {name}, keeping the last of each: {examples}{", ..." if len(duplicated) > 5 else ""}')
+        last = np.concatenate([~same, [True]])
+        codes, dates, values = codes[last], dates[last], values[:, last]
+
+    bounds = np.concatenate([[0], np.flatnonzero(codes[1:] != codes[:-1]) + 1, [len(codes)]])
+    split = {}
+    for k, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if hi == lo:
+            continue
+        block = values[:, lo:hi]
+        present = ~np.all(np.isnan(block), axis = 1)
+        split[keys[k]] = (dates[lo:hi].view('datetime64[ns]'), {f: block[j] for j, f in enumerate(fields) if present[j]})
+    return split
+
+
+def split_frame(df, identity_field, fields = None, date_field = 'date', name = 'rows'):
+    """
+    split_columns for a query DataFrame with a date column, an identity_field column and one column per field
+    (every other column if fields is None)
+    """
+    if fields is None:
+        fields = [c for c in df.columns if c not in [date_field, identity_field]]
+    columns = {f: df[f].to_numpy(dtype = np.float64, na_value = np.nan) for f in fields}
+    return split_columns(df[identity_field].to_numpy(), df[date_field].values, columns, name = name)
+
+
+def wide_frame(split, by_identifier = True, identity_field = None):
+    """
+    Builds a DataFrame indexed by the union of the dates of split (see split_columns) with (identifier, field)
+    columns, or only field columns if by_identifier is False, equivalent to pivoting the stacked rows.
+    """
+    keys = sorted(split)
+    if len(keys) == 0:
+        return pd.DataFrame(index = pd.DatetimeIndex([], name = 'date'))
+    index = np.unique(np.concatenate([split[k][0].view(np.int64) for k in keys]))
+    labels, blocks = [], []
+    for k in keys:
+        dates, columns = split[k]
+        rows = np.searchsorted(index, dates.view(np.int64))
+        for f in sorted(columns):
+            block = np.full(len(index), np.nan)
+            block[rows] = columns[f]
+            labels.append((k, f) if by_identifier else f)
+            blocks.append(block)
+
+    values = np.column_stack(blocks) if len(blocks) > 0 else np.empty((len(index), 0))
+    if by_identifier:
+        columns = pd.MultiIndex.from_tuples(labels, names = [identity_field, 'field'])
+    else:
+        columns = pd.Index(labels, name = 'field')
+    return pd.DataFrame(values, index = pd.DatetimeIndex(index.view('datetime64[ns]'), name = 'date'), columns = columns)
@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from traceback import format_exc
+from threading import Lock
+from time import perf_counter
+
+from .loader import split_frame
+
+__all__ = ['PrefetchPipeline', 'PipelineProgress']
+
+
+class PipelineProgress():
+    """
+    Counters of a PrefetchPipeline run, safe to read from any thread while it runs.
+
+    ...
+
+    Attributes
+    ----------
+    total : Integer
+        number of chunks in the run
+    in_flight : Integer
+        chunks whose query is running
+    fetched : Integer
+        chunks whose query has returned
+    decoded : Integer
+        chunks that were split and handed to the caller
+    failed : Integer
+        chunks whose query or split raised
+    rows : Integer
+        rows fetched so far
+    elapsed : float
+        seconds since the run started
+    rows_per_second : float
+        fetch throughput
+    chunks_per_second : float
+        decode throughput
+    """
+
+    def __init__(self, total = 0):
+        self.total = total
+        self.in_flight = 0
+        self.fetched = 0
+        self.decoded = 0
+        self.failed = 0
+        self.rows = 0
+        self._started = perf_counter()
+        self._lock = Lock()
+
+    def _add(self, **counts):
+        with self._lock:
+            for k, v in counts.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    @property
+    def elapsed(self):
+        return perf_counter() - self._started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / max(self.elapsed, 1e-9)
+
+    @property
+    def chunks_per_second(self):
+        return self.decoded / max(self.elapsed, 1e-9)
+
+    def __repr__(self):
+        return f'<PipelineProgress {self.decoded + self.failed}/{self.total} chunks ({self.in_flight} in flight, {self.failed} failed), {self.rows} rows, {self.rows_per_second:,.0f} rows/s>'
+
+
+class PrefetchPipeline():
+    """
+    A PrefetchPipeline overlaps the database round trips of many chunk queries with the decoding of the chunks
+    that already returned. Up to concurrency queries run at once on a thread pool (sharing the connector's
+    pooled engine), while the calling thread splits each completed chunk (see split_frame) and hands it back, so
+    the caller can build its workers while the remaining queries are still in flight. At most
+    concurrency + prefetch chunks are held at any time.
+
+    ...
+
+    Parameters
+    ----------
+    feed : tradester.feeds.static.TSFeed
+        the feed class to query with (ex: FuturesTS), called as feed(identifiers, fields = ..., override = True, **kwargs)
+    fields : list
+        fields to load
+    concurrency : Integer, optional (default : 4)
+        number of queries in flight, should not exceed the connector's pool size + max_overflow
+    chunk_size : Integer, optional (default : 50)
+        identifiers per query
+    prefetch : Integer, optional (default : concurrency)
+        completed chunks that may wait to be decoded
+    verbose : Boolean, optional (default : False)
+        print the progress after every chunk
+    **kwargs
+        passed on to feed
+
+    Attributes
+    ----------
+    progress : PipelineProgress
+        counters of the current (or last) run
+    errors : list
+        (identifiers, exception, traceback) of every chunk that failed during the last run
+
+    Methods
+    -------
+    chunks(identifiers : list)
+        returns identifiers split into chunks of chunk_size
+    run(identifiers : list)
+        yields (chunk, split) for every chunk as soon as it is fetched and decoded, in completion order
+    load(identifiers : list)
+        returns the merged split of every chunk
+    """
+
+    def __init__(self, feed, fields, concurrency = 4, chunk_size = 50, prefetch = None, verbose = False, **kwargs):
+        self.feed = feed
+        self.fields = list(fields)
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.prefetch = concurrency if prefetch is None else prefetch
+        self.verbose = verbose
+        self.kwargs = kwargs
+        self.progress = PipelineProgress()
+        self.errors = []
+
+    def chunks(self, identifiers):
+        return [identifiers[i:i + self.chunk_size] for i in range(0, len(identifiers), self.chunk_size)]
+
+    def _fetch(self, chunk):
+        self.progress._add(in_flight = 1)
+        try:
+            feed = self.feed(chunk, fields = ', '.join(self.fields), override = True, **self.kwargs)
+            df = feed._fetch()
+        finally:
+            self.progress._add(in_flight = -1)
+        self.progress._add(fetched = 1, rows = len(df))
+        return feed, df
+
+    def _decode(self, chunk, future):
+        try:
+            feed, df = future.result()
+            split = split_frame(df, feed.identity_field, fields = self.fields, name = f'rows in {feed.datatable}')
+        except Exception as e:
+            self.errors.append((chunk, e, format_exc()))
+            self.progress._add(failed = 1)
+            return None
+        self.progress._add(decoded = 1)
+        return split
+
+    def run(self, identifiers):
+        chunks = self.chunks(list(identifiers))
+        self.progress = PipelineProgress(len(chunks))
+        self.errors = []
+        pending = {}
+        with ThreadPoolExecutor(max_workers = max(self.concurrency, 1)) as pool:
+            queue = iter(chunks)
+            while True:
+                while len(pending) < self.concurrency + self.prefetch:
+                    chunk = next(queue, None)
+                    if chunk is None:
+                        break
+                    pending[pool.submit(self._fetch, chunk)] = chunk
+                if len(pending) == 0:
+                    break
+                done, _ = wait(pending, return_when = FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    split = self._decode(chunk, future)
+                    if self.verbose:
+                        print(self.progress)
+                    if split is not None:
+                        yield chunk, split
+
+    def load(self, identifiers):
+        split = {}
+        for _, s in self.run(identifiers):
+            split.update(s)
+        return split
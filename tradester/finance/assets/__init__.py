@@ -1,3 +1,4 @@
 from .future import *
 from .security import *
 from .option import *
+from .activation import *
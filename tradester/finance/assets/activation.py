@@ -0,0 +1,133 @@
+import pandas as pd
+import numpy as np
+
+__all__ = ['ActivationQueue']
+
+
+class ActivationQueue():
+    """
+    An ActivationQueue replaces the per bar start_date <= now < end_date comparisons of Asset.tradeable with
+    activation and expiry events on the clock calendar. When the calendar is known, the step at which every
+    registered asset becomes tradeable (its daily_start_date) and stops being tradeable (its daily_end_date,
+    never for assets with tradeable_override) is found with one searchsorted, and update() only flips the
+    cached flags of the assets whose event fires on the current step, returning them as add/remove deltas per
+    group (ex: per universe). If the clock skips steps, or is moved back, every flag is recomputed at once.
+    It is the one source of tradeable events: the Engine shares its queue with the universes, which read their
+    flags and deltas from it.
+
+    ...
+
+    Parameters
+    ----------
+    manager : ClockManager
+        the central clock, its master_ns calendar and index drive the queue
+
+    Attributes
+    ----------
+    groups : dict
+        name -> list of registered identifiers
+    step : Integer, None
+        clock index of the last update(), None if the clock was not on its calendar
+    calendar : np.Array, None
+        int64 nanosecond calendar the events were built on
+    incremental : Boolean
+        the last update() only applied the events of its step, so its deltas can be applied to the previous
+        tradeable identifiers, otherwise they should be reset
+    deltas : dict
+        the result of the last update()
+
+    Methods
+    -------
+    register(name : String, assets : list)
+        adds the assets of group name to the queue
+    update()
+        flips the flags of the assets whose events fire on the current step, returns {name : (added, removed)}
+    mask(name : String)
+        returns the tradeable flags of the assets of group name, in the order of groups[name]
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.groups = {}
+        self.step = None
+        self.calendar = None
+        self.incremental = False
+        self.deltas = {}
+        self._assets = []
+        self._group = []
+        self._members = {}
+        self._flags = np.zeros(0, dtype = bool)
+
+    def register(self, name, assets):
+        assets = list(assets)
+        self.groups.setdefault(name, []).extend([a.identifier for a in assets])
+        self._members.setdefault(name, []).extend(range(len(self._assets), len(self._assets) + len(assets)))
+        self._assets.extend(assets)
+        self._group.extend([name] * len(assets))
+        self.calendar = None
+        self.step = None
+
+    def __build(self, ns):
+        self.calendar = ns
+        starts = np.array([a.start_date.value for a in self._assets], dtype = np.int64)
+        ends = np.array([a.end_date.value for a in self._assets], dtype = np.int64)
+        self._starts = np.searchsorted(ns, starts, side = 'left')
+        self._ends = np.maximum(np.searchsorted(ns, ends, side = 'left'), self._starts)
+        override = np.array([a.tradeable_override for a in self._assets], dtype = bool)
+        self._starts[override], self._ends[override] = 0, len(ns) + 1
+        self._flags = np.zeros(len(self._assets), dtype = bool)
+        self._rows = {name: np.array(members, dtype = np.int64) for name, members in self._members.items()}
+
+        steps = np.concatenate([self._starts, self._ends])
+        events = np.tile(np.arange(len(self._assets)), 2)
+        keep = steps < len(ns)
+        steps, events = steps[keep], events[keep]
+        order = np.argsort(steps, kind = 'stable')
+        steps, events = steps[order], events[order]
+        self._bounds = np.searchsorted(steps, np.arange(len(ns) + 1), side = 'left')
+        self._events = events
+
+    def __deltas(self, changed):
+        deltas = {name: ([], []) for name in self.groups}
+        for i in changed:
+            asset = self._assets[i]
+            deltas[self._group[i]][0 if self._flags[i] else 1].append(asset.identifier)
+        return deltas
+
+    def mask(self, name):
+        return self._flags[self._rows[name]]
+
+    def update(self):
+        if len(self._assets) == 0:
+            self.deltas = {}
+            return self.deltas
+        ns = getattr(self.manager, 'master_ns', None)
+        step = self.manager.index
+        if ns is None or not 0 <= step < len(ns) or ns[step] != pd.Timestamp(self.manager.now).value:
+            self.step = None
+            self.incremental = False
+            for a in self._assets:
+                a.set_tradeable(None)
+            self.deltas = {}
+            return self.deltas
+        if ns is not self.calendar:
+            self.__build(ns)
+            self.step = None
+
+        self.incremental = self.step is not None and step == self.step + 1
+        if self.incremental:
+            events = np.unique(self._events[self._bounds[step]:self._bounds[step + 1]])
+            flags = (self._starts[events] <= step) & (step < self._ends[events])
+            changed = events[flags != self._flags[events]]
+        else:
+            flags = (self._starts <= step) & (step < self._ends)
+            changed = np.flatnonzero(flags != self._flags)
+            if self.step is None:
+                for a, f in zip(self._assets, flags):
+                    a.set_tradeable(bool(f))
+        self.step = step
+        for i in changed:
+            self._flags[i] = not self._flags[i]
+            self._assets[i].set_tradeable(bool(self._flags[i]))
+        self.deltas = self.__deltas(changed)
+        return self.deltas
@@ -18,17 +18,33 @@ class Asset():
         time series
     meta : dict
         meta information
+    timed : bool, optional (default : False)
+        record the clock index of each bar in the price stream (see TimedStream)
+
+    Attributes
+    ----------
+    tradeable : bool
+        the flag set by an ActivationQueue if the asset is registered with one, otherwise
+        start_date <= manager.now < end_date
+
+    Methods
+    -------
+    set_manager(manager : ClockManager)
+        sets self.manager, and the manager of the price stream
+    set_tradeable(tradeable : bool)
+        caches the tradeable flag, None clears it
     """
 
-    def __init__(self, id_type, identifier, universe, bar, meta, tradeable_override = False):
+    def __init__(self, id_type, identifier, universe, bar, meta, tradeable_override = False, timed = False):
         self.id_type = id_type
         self.identifier = identifier
         self.universe = universe
         self.bar = bar
         self.meta = meta
         self.tradeable_override = tradeable_override
-        self.price_stream = Price(bar, cache = None, contract = identifier, multiplier = meta['multiplier'] if 'multiplier' in meta.keys() else 1)
+        self.price_stream = Price(bar, cache = None, contract = identifier, multiplier = meta['multiplier'] if 'multiplier' in meta.keys() else 1, timed = timed)
         self.manager = None
+        self._tradeable = None
         self.start_date = pd.to_datetime(meta['daily_start_date']) if 'daily_start_date' in meta.keys() and meta['daily_start_date'] is not None else pd.to_datetime('2050-01-01') 
         self.end_date = pd.to_datetime(meta['daily_end_date']) if 'daily_end_date' in meta.keys() and meta['daily_end_date'] is not None else pd.to_datetime('1960-01-01') 
         self.last_trade_date = pd.to_datetime(meta['last_trade_date']) if 'last_trade_date' in meta.keys() and meta['last_trade_date'] is not None else None 
@@ -37,7 +53,13 @@ class Asset():
     def tradeable(self):
         if self.tradeable_override:
             return True
+        if self._tradeable is not None:
+            return self._tradeable
         return self.start_date <= self.manager.now and self.manager.now < self.end_date
 
     def set_manager(self, manager):
         self.manager = manager
+        self.price_stream.set_manager(manager)
+
+    def set_tradeable(self, tradeable):
+        self._tradeable = tradeable
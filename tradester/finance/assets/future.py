@@ -4,5 +4,5 @@ from .asset import Asset
 
 class Future(Asset):
     
-    def __init__(self, contract, universe, bar, meta, tradeable_override = False):
-        super().__init__('FUT', contract, universe, bar, meta, tradeable_override = tradeable_override)
+    def __init__(self, contract, universe, bar, meta, tradeable_override = False, timed = False):
+        super().__init__('FUT', contract, universe, bar, meta, tradeable_override = tradeable_override, timed = timed)
@@ -1,3 +1,6 @@
 from .worker import *
+from .columnar import *
+from .parallel import *
+from .streaming import *
 from .futures import *
 from .securities import *
@@ -0,0 +1,179 @@
+from .worker import DEFAULT_MANAGER
+
+import pandas as pd
+import numpy as np
+
+
+
+class ColumnarStore():
+    """
+    A ColumnarStore is a drop-in replacement for a group of Workers. Rather than holding every contract as a
+    dictionary of {DateTime: {field: value}}, each contract is kept as one contiguous float64 array per field
+    plus an integer index into the store's master calendar. Iterating through time advances integer cursors
+    instead of looking up and deleting dictionary entries.
+
+    ...
+
+    Parameters
+    ----------
+    fields : list
+        the fields held for every contract (ex: ['open', 'high', 'low', 'close', 'volume', 'open_interest'])
+    manager : ClockManager, optional
+        the central clock, defaults to DEFAULT_MANAGER, the manager shared by all Workers
+
+    Attributes
+    ----------
+    identifiers : list
+        identifiers in the store, the position in the list is the identifier's integer id
+    index : dict
+        maps identifier -> integer id
+    calendar : np.Array (datetime64[ns])
+        sorted union of every contract's dates, built lazily
+    feed_range : list
+        the calendar as a list of pd.Timestamp, matches Worker.feed_range
+    members : list
+        identifiers held in the store
+    row : np.Array
+        (identifier x field) values pushed by the last check_all(), NaN for the identifiers that got no bar
+    row_time : Integer, None
+        nanosecond timestamp of the clock at the last check_all(), the time of row
+
+    Methods
+    -------
+    add(identifier : String, dates : array-like, columns : Dictionary)
+        adds a contract from its dates and a dictionary of {field: array}, rows where every field is nan are dropped
+    add_frame(identifier : String, df : pd.DataFrame)
+        adds a contract from a DataFrame indexed by date with one column per field
+    set_stream(identifier : String, stream : tradester.feeds.active.Price)
+        sets the Price stream that the contract pushes into
+    set_active(active : list)
+        sets the identifiers that push data on check_all()
+    check_all()
+        pushes the current bar of every active contract into its stream
+    """
+
+    def __init__(self, fields, manager = None):
+        self.fields = list(fields)
+        self.manager = DEFAULT_MANAGER if manager is None else manager
+        self.identifiers = []
+        self.index = {}
+        self.calendar = np.array([], dtype = 'datetime64[ns]')
+        self.active = []
+        self._dates = []
+        self._columns = []
+        self._positions = []
+        self._streams = []
+        self._cursors = []
+        self._built = True
+        self._ns = np.array([], dtype = np.int64)
+        self._step = 0
+        self.row = np.full((0, len(self.fields)), np.nan)
+        self.row_time = None
+        self._pushed = []
+
+    def __len__(self):
+        return len(self.identifiers)
+
+    def __contains__(self, identifier):
+        return identifier in self.index
+
+    @property
+    def members(self):
+        return list(self.identifiers)
+
+    @property
+    def feed_range(self):
+        self._build()
+        return list(pd.DatetimeIndex(self.calendar))
+
+    def add(self, identifier, dates, columns):
+        dates = np.asarray(dates, dtype = 'datetime64[ns]').view(np.int64)
+        values = [np.asarray(columns[f], dtype = np.float64) if f in columns else np.full(len(dates), np.nan) for f in self.fields]
+
+        keep = ~np.all(np.isnan(np.vstack(values)), axis = 0) if len(values) > 0 else np.ones(len(dates), dtype = bool)
+        order = np.argsort(dates[keep], kind = 'stable')
+        dates = np.ascontiguousarray(dates[keep][order])
+        values = [np.ascontiguousarray(v[keep][order]) for v in values]
+
+        if identifier in self.index:
+            i = self.index[identifier]
+        else:
+            i = len(self.identifiers)
+            self.index[identifier] = i
+            self.identifiers.append(identifier)
+            self._dates.append(None)
+            self._columns.append(None)
+            self._positions.append(None)
+            self._streams.append(None)
+            self._cursors.append(0)
+        self._dates[i] = dates
+        self._columns[i] = values
+        self._built = False
+
+    def add_frame(self, identifier, df):
+        self.add(identifier, pd.to_datetime(df.index).values, {f: df[f].values for f in self.fields if f in df.columns})
+
+    def _build(self):
+        if self._built:
+            return
+        if len(self._dates) > 0:
+            self._ns = np.unique(np.concatenate(self._dates))
+        else:
+            self._ns = np.array([], dtype = np.int64)
+        self.calendar = self._ns.view('datetime64[ns]')
+        self._positions = [np.searchsorted(self._ns, d) for d in self._dates]
+        self._cursors = [0 for _ in self._dates]
+        self._step = 0
+        self.row = np.full((len(self.identifiers), len(self.fields)), np.nan)
+        self.row_time = None
+        self._pushed = []
+        self._built = True
+
+    def set_stream(self, identifier, stream):
+        i = self.index[identifier]
+        self._streams[i] = [getattr(stream, f) for f in self.fields]
+        reserve = getattr(stream, 'reserve', None)
+        if callable(reserve):
+            reserve(len(self._dates[i]))
+
+    def set_streams(self, streams):
+        for k, s in list(streams.items()):
+            if k in self.index:
+                self.set_stream(k, s)
+
+    def set_active(self, active):
+        self.active = active
+
+    def check_all(self):
+        self._build()
+        now = self.manager.now
+        n = len(self._ns)
+        if n == 0 or now is None or now == 'END':
+            return
+        now = pd.Timestamp(now).value
+        step = self._step
+        while step < n and self._ns[step] < now:
+            step += 1
+        self._step = step
+        self.row[self._pushed] = np.nan
+        self._pushed = []
+        self.row_time = now
+        if step == n or self._ns[step] != now:
+            return
+
+        for identifier in self.active:
+            i = self.index.get(identifier)
+            if i is None or self._streams[i] is None:
+                continue
+            positions = self._positions[i]
+            cursor = self._cursors[i]
+            if cursor < len(positions) and positions[cursor] < step:
+                cursor = int(np.searchsorted(positions, step))
+            if cursor < len(positions) and positions[cursor] == step:
+                row = self.row[i]
+                for k, (s, v) in enumerate(zip(self._streams[i], self._columns[i])):
+                    row[k] = v[cursor]
+                    s.push(row[k])
+                self._pushed.append(i)
+                cursor += 1
+            self._cursors[i] = cursor
@@ -1,7 +1,8 @@
-from tradester.feeds.static import FuturesTS
-from .worker import Worker, WorkerGroup
+from tradester.feeds.static import FuturesTS, BarStore
+from .worker import ArrayFeed, Worker, WorkerGroup
+from .columnar import ColumnarStore
+from .parallel import ParallelLoader
 
-from multiprocessing import Process, Pool, Manager
 from copy import deepcopy
 from time import sleep
 import pandas as pd
@@ -48,7 +49,8 @@ class FuturesWorker(Worker):
 
     def __check_feed(self):
         if self.feed is None:
-            self.feed = FuturesTS(self.identifier, fields = 'open, high, low, close, volume, open_interest', start_date = self.start_date, end_date = self.end_date, bar = self.bar_type).data.to_dict(orient= 'index')
+            split = FuturesTS(self.identifier, fields = 'open, high, low, close, volume, open_interest', start_date = self.start_date, end_date = self.end_date, bar = self.bar_type).split
+            self.feed = ArrayFeed(*split[self.identifier]) if self.identifier in split else {}
 
         if self.start_date is None:
             self.start_date = min(self.feed.keys())
@@ -72,6 +74,19 @@ class FuturesFactory(WorkerGroup):
         type of bar data the feed will produce (daily, minute, hourly: OHLCVOI, tick: BA, BB, BV, AV)
     cache : Integer, optional
         if not None, how much data should be kept in memory
+    columnar : Boolean, optional (default : False)
+        hold all contracts in a single ColumnarStore instead of one FuturesWorker per contract
+    processes : Integer, optional (default : 4)
+        number of processes loading the feeds (see ParallelLoader)
+    threads : Integer, optional (default : 4)
+        number of concurrent queries when loading with a single process (see ParallelLoader)
+    rows_per_chunk : Integer, optional (default : 250,000)
+        target number of rows per query (see ParallelLoader)
+    bar_store : String, BarStore, optional
+        if not None, load from this memory-mapped bar store (or the bar store root directory) instead of the database
+    skip_failed : Boolean, optional (default : False)
+        if True, the identifiers of chunks that fail to load are printed and added to not_tradeable, otherwise
+        add_group raises a ValueError like the StreamingFactory
     
     Attributes
     ----------
@@ -79,6 +94,8 @@ class FuturesFactory(WorkerGroup):
         type of bar data the feed will produce (daily, minute, hourly: OHLCVOI, tick: NBBO, BA, BB, BV, AV)
     not_tradeable : List
         list of contracts that do not have data
+    loader : ParallelLoader, BarStore loader
+        loads the FuturesTS split of groups of contracts
     
     Methods
     -------
@@ -89,8 +106,11 @@ class FuturesFactory(WorkerGroup):
         of multiple FuturesGroups
     add(contract : String, feed, optional : FuturesWorker)
         adds an individual contract to the group and creates a FuturesWorker, if no feed is provided    
+    _add_arrays(contract : String, dates : np.Array, columns : dictionary)
+        adds a contract from its split column arrays to the store, or as a FuturesWorker with an ArrayFeed
     add_group(group: list)
-        adds a group of FuturesWorker to the self.group, creates FuturesWorker from block of FuturesTS
+        loads group with self.loader and adds every contract that has data, the others are added to not_tradeable,
+        raises a ValueError if a chunk fails to load unless skip_failed is True
     set_streams(streams : Dictionary, remove, optional : list)
         adds in streams from a dictionary to point to the FuturesWorker, if remove is not None, removes a list 
         of streams from being actively tracked
@@ -101,38 +121,24 @@ class FuturesFactory(WorkerGroup):
 
     """
 
-    def __init__(self, identifiers = [], start_date = None, end_date = None, bar = 'daily', cache = None):
-        super().__init__(identifiers, start_date = start_date, end_date = end_date ,cache = cache)
+    def __init__(self, identifiers = [], start_date = None, end_date = None, bar = 'daily', cache = None, columnar = False, processes = 4, threads = 4, rows_per_chunk = 250000, bar_store = None, skip_failed = False):
+        super().__init__(identifiers, start_date = start_date, end_date = end_date ,cache = cache, columnar = columnar, processes = processes, threads = threads, rows_per_chunk = rows_per_chunk)
         self.bar_type = bar
         self.not_tradeable = []
+        self.skip_failed = skip_failed
+        if bar_store is not None:
+            bar_store = bar_store if isinstance(bar_store, BarStore) else BarStore(bar_store, 'futures', bar)
+            self.loader = bar_store.loader(['open', 'high', 'low', 'close', 'volume', 'open_interest'], start_date = start_date, end_date = end_date)
+        else:
+            self.loader = ParallelLoader(FuturesTS, ['open', 'high', 'low', 'close', 'volume', 'open_interest'], processes = processes, threads = threads, rows_per_chunk = rows_per_chunk, start_date = start_date, end_date = end_date, bar = bar, force_fast = True)
+        if columnar:
+            self.store = ColumnarStore(['open', 'high', 'low', 'close', 'volume', 'open_interest'])
         self.__update_group() 
 
     def __update_group(self):
         if len(self.identifiers) > 0:
             print('Initializing feed with',len(self.identifiers), 'identifiers')
-            if len(self.identifiers) > 50:
-                manager = Manager()
-                holder = manager.list()
-                pool = Pool(processes = 4)
-                for group in self.chunk_up(self.identifiers, 50):
-                    pool.apply_async(self.add_group, args = [group, holder])
-                pool.close()
-                pool.join()
-
-                master_df = pd.concat(holder)
-
-                available = list(master_df['contract'].unique())
-                tradeable = set(self.identifiers).intersection(set(available))
-                self.not_tradeable = list(set(available).symmetric_difference(set(self.identifiers)))
-
-                grouped = dict(tuple(master_df.groupby('contract')))
-                print('Not Tradeable:', self.not_tradeable)
-                for contract in tradeable:
-                    self.group[contract] = FuturesWorker(contract, bar = self.bar_type, feed = grouped[contract].pivot_table(index = 'date', columns = 'field', values = 'value').to_dict(orient = 'index'), cache = self.cache)
-
-
-            else:
-                self.add_group(self.identifiers, None)
+            self.add_group(self.identifiers)
     
 
     def _get_feed(self, contract, temp = None):
@@ -144,36 +150,34 @@ class FuturesFactory(WorkerGroup):
 
     def add(self, contract, feed = None):
         self.group[contract] = self._get_feed(contract) if feed is None else feed
+
+    def _add_arrays(self, contract, dates, columns):
+        if self.store is not None:
+            self.store.add(contract, dates, columns)
+        else:
+            self.group[contract] = FuturesWorker(contract, bar = self.bar_type, feed = ArrayFeed(dates, columns), cache = self.cache)
    
-    def add_group(self, group, holder):
-        print('Adding in group:',group[0],'->', group[-1])
+    def add_group(self, group):
         if len(group) > 0:
-            try:
-                df = FuturesTS(group, fields = 'open, high, low, close, volume, open_interest', start_date = self.start_date, end_date = self.end_date, bar = self.bar_type, force_fast = True).data.unstack().dropna().reset_index()
-            except:
-                df = None
-
-            if df is None:  
-                for contract in group:
+            print('Adding in group:',group[0],'->', group[-1])
+            split = self.loader.load(group)
+            if len(self.loader.errors) > 0 and not self.skip_failed:
+                chunk, error, trace = self.loader.errors[0]
+                raise ValueError(f'Unable to load {len(self.loader.errors)} chunks of {group[0]} -> {group[-1]}, the first is {chunk[0]} -> {chunk[-1]} ({error!r})\n{trace}')
+            for chunk, error, _ in self.loader.errors:
+                print('Unable to load', chunk[0], '->', chunk[-1], f'({error!r})')
+
+            for contract in group:
+                if contract in split:
+                    self._add_arrays(contract, *split[contract])
+                else:
                     self.not_tradeable.append(contract)
                     print(contract, 'not tradeable')
-                return
-            if len(group) == 1:
-                df.columns = ['field', 'date', 'value']
-                df['contract'] = group[0]
-            else:
-                df.columns = ['contract', 'field', 'date', 'value']
-            if not holder is None:
-                holder.append(df)
-            else:
-                for contract in group:
-                    try:
-                        self.group[contract] = FuturesWorker(contract, bar = self.bar_type, feed = df.loc[df.contract == contract].pivot_table(index = 'date', columns = 'field', values = 'value').to_dict(orient = 'index'), cache = self.cache)
-                    except:
-                        self.not_tradeable.append(contract)
-                        print(contract, 'not tradeable')
 
     def set_streams(self, streams):
+        if self.store is not None:
+            self.store.set_streams(streams)
+            return
         for k, s in list(streams.items()):
             if k not in self.not_tradeable:
                 self.group[k].set_stream(s)
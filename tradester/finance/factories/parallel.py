@@ -0,0 +1,165 @@
+from tradester.feeds.static import PrefetchPipeline
+
+from multiprocessing import Pool, shared_memory, resource_tracker
+from traceback import format_exc
+
+import pandas as pd
+import numpy as np
+
+__all__ = ['ParallelLoader']
+
+BARS_PER_DAY = {'daily': 1, 'hourly': 24, 'minute': 1440}
+
+
+def _split(feed, identifiers, fields, kwargs):
+    return feed(identifiers, fields = ', '.join(fields), **kwargs).split
+
+
+def _views(shm, rows, n_fields):
+    index = np.ndarray(rows, dtype = np.int64, buffer = shm.buf)
+    values = np.ndarray((n_fields, rows), dtype = np.float64, buffer = shm.buf, offset = rows * 8)
+    return index, values
+
+
+def _load_chunk(feed, identifiers, fields, kwargs):
+    try:
+        split = _split(feed, identifiers, fields, kwargs)
+    except Exception as e:
+        return None, None, (identifiers, e, format_exc())
+
+    rows = sum([len(d) for d, _ in split.values()])
+    if rows == 0:
+        return None, [], None
+    shm = shared_memory.SharedMemory(create = True, size = rows * 8 * (len(fields) + 1))
+    index, values = _views(shm, rows, len(fields))
+    layout, lo = [], 0
+    for identifier, (dates, columns) in split.items():
+        hi = lo + len(dates)
+        index[lo:hi] = dates.view(np.int64)
+        for k, f in enumerate(fields):
+            values[k, lo:hi] = columns[f] if f in columns else np.nan
+        layout.append((identifier, lo, hi, [f for f in fields if f in columns]))
+        lo = hi
+    del index, values
+    shm.close()
+    return (shm.name, rows), layout, None
+
+
+class ParallelLoader():
+    """
+    The ParallelLoader fetches the split (see tradester.feeds.static.TSFeed.split) of many identifiers with a
+    pool of processes. Identifiers are chunked so that every query returns about rows_per_chunk rows, and each
+    chunk is written by its process into one multiprocessing.shared_memory block, so only the block's name and
+    a small layout are pickled back to the parent. Exceptions raised while loading a chunk are returned to the
+    parent instead of being lost inside the pool. With a single process the chunks are loaded in the calling
+    process through a PrefetchPipeline, which keeps threads queries in flight.
+
+    ...
+
+    Parameters
+    ----------
+    feed : tradester.feeds.static.TSFeed
+        the feed class to query with (ex: FuturesTS), called as feed(identifiers, fields = ..., **kwargs)
+    fields : list
+        fields to load
+    processes : Integer, optional (default : 4)
+        number of processes, chunks are loaded in the calling process if 1 or if there is only one chunk
+    threads : Integer, optional (default : 4)
+        number of concurrent queries when loading in the calling process
+    rows_per_chunk : Integer, optional (default : 250,000)
+        target number of rows per query
+    rows_per_identifier : Integer, optional
+        estimate of the rows of one identifier, derived from start_date, end_date and bar if None
+    start_date : String, optional
+        a YYYY-MM-DD string representing a start date
+    end_date : String, optional
+        a YYYY-MM-DD string representing a end date
+    bar : String, optional (default : 'daily')
+        type of bar data the feed will produce
+    **kwargs
+        passed on to feed
+
+    Attributes
+    ----------
+    errors : list
+        (identifiers, exception, traceback) of every chunk that failed during the last load()
+    progress : tradester.feeds.static.PipelineProgress, None
+        counters of the last load in the calling process
+
+    Methods
+    -------
+    estimate()
+        returns the estimated rows of one identifier
+    chunks(identifiers : list)
+        returns identifiers split into chunks of about rows_per_chunk rows, at least one per process (or thread)
+    load(identifiers : list)
+        returns the split of every identifier that has data, failed chunks are recorded in errors
+    """
+
+    def __init__(self, feed, fields, processes = 4, threads = 4, rows_per_chunk = 250000, rows_per_identifier = None, start_date = None, end_date = None, bar = 'daily', **kwargs):
+        self.feed = feed
+        self.fields = list(fields)
+        self.processes = processes
+        self.threads = threads
+        self.rows_per_chunk = rows_per_chunk
+        self.rows_per_identifier = rows_per_identifier
+        self.kwargs = dict(start_date = start_date, end_date = end_date, bar = bar, **kwargs)
+        self.errors = []
+        self.progress = None
+
+    def estimate(self):
+        if self.rows_per_identifier is not None:
+            return self.rows_per_identifier
+        end = pd.Timestamp(self.kwargs['end_date']) if self.kwargs['end_date'] else pd.Timestamp.now().normalize()
+        start = pd.Timestamp(self.kwargs['start_date']) if self.kwargs['start_date'] else end - pd.DateOffset(years = 10)
+        days = max(len(pd.bdate_range(start, end)), 1)
+        return days * BARS_PER_DAY.get(self.kwargs['bar'], 1)
+
+    def chunks(self, identifiers):
+        size = max(self.rows_per_chunk // self.estimate(), 1)
+        workers = self.processes if self.processes > 1 else self.threads
+        if workers > 1:
+            size = min(size, -(-len(identifiers) // workers))
+        return [identifiers[i:i + size] for i in range(0, len(identifiers), size)]
+
+    def load(self, identifiers):
+        self.errors = []
+        identifiers = list(identifiers)
+        if len(identifiers) == 0:
+            return {}
+        chunks = self.chunks(identifiers)
+        if self.processes <= 1 or len(chunks) == 1:
+            pipeline = PrefetchPipeline(self.feed, self.fields, concurrency = min(self.threads, len(chunks)), chunk_size = len(chunks[0]), **self.kwargs)
+            split = pipeline.load(identifiers)
+            self.errors, self.progress = pipeline.errors, pipeline.progress
+            return split
+
+        resource_tracker.ensure_running()
+        with Pool(processes = min(self.processes, len(chunks))) as pool:
+            results = [pool.apply_async(_load_chunk, (self.feed, chunk, self.fields, self.kwargs)) for chunk in chunks]
+            split = {}
+            for chunk, result in zip(chunks, results):
+                try:
+                    block, layout, error = result.get()
+                except Exception as e:
+                    self.errors.append((chunk, e, format_exc()))
+                    continue
+                if error is not None:
+                    self.errors.append(error)
+                elif block is not None:
+                    split.update(self.__collect(block, layout))
+        return split
+
+    def __collect(self, block, layout):
+        name, rows = block
+        shm = shared_memory.SharedMemory(name = name)
+        try:
+            index, values = _views(shm, rows, len(self.fields))
+            split = {}
+            for identifier, lo, hi, present in layout:
+                split[identifier] = (index[lo:hi].astype('datetime64[ns]'), {f: values[self.fields.index(f), lo:hi].copy() for f in present})
+            del index, values
+        finally:
+            shm.close()
+            shm.unlink()
+        return split
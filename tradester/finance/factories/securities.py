@@ -1,5 +1,7 @@
-from tradester.feeds.static import SecuritiesTS
-from .worker import Worker, WorkerGroup
+from tradester.feeds.static import SecuritiesTS, BarStore
+from .worker import ArrayFeed, Worker, WorkerGroup
+from .columnar import ColumnarStore
+from .parallel import ParallelLoader
 
 class SecuritiesWorker(Worker):
     """
@@ -43,7 +45,8 @@ class SecuritiesWorker(Worker):
 
     def __check_feed(self):
         if self.feed is None:
-            self.feed = SecuritiesTS(self.identifier, fields = 'open, high, low, close, volume', start_date = self.start_date, end_date = self.end_date, bar = self.bar_type).data.to_dict(orient= 'index')
+            split = SecuritiesTS(self.identifier, fields = 'open, high, low, close, volume', start_date = self.start_date, end_date = self.end_date, bar = self.bar_type).split
+            self.feed = ArrayFeed(*split[self.identifier]) if self.identifier in split else {}
 
         if self.start_date is None:
             self.start_date = min(self.feed.keys())
@@ -67,6 +70,19 @@ class SecuritiesFactory(WorkerGroup):
         type of bar data the feed will produce (daily, minute, hourly: OHLCVOI, tick: BA, BB, BV, AV)
     cache : Integer, optional
         if not None, how much data should be kept in memory
+    columnar : Boolean, optional (default : False)
+        hold all securities in a single ColumnarStore instead of one SecuritiesWorker per ticker
+    processes : Integer, optional (default : 4)
+        number of processes loading the feeds (see ParallelLoader)
+    threads : Integer, optional (default : 4)
+        number of concurrent queries when loading with a single process (see ParallelLoader)
+    rows_per_chunk : Integer, optional (default : 250,000)
+        target number of rows per query (see ParallelLoader)
+    bar_store : String, BarStore, optional
+        if not None, load from this memory-mapped bar store (or the bar store root directory) instead of the database
+    skip_failed : Boolean, optional (default : False)
+        if True, the identifiers of chunks that fail to load are printed and added to not_tradeable, otherwise
+        add_group raises a ValueError like the StreamingFactory
     
     Attributes
     ----------
@@ -74,6 +90,8 @@ class SecuritiesFactory(WorkerGroup):
         type of bar data the feed will produce (daily, minute, hourly: OHLCVOI, tick: NBBO, BA, BB, BV, AV)
     not_tradeable : List
         list of contracts that do not have data
+    loader : ParallelLoader, BarStore loader
+        loads the SecuritiesTS split of groups of tickers
     
     Methods
     -------
@@ -84,8 +102,11 @@ class SecuritiesFactory(WorkerGroup):
         of multiple FuturesGroups
     add(contract : String, feed, optional : FuturesWorker)
         adds an individual contract to the group and creates a FuturesWorker, if no feed is provided    
+    _add_arrays(contract : String, dates : np.Array, columns : dictionary)
+        adds a ticker from its split column arrays to the store, or as a SecuritiesWorker with an ArrayFeed
     add_group(group: list)
-        adds a group of FuturesWorker to the self.group, creates FuturesWorker from block of FuturesTS
+        loads group with self.loader and adds every ticker that has data, the others are added to not_tradeable,
+        raises a ValueError if a chunk fails to load unless skip_failed is True
     set_streams(streams : Dictionary, remove, optional : list)
         adds in streams from a dictionary to point to the FuturesWorker, if remove is not None, removes a list 
         of streams from being actively tracked
@@ -98,21 +119,24 @@ class SecuritiesFactory(WorkerGroup):
 
     """
 
-    def __init__(self, identifiers, start_date = None, end_date = None, bar = 'daily', cache = None):
-        super().__init__(identifiers, start_date = start_date, end_date = end_date ,cache = cache)
+    def __init__(self, identifiers, start_date = None, end_date = None, bar = 'daily', cache = None, columnar = False, processes = 4, threads = 4, rows_per_chunk = 250000, bar_store = None, skip_failed = False):
+        super().__init__(identifiers, start_date = start_date, end_date = end_date ,cache = cache, columnar = columnar, processes = processes, threads = threads, rows_per_chunk = rows_per_chunk)
         self.bar_type = bar
         self.not_tradeable = []
+        self.skip_failed = skip_failed
+        if bar_store is not None:
+            bar_store = bar_store if isinstance(bar_store, BarStore) else BarStore(bar_store, 'securities', bar)
+            self.loader = bar_store.loader(['open', 'high', 'low', 'close', 'volume'], start_date = start_date, end_date = end_date)
+        else:
+            self.loader = ParallelLoader(SecuritiesTS, ['open', 'high', 'low', 'close', 'volume'], processes = processes, threads = threads, rows_per_chunk = rows_per_chunk, start_date = start_date, end_date = end_date, bar = bar, force_fast = True)
+        if columnar:
+            self.store = ColumnarStore(['open', 'high', 'low', 'close', 'volume'])
         self.__update_group() 
 
     def __update_group(self):
         if len(self.identifiers) > 0:
             print('Initializing feed with',len(self.identifiers), 'identifiers')
-            if len(self.identifiers) > 50:
-                for chunk in self.chunk_up(self.identifiers, 50):
-                    print('Adding in chunk:',chunk[0],'->', chunk[-1])
-                    self.add_group(chunk)
-            else:
-                self.add_group(self.identifiers)
+            self.add_group(self.identifiers)
     
 
     def _get_feed(self, contract, temp = None):
@@ -124,29 +148,27 @@ class SecuritiesFactory(WorkerGroup):
 
     def add(self, contract, feed = None):
         self.group[contract] = self._get_feed(contract) if feed is None else feed
+
+    def _add_arrays(self, contract, dates, columns):
+        if self.store is not None:
+            self.store.add(contract, dates, columns)
+        else:
+            self.group[contract] = SecuritiesWorker(contract, bar = self.bar_type, feed = ArrayFeed(dates, columns), cache = self.cache)
    
     def add_group(self, group):
         if len(group) > 0:
-            try:
-                df = SecuritiesTS(group, fields = 'open, high, low, close, volume', start_date = self.start_date, end_date = self.end_date, bar = self.bar_type, force_fast = True).data.unstack().dropna().reset_index()
-            except:
-                df = None
-
-            if df is None:  
-                for contract in group:
-                    self.not_tradeable.append(contract)
-                    print(contract, 'not tradeable')
-                return
-            if len(group) == 1:
-                df.columns = ['field', 'date', 'value']
-                df['contract'] = group[0]
-            else:
-                df.columns = ['contract', 'field', 'date', 'value']
+            print('Adding in group:',group[0],'->', group[-1])
+            split = self.loader.load(group)
+            if len(self.loader.errors) > 0 and not self.skip_failed:
+                chunk, error, trace = self.loader.errors[0]
+                raise ValueError(f'Unable to load {len(self.loader.errors)} chunks of {group[0]} -> {group[-1]}, the first is {chunk[0]} -> {chunk[-1]} ({error!r})\n{trace}')
+            for chunk, error, _ in self.loader.errors:
+                print('Unable to load', chunk[0], '->', chunk[-1], f'({error!r})')
 
             for contract in group:
-                try:
-                    self.group[contract] = SecuritiesWorker(contract, bar = self.bar_type, feed = df.loc[df.contract == contract].pivot_table(index = 'date', columns = 'field', values = 'value').to_dict(orient = 'index'), cache = self.cache)
-                except:
+                if contract in split:
+                    self._add_arrays(contract, *split[contract])
+                else:
                     self.not_tradeable.append(contract)
                     print(contract, 'not tradeable')
 
@@ -154,6 +176,9 @@ class SecuritiesFactory(WorkerGroup):
         new_streams = [x for x in list(streams.keys()) if x not in self.members + self.not_tradeable + list(self.group.keys())]
         if len(new_streams) > 0:
             self.add_group(new_streams)
+        if self.store is not None:
+            self.store.set_streams(streams)
+            return
         for k, s in list(streams.items()):
             if k not in self.not_tradeable:
                 if k in list(self.group.keys()):
@@ -180,6 +205,9 @@ class SecuritiesFactory(WorkerGroup):
             self.active_group[key].check()
 
     def check_all(self):
+        if self.store is not None:
+            self.store.check_all()
+            return
         for i, f in list(self.active_group.items()):
             f.check()
     
@@ -0,0 +1,207 @@
+from tradester.feeds.static import PrefetchPipeline, BarStore, BAR_STORE_FEEDS
+from .worker import WorkerGroup, DEFAULT_MANAGER
+from .columnar import ColumnarStore
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+__all__ = ['StreamingFactory']
+
+
+class StreamingFactory(WorkerGroup):
+    """
+    A StreamingFactory is a WorkerGroup that never holds more than two date windows of bars. The calendar is
+    built from a distinct date query. The bars of every identifier are loaded one window (ex: a month) at a time
+    into a ColumnarStore that pushes them into the streams. While a window is being pushed, the next one is
+    fetched in the background, and a window is dropped as soon as the clock moves past it, so peak memory is
+    bounded by the window size times the universe rather than the full history. If a chunk of a window can not
+    be loaded, check_all raises a ValueError rather than running the window without those identifiers.
+
+    ...
+
+    Parameters
+    ----------
+    feed : tradester.feeds.static.TSFeed
+        the feed class to query with (ex: FuturesTS)
+    fields : list
+        fields pushed into the streams
+    identifiers : list
+        identifiers of the feeds
+    start_date : String, optional
+        a YYYY-MM-DD string representing a start date
+    end_date : String, optional
+        a YYYY-MM-DD string representing a end date
+    bar : String, optional (default: 'daily')
+        type of bar data the feed will produce
+    window : String, optional (default : 'MS')
+        pandas frequency of the window starts, 'MS' loads a month at a time
+    prefetch : Boolean, optional (default : True)
+        fetch the next window in the background
+    threads : Integer, optional (default : 4)
+        number of concurrent queries per window (see PrefetchPipeline)
+    chunk_size : Integer, optional (default : 50)
+        identifiers per query (see PrefetchPipeline)
+    manager : ClockManager, optional
+        the central clock, defaults to DEFAULT_MANAGER, the manager shared by all Workers
+    bar_store : String, BarStore, optional
+        if not None, the windows are read from the memory-mapped bar store (see BarStore) of feed instead of the
+        database, so nothing is queried
+
+    Attributes
+    ----------
+    calendar : np.Array (datetime64[ns])
+        every date with a bar
+    windows : list
+        (start, end) int64 nanosecond bounds of every window, end exclusive
+    window : Integer
+        index of the window being pushed, -1 before the first check_all()
+    errors : list
+        (chunk, error, traceback) of the chunks that could not be loaded
+    store : ColumnarStore, None
+        bars of the current window
+    not_tradeable : List
+        identifiers that did not return a bar in any loaded window
+
+    Methods
+    -------
+    set_streams(streams : Dictionary)
+        sets the streams the bars are pushed into
+    load(window : Integer)
+        returns a ColumnarStore holding the bars of the window
+    check_all()
+        moves to the window of the current date if needed and pushes the bars of the active identifiers
+    close()
+        stops the background fetch
+    """
+
+    def __init__(self, feed, fields, identifiers, start_date = None, end_date = None, bar = 'daily', window = 'MS', prefetch = True, threads = 4, chunk_size = 50, manager = None, bar_store = None):
+        super().__init__(identifiers, start_date = start_date, end_date = end_date, columnar = True, threads = threads)
+        self.feed = feed
+        self.fields = list(fields)
+        self.bar_type = bar
+        self.prefetch = prefetch
+        self.chunk_size = chunk_size
+        self.manager = DEFAULT_MANAGER if manager is None else manager
+        self.streams = {}
+        self.window = -1
+        self.errors = []
+        self._loaded = set()
+        self._next = None
+        self._pool = ThreadPoolExecutor(max_workers = 1) if prefetch else None
+        self.bar_store = self.__bar_store(bar_store)
+
+        self.calendar = self.__calendar()
+        self.windows = self.__windows(window)
+
+    def __bar_store(self, bar_store):
+        if bar_store is None or isinstance(bar_store, BarStore):
+            return bar_store
+        datatables = [d for d, (feed, _, _) in BAR_STORE_FEEDS.items() if feed is self.feed]
+        if len(datatables) == 0:
+            raise ValueError(f'There is no bar store for {self.feed.__name__}, only for {list(BAR_STORE_FEEDS)}')
+        return BarStore(bar_store, datatables[0], self.bar_type)
+
+    def __calendar(self):
+        if len(self.identifiers) == 0:
+            return np.array([], dtype = 'datetime64[ns]')
+        if self.bar_store is not None:
+            split = self.bar_store.split(self.identifiers, fields = [], start_date = self.start_date, end_date = self.end_date)
+            dates = [np.asarray(d).view(np.int64) for d, _ in split.values()]
+            return np.unique(np.concatenate(dates)).view('datetime64[ns]') if len(dates) > 0 else np.array([], dtype = 'datetime64[ns]')
+        feed = self.feed(self.identifiers, fields = ', '.join(self.fields), start_date = self.start_date, end_date = self.end_date, bar = self.bar_type, override = True)
+        return feed._calendar()
+
+    def __windows(self, freq):
+        if len(self.calendar) == 0:
+            return []
+        ns = self.calendar.view(np.int64)
+        starts = pd.date_range(pd.Timestamp(ns[0]).normalize(), pd.Timestamp(ns[-1]), freq = freq)
+        bounds = np.unique(np.concatenate([[ns[0]], starts.values.astype('datetime64[ns]').view(np.int64), [ns[-1] + 1]]))
+        windows = []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if np.searchsorted(ns, lo) < np.searchsorted(ns, hi):
+                windows.append((int(lo), int(hi)))
+        return windows
+
+    @property
+    def feed_range(self):
+        return list(pd.DatetimeIndex(self.calendar))
+
+    @property
+    def members(self):
+        return list(self.identifiers)
+
+    @property
+    def not_tradeable(self):
+        return [i for i in self.identifiers if i not in self._loaded]
+
+    def set_streams(self, streams):
+        self.streams = streams
+        if self.store is not None:
+            self.store.set_streams(streams)
+
+    def set_active(self, active):
+        self.active = active
+        if self.store is not None:
+            self.store.set_active(active)
+
+    def load(self, window):
+        lo, hi = self.windows[window]
+        ns = self.calendar.view(np.int64)
+        first, last = pd.Timestamp(ns[np.searchsorted(ns, lo)]), pd.Timestamp(ns[np.searchsorted(ns, hi) - 1])
+        store = ColumnarStore(self.fields, manager = self.manager)
+        if self.bar_store is not None:
+            for identifier, (dates, columns) in self.bar_store.split(self.identifiers, fields = self.fields, start_date = first, end_date = last).items():
+                store.add(identifier, dates, columns)
+            store._build()
+            return store, []
+        date_format = '%Y-%m-%d' if self.bar_type == 'daily' else '%Y-%m-%d %H:%M:%S'
+        pipeline = PrefetchPipeline(self.feed, self.fields, concurrency = self.threads, chunk_size = self.chunk_size, start_date = first.strftime(date_format), end_date = last.strftime(date_format), bar = self.bar_type, force_fast = True)
+        for _, split in pipeline.run(self.identifiers):
+            for identifier, (dates, columns) in split.items():
+                store.add(identifier, dates, columns)
+        store._build()
+        return store, pipeline.errors
+
+    def __submit(self, window):
+        if self._pool is None or window >= len(self.windows):
+            self._next = None
+        else:
+            self._next = (window, self._pool.submit(self.load, window))
+
+    def __advance(self, window):
+        if self._next is not None and self._next[0] == window:
+            store, errors = self._next[1].result()
+        else:
+            store, errors = self.load(window)
+        self.errors.extend(errors)
+        if len(errors) > 0:
+            chunk, error, trace = errors[0]
+            lo, hi = [pd.Timestamp(b) for b in self.windows[window]]
+            raise ValueError(f'Unable to load {len(errors)} chunks of the window {lo} -> {hi}, the first is {chunk[0]} -> {chunk[-1]} ({error!r})\n{trace}')
+        self._loaded.update(store.identifiers)
+        store.set_streams(self.streams)
+        store.set_active(self.active)
+        self.store = store
+        self.window = window
+        self.__submit(window + 1)
+
+    def check_all(self):
+        now = self.manager.now
+        if now is None or now == 'END' or len(self.windows) == 0:
+            return
+        now = pd.Timestamp(now).value
+        window = max(self.window, 0)
+        while window < len(self.windows) - 1 and now >= self.windows[window][1]:
+            window += 1
+        if window != self.window:
+            self.store = None
+            self.__advance(window)
+        self.store.check_all()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait = True, cancel_futures = True)
+            self._pool = None
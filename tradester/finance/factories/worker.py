@@ -1,10 +1,9 @@
 from tradester.feeds.static import FuturesTS, SymbolsTS
 
 from multiprocessing import Manager, Process
-from numba import jit
 from copy import deepcopy 
-from tqdm import tqdm
 
+import pandas as pd
 import numpy as np
 
 
@@ -15,12 +14,19 @@ class ClockManager():
 
     ...
     
+    Parameters
+    ----------
+    array_backed : Boolean, optional (default : False)
+        iterate over a datetime64 array with an integer cursor instead of popping from a list, new_day,
+        mkt_open and the date strings are precomputed when the calendars are set. Must be set before
+        set_calendar() is called.
+
     Attributes
     ----------
-    calendar : list
-        a list of days to iterate over
-    trading_calendar : list
-        a list of days within the calendar that correspond to trading days
+    calendar : list, np.Array
+        a list of days to iterate over, a datetime64 array of the full calendar if array_backed
+    trading_calendar : list, np.Array
+        a list of days within the calendar that correspond to trading days, a datetime64[D] array if array_backed
     start_date : DateTime
         starting date of self.calendar
     end_date : DateTime
@@ -36,8 +42,14 @@ class ClockManager():
         is the current day in the trading calendar
     now_date : String
         self.now formatted as a String, YYYY-MM-DD
-    prev_date : String
-        self.previous formatted as a String, YYYY-MM-DD
+    prev_date : String, None
+        self.previous formatted as a String, YYYY-MM-DD, None before the second update
+    index : Integer
+        position of self.now within the full calendar, -1 before the first update
+    master_calendar : np.Array
+        the full calendar as a datetime64 array, unaffected by iteration
+    master_ns : np.Array, None
+        the full calendar as int64 nanoseconds, converted once per set_calendar(), None before it is set
     
     Methods
     -------
@@ -51,7 +63,8 @@ class ClockManager():
         updates the self.now and self.previous pointers through iteration of calendar object
     """
     
-    def __init__(self):
+    def __init__(self, array_backed = False):
+        self.array_backed = array_backed
         self.calendar = None
         self.trading_calendar = None
         self.start_date = None 
@@ -59,50 +72,177 @@ class ClockManager():
         self.previous = None
         self._now = None
         self.new_day = False
+        self._cursor = -1
+        self._stamps = None
+        self._ns = None
+        self._days = None
+        self._date_strings = None
+        self._new_days = None
+        self._mkt_open = None
     
     @property
     def mkt_open(self):
+        if self.array_backed:
+            return bool(self._mkt_open[self._cursor])
         return self.now_date in self.trading_calendar
 
     @property
     def now(self):
         return self._now
 
+    @property
+    def index(self):
+        return self._cursor
+
+    @property
+    def master_calendar(self):
+        return self._stamps.values
+
+    @property
+    def master_ns(self):
+        return self._ns
+
     @property
     def now_date(self):
+        if self.array_backed:
+            return self._date_strings[self._cursor]
         return self.now.strftime('%Y-%m-%d') 
 
     @property 
     def prev_date(self):    
-        return self.previous.strftime('%Y-%m-%d')
+        if self.array_backed:
+            return self._date_strings[self._cursor - 1] if self._cursor > 0 else None
+        return self.previous.strftime('%Y-%m-%d') if self.previous is not None else None
 
     @property
     def peek(self):
+        if self.array_backed:
+            return self._stamps[self._cursor + 1]
         return self.calendar[0]
 
     def set_bar(self,bar):
         self.bar = bar
 
     def set_calendar(self, cal):
-        self.calendar = cal 
+        self._stamps = pd.DatetimeIndex(cal)
+        self._ns = self._stamps.values.astype('datetime64[ns]').view(np.int64)
+        self._cursor = -1
+        if self.array_backed:
+            self.calendar = self._stamps.values
+            self._days = self.calendar.astype('datetime64[D]')
+            self._date_strings = np.datetime_as_string(self._days)
+            self._new_days = np.concatenate([[True], self._days[1:] > self._days[:-1]])
+            if self.trading_calendar is not None:
+                self._mkt_open = np.isin(self._days, self.trading_calendar)
+        else:
+            self.calendar = cal 
         self.end_date = max(cal)
         self.start_date = min(cal)
     
     def set_trading_calendar(self, cal):
-        self.trading_calendar = list(set([x.strftime('%Y-%m-%d') for x in cal]))
+        if self.array_backed:
+            self.trading_calendar = np.unique(pd.DatetimeIndex(cal).values.astype('datetime64[D]'))
+            if self._days is not None:
+                self._mkt_open = np.isin(self._days, self.trading_calendar)
+        else:
+            self.trading_calendar = list(set([x.strftime('%Y-%m-%d') for x in cal]))
     
     def update(self):   
+        if self.array_backed:
+            self.previous = self.now
+            if self._cursor + 1 < len(self._stamps):
+                self._cursor += 1
+                self._now = self._stamps[self._cursor]
+                self.new_day = bool(self._new_days[self._cursor])
+            else:
+                self._cursor = len(self._stamps)
+                self._now = 'END'
+            return
         try:
             self.previous = self.now
             self._now = self.calendar.pop(0)
+            self._cursor += 1
 
             if not self.previous is None:
                 self.new_day = self.now_date > self.prev_date
             else:
                 self.new_day = True 
         except:
+            self._cursor = len(self._stamps) if self._stamps is not None else self._cursor
             self._now = 'END'
 
+# the central clock shared by every Worker, factory and Engine that is not given its own ClockManager
+DEFAULT_MANAGER = ClockManager()
+
+
+class ArrayFeed():
+    """
+    An ArrayFeed holds a Worker's feed as sorted int64 dates and one row of field values per date, in place of
+    the {DateTime: {field: value}} dictionary. It answers the same get/keys/len/del calls the Worker makes on a
+    dictionary feed, so the two are interchangeable. Since time only moves forward, lookups advance a cursor
+    and del consumes rows instead of removing keys.
+
+    ...
+
+    Parameters
+    ----------
+    dates : np.Array
+        sorted datetime64 dates of the bars
+    columns : dict
+        field -> np.Array of the field's value for every date
+
+    Attributes
+    ----------
+    fields : list
+        fields in every bar
+    cursor : Integer
+        position of the first bar that has not been consumed
+    """
+
+    def __init__(self, dates, columns):
+        self.dates = np.asarray(dates, dtype = 'datetime64[ns]').view(np.int64)
+        self.fields = list(columns)
+        self.values = np.empty((len(self.dates), len(self.fields)))
+        for k, f in enumerate(self.fields):
+            self.values[:, k] = columns[f]
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.dates) - self.cursor
+
+    def _find(self, date):
+        if not isinstance(date, pd.Timestamp):
+            return None
+        t = date.value
+        n = len(self.dates)
+        while self.cursor < n and self.dates[self.cursor] < t:
+            self.cursor += 1
+        if self.cursor < n and self.dates[self.cursor] == t:
+            return self.cursor
+        return None
+
+    def __contains__(self, date):
+        return self._find(date) is not None
+
+    def __getitem__(self, date):
+        i = self._find(date)
+        if i is None:
+            raise KeyError(date)
+        return dict(zip(self.fields, self.values[i].tolist()))
+
+    def __delitem__(self, date):
+        if self._find(date) is None:
+            raise KeyError(date)
+        self.cursor += 1
+
+    def get(self, date, default = None):
+        i = self._find(date)
+        return default if i is None else dict(zip(self.fields, self.values[i].tolist()))
+
+    def keys(self):
+        return list(pd.DatetimeIndex(self.dates[self.cursor:].view('datetime64[ns]')))
+
+
 class Worker():
     """
     A Worker is the fundamental unit of an Active Feed. It provides the ultimate basis for centralized memory
@@ -118,10 +258,10 @@ class Worker():
         a YYYY-MM-DD string representing a start date
     end_date : String, optional
         a YYYY-MM-DD string representing a end date
-    feed : Dictionary (kind of a confusing name, my bad - Will), optional
-        a dictionary of values where the key is DateTime object
-    mananger : ClockManager(), optional **DO NOT MODIFY**
-        the manager object when craeted like this means that all feeds share the same self.manager
+    feed : Dictionary, ArrayFeed (kind of a confusing name, my bad - Will), optional
+        a dictionary of values where the key is DateTime object, or an ArrayFeed of the same bars
+    mananger : ClockManager, optional (default : DEFAULT_MANAGER) **DO NOT MODIFY**
+        the central clock, every Worker created without one shares DEFAULT_MANAGER
     cache : Integer, optional
         if not None, how much data should be kept in memory
 
@@ -141,7 +281,7 @@ class Worker():
 
     """
 
-    def __init__(self, identifier, start_date = None, end_date = None, feed = None, manager = ClockManager(), cache = None):
+    def __init__(self, identifier, start_date = None, end_date = None, feed = None, manager = DEFAULT_MANAGER, cache = None):
         self.manager = manager
         self.cache = cache
         self.identifier = identifier 
@@ -163,6 +303,9 @@ class Worker():
     
     def set_stream(self, stream):
         self.stream = stream
+        reserve = getattr(stream, 'reserve', None)
+        if callable(reserve) and self.feed is not None:
+            reserve(len(self.feed))
 
     def check(self):    
         bar = self.feed.get(self.manager.now)
@@ -187,11 +330,21 @@ class WorkerGroup():
         a YYYY-MM-DD string representing a end date
     cache : Integer, optional
         if not None, how much data should be kept in memory
+    columnar : Boolean, optional (default : False)
+        hold the feeds in a ColumnarStore instead of one Worker per identifier
+    processes : Integer, optional (default : 4)
+        number of processes loading the feeds, see ParallelLoader
+    threads : Integer, optional (default : 4)
+        number of concurrent queries when loading with a single process, see ParallelLoader
+    rows_per_chunk : Integer, optional (default : 250,000)
+        target number of rows per query, see ParallelLoader
     
     Attributes
     ----------
     group : Dictionary
         the master group of all feeds
+    store : ColumnarStore, None
+        the columnar store of all feeds if columnar is True
     active_group : Dictionary
         feeds that are considered either: 1) on the run contracts or 2) are still actively available for
         new data
@@ -204,17 +357,28 @@ class WorkerGroup():
     -------
     chunk_up(l : List, n : integer)
         yields iterable of lists of length n from list l. Useful for batch loading in data from the FeedGroup
+    set_active(active : List)
+        sets the identifiers whose feeds are checked
+    activate(added : List, removed : List)
+        adds and removes identifiers from the active identifiers, see ActivationQueue
     """
-    def __init__(self, identifiers, start_date = None, end_date = None, cache = None):
+    def __init__(self, identifiers, start_date = None, end_date = None, cache = None, columnar = False, processes = 4, threads = 4, rows_per_chunk = 250000):
         self.identifiers = identifiers 
         self.cache = cache
         self.start_date = start_date
         self.end_date = end_date
+        self.columnar = columnar
+        self.processes = processes
+        self.threads = threads
+        self.rows_per_chunk = rows_per_chunk
         self.group = {}
+        self.store = None
         self.active = []
 
     @property 
     def feed_range(self):
+        if self.store is not None:
+            return self.store.feed_range
         cal = []
         for i , f in list(self.group.items()):
            cal += f.feed_range
@@ -224,6 +388,8 @@ class WorkerGroup():
     
     @property
     def members(self):
+        if self.store is not None:
+            return self.store.members
         return list(self.group.keys())
 
     def chunk_up(self, l, n):
@@ -232,8 +398,17 @@ class WorkerGroup():
 
     def set_active(self, active):
         self.active = active
+        if self.store is not None:
+            self.store.set_active(active)
+
+    def activate(self, added, removed):
+        removed, active = set(removed), set(self.active)
+        self.set_active([a for a in self.active if a not in removed] + [a for a in added if a not in active])
 
     def check_all(self):
+        if self.store is not None:
+            self.store.check_all()
+            return
         for f in self.active:
             if f in self.group.keys():
                 self.group[f].check()
@@ -1,10 +1,11 @@
 from tradester.feeds.static import CustomFeed
-from tradester.finance.assets import Future
+from tradester.finance.assets import Future, ActivationQueue
 from pandas.tseries.offsets import BDay
 
 from .universe import Universe
 
 import pandas as pd
+import numpy as np
 
 
 
@@ -36,6 +37,8 @@ class FuturesUniverse(Universe):
         include synthetic continuation contracts
     roll_on : String, optional (default : 'last_trade_date')
         date for which to roll contracts on
+    timed : Boolean, optional (default : False)
+        give every asset a timed price stream so spreads between contracts align on the clock (see TimedStream)
     
     Attributes
     ----------
@@ -43,10 +46,30 @@ class FuturesUniverse(Universe):
         meta information of futures contracts
     products_meta : dict
         meta information of products
+    calendars : dict
+        product -> {roll date: {continuation: contract}}
+    calendar_indexes : dict
+        product -> sorted roll dates
+
+    Methods
+    -------
+    find_date(indexes : list, date : DateTime, actor : String)
+        the active roll date after date, or the roll dates that are inactive at date, by scanning indexes
+    refresh()
+        updates tradeable, active_list and inactive_list for the current date of the manager
+
+    Notes
+    -----
+    The tradeable contracts come from an ActivationQueue, the Engine's (see set_activations) or, when the
+    universe is refreshed on its own, one it creates and updates itself. The first refresh() on a new clock
+    calendar precomputes, with searchsorted against manager.master_ns, the active roll row and the number of
+    inactive roll rows of every product at every step. Each refresh() then only applies the queue's deltas of its
+    step and rebuilds the inactive contracts of the products whose rows or tradeable contracts changed. If the
+    clock is not on its calendar, the rows are looked up for manager.now instead.
 
     """
 
-    def __init__(self, name, products, continuation_periods, start_date = None, end_date = None, bar = 'daily', exchange = 'CME', include_continuations = False, include_product = False, roll_on = 'last_trade_date', roll_lag = None):
+    def __init__(self, name, products, continuation_periods, start_date = None, end_date = None, bar = 'daily', exchange = 'CME', include_continuations = False, include_product = False, roll_on = 'last_trade_date', roll_lag = None, timed = False):
         super().__init__('FUT', name, start_date, end_date)
         self.products = products
         self.continuation_periods = continuation_periods
@@ -58,6 +81,7 @@ class FuturesUniverse(Universe):
         self.include_product = include_product
         self.roll_on = roll_on
         self.roll_lag = roll_lag
+        self.timed = timed
 
         self.products_meta = self.__get_products_meta()
         self.futures_meta = self.__get_futures_meta()
@@ -71,16 +95,18 @@ class FuturesUniverse(Universe):
         self.inactive_list = []
         self.active_products = {}
         self.inactive_products = {}
+        self._roll = None
+        self._own_activations = None
     
 
     def __create_assets(self, name, bar):
         for k, v in self.futures_meta.items():
-            self.assets[k] = Future(k, name, bar, v)
+            self.assets[k] = Future(k, name, bar, v, timed = self.timed)
         if self.include_continuations:
             for product in self.products:
                 for i in range(self.continuation_periods[0], self.continuation_periods[1] + 1):
                     cont = f'{product}-{i}'
-                    self.assets[cont] = Future(cont, name, bar, {}, tradeable_override = True)
+                    self.assets[cont] = Future(cont, name, bar, {}, tradeable_override = True, timed = self.timed)
                     self.continuations.append(cont)
 
     def __get_products_meta(self):
@@ -152,6 +178,94 @@ class FuturesUniverse(Universe):
             return []
 
 
+    def __build_roll_index(self, ns):
+        """precomputes the roll rows of every product on the clock calendar ns"""
+
+        identifiers = list(self.activations.groups[self.name])
+        index = {a: i for i, a in enumerate(identifiers)}
+
+        products = {}
+        for product in self.products:
+            keys = [k for k in self.calendar_indexes[product] if not pd.isnull(k)]
+            rolls = np.array([k.value for k in keys], dtype = np.int64)
+            width = max([len(self.calendars[product][k]) for k in keys], default = 0)
+            rows = np.full((len(keys), width), -1, dtype = np.int64)
+            for r, k in enumerate(keys):
+                for c, a in enumerate(self.calendars[product][k].values()):
+                    rows[r, c] = index.get(a, -1) if isinstance(a, str) else -1
+            n = np.searchsorted(rolls, ns, side = 'left')
+            products[product] = {
+                'keys': keys,
+                'rows': rows,
+                'active': np.searchsorted(rolls, ns, side = 'right'),
+                'inactive': np.where((n >= 1) & (n < len(keys)), n - 1, 0),
+                'state': None,
+                'list': [],
+            }
+
+        self._roll = {
+            'calendar': ns,
+            'identifiers': identifiers,
+            'index': index,
+            'mask': np.zeros(len(identifiers), dtype = bool),
+            'step': None,
+            'version': 0,
+            'tradeable': [],
+            'products': products,
+        }
+
+    def __activations(self):
+        own = self.activations is not None and self.activations is self._own_activations
+        if self.activations is None or (own and self.activations.manager is not self.manager):
+            self.activations = self._own_activations = ActivationQueue(self.manager)
+            self.activations.register(self.name, self.assets.values())
+            own = True
+        if own:
+            self.activations.update()
+        return self.activations
+
+    def __step(self):
+        activations = self.__activations()
+        ns = getattr(self.manager, 'master_ns', None)
+        if ns is None or len(ns) == 0 or self.name not in activations.groups:
+            return None, None
+        if activations.step is None:
+            if self._roll is None or self._roll['calendar'] is not ns:
+                self.__build_roll_index(ns)
+            return ns, None
+        if self._roll is None or self._roll['calendar'] is not activations.calendar:
+            self.__build_roll_index(activations.calendar)
+        return ns, activations.step
+
+    def __update_tradeable(self, step):
+        roll = self._roll
+        activations = self.activations
+        if roll['step'] is not None and step == roll['step'] + 1 and activations.incremental:
+            added, removed = activations.deltas.get(self.name, ([], []))
+            changed = len(added) + len(removed) > 0
+        else:
+            changed = step != roll['step']
+        roll['step'] = step
+        if changed:
+            roll['mask'] = mask = activations.mask(self.name)
+            roll['version'] += 1
+            roll['tradeable'] = [roll['identifiers'][i] for i in np.flatnonzero(mask)]
+
+    def __inactive(self, product, active_row, n_inactive):
+        roll = self._roll
+        state = roll['products'][product]
+        key = (active_row, n_inactive, roll['version'])
+        if state['state'] != key:
+            rows = state['rows']
+            candidates = rows[:n_inactive].ravel()
+            candidates = candidates[candidates >= 0]
+            active = rows[active_row] if active_row < len(rows) else np.array([], dtype = np.int64)
+            candidates = candidates[~roll['mask'][candidates] & ~np.isin(candidates, active)]
+            _, first = np.unique(candidates, return_index = True)
+            state['list'] = [roll['identifiers'][i] for i in candidates[np.sort(first)]]
+            state['state'] = key
+        return list(state['list'])
+
     def refresh(self):
         """ active contracts returned as dict in format: 
             {
@@ -164,22 +278,48 @@ class FuturesUniverse(Universe):
         inactive_products = {}
         active_list = []
         inactive_list = [] 
-        tradeable = [asset.identifier for asset in list(self.assets.values()) if asset.tradeable]
+
+        now = pd.Timestamp(self.manager.now)
+        ns, step = self.__step()
+        if step is None:
+            if ns is None:
+                self._roll = None
+                tradeable = [asset.identifier for asset in list(self.assets.values()) if asset.tradeable]
+            else:
+                self._roll['step'] = None
+                self._roll['mask'] = np.array([self.assets[a].tradeable for a in self._roll['identifiers']], dtype = bool)
+                self._roll['version'] += 1
+                tradeable = [a for a, t in zip(self._roll['identifiers'], self._roll['mask']) if t]
+        else:
+            self.__update_tradeable(step)
+            tradeable = list(self._roll['tradeable'])
+
         for product in self.products:
-            active_date = self.find_date(self.calendar_indexes[product], self.manager.now)
-            active_products[product] = self.calendars[product].get(active_date)
-            if active_products[product] is None:
-                active_products[product] = {}
-
-            
-            i_list = []
-            for index in self.find_date(self.calendar_indexes[product], self.manager.now, actor = 'inactive'):
-                for a in list(self.calendars[product][index].values()):
-                    if not self.assets[a].tradeable and a not in list(active_products[product].values()):
-                        i_list.append(a)
-            
-            i_list = list(set(i_list))
-            #i_list = list(set(i_list).symmetric_difference(set(list(active_products[product].values()))))
+            if self._roll is not None:
+                state = self._roll['products'][product]
+                keys = state['keys']
+                if step is not None:
+                    active_row, n_inactive = int(state['active'][step]), int(state['inactive'][step])
+                else:
+                    rolls = np.array([k.value for k in keys], dtype = np.int64)
+                    active_row = int(np.searchsorted(rolls, now.value, side = 'right'))
+                    n = int(np.searchsorted(rolls, now.value, side = 'left'))
+                    n_inactive = n - 1 if 1 <= n < len(keys) else 0
+                active_products[product] = dict(self.calendars[product][keys[active_row]]) if active_row < len(keys) else {}
+                i_list = self.__inactive(product, active_row, n_inactive)
+            else:
+                active_date = self.find_date(self.calendar_indexes[product], self.manager.now)
+                active_products[product] = self.calendars[product].get(active_date)
+                if active_products[product] is None:
+                    active_products[product] = {}
+
+                i_list = []
+                for index in self.find_date(self.calendar_indexes[product], self.manager.now, actor = 'inactive'):
+                    for a in list(self.calendars[product][index].values()):
+                        if not self.assets[a].tradeable and a not in list(active_products[product].values()):
+                            i_list.append(a)
+                i_list = list(set(i_list))
+
             inactive_products[product] = i_list
             inactive_list.extend(i_list)
             active_list.extend(list(active_products[product].values()))
@@ -26,6 +26,8 @@ class Universe():
         sets self.end_date
     set_manager(manager : FeedManager)
         sets self.manager
+    set_activations(activations : ActivationQueue)
+        shares the ActivationQueue the universe reads its tradeable assets from (the Engine's), see ActivationQueue
     
     """
 
@@ -35,6 +37,7 @@ class Universe():
         self.name = name
         self.start_date = start_date 
         self.end_date = end_date
+        self.activations = None
         
     
     def set_start_date(self, date):
@@ -47,3 +50,6 @@ class Universe():
         self.manager = manager 
         for a in self.assets.values():
             a.set_manager(manager)
+
+    def set_activations(self, activations):
+        self.activations = activations
@@ -1,10 +1,5 @@
 from tradester.feeds.static import SecuritiesTS
 
-from matplotlib.gridspec import GridSpec
-from tqdm import tqdm
-
-import matplotlib.pyplot as plt
-import matplotlib as mpl
 import pandas as pd
 import numpy as np
 import calendar
@@ -46,22 +41,24 @@ class Metrics():
         #    self.values = self.values.loc[self.values.index >= pd.to_datetime(self.trade_start_date)]
         #    self.trading_log = self.trading_log.loc[self.trading_log.date >= pd.to_datetime(self.trade_start_date)]
 
-        self.values['expanding_max'] = self.values['value'].expanding().max()
-        self.values['dd_%'] = (self.values['value'] / self.values['expanding_max'] - 1).apply(lambda x: 0 if x > 0 else x)
-        self.values['dd_$'] = (self.values['value'] - self.values['expanding_max']).apply(lambda x: 0 if x > 0 else x)
-        self.values['Long Market Value'] = self.values['long_equity'] / self.values['value']
-        self.values['Short Market Value'] = self.values['short_equity'] / self.values['value']
+        dates = pd.DatetimeIndex(self.values.index)
+        value = self.values['value']
+
+        self.values['expanding_max'] = value.cummax()
+        self.values['dd_%'] = (value / self.values['expanding_max'] - 1).clip(upper = 0)
+        self.values['dd_$'] = (value - self.values['expanding_max']).clip(upper = 0)
+        self.values['Long Market Value'] = self.values['long_equity'] / value
+        self.values['Short Market Value'] = self.values['short_equity'] / value
         self.values['Net Market Value'] = self.values['Long Market Value'] + self.values['Short Market Value'] 
         self.values['Gross Market Value'] = self.values['Long Market Value'] - self.values['Short Market Value'] 
-        self.values['cash%'] = self.values['cash']/self.values['value'] - 1
-        self.values['%'] = self.values['value'].pct_change().fillna(0)
-        self.values['$'] = self.values['value'].diff().fillna(0)
+        self.values['cash%'] = self.values['cash']/value - 1
+        self.values['%'] = value.pct_change().fillna(0)
+        self.values['$'] = value.diff().fillna(0)
         self.values['cumulative'] = (1+self.values['%']).cumprod().fillna(1)
-        self.values['date'] = self.values.index
-        self.values['date'] = self.values['date'].apply(lambda x: x.strftime('%Y-%m-%d'))
-        self.values['year-month'] = self.values['date'].apply(lambda x: pd.to_datetime(f'{x.split("-")[0]}' +'-'+ f'{x.split("-")[1]}'+'-01'))
-        self.values['year'] = self.values['date'].apply(lambda x: pd.to_datetime(f'{x.split("-")[0]}'+'-01-01'))
-        self.values['day_of_year'] = self.values['date'].apply(lambda x: pd.to_datetime(x).timetuple().tm_yday)
+        self.values['date'] = np.datetime_as_string(dates.values, unit = 'D')
+        self.values['year-month'] = dates.to_period('M').to_timestamp()
+        self.values['year'] = dates.to_period('Y').to_timestamp()
+        self.values['day_of_year'] = dates.dayofyear.astype(np.int64)
 
         self.monthly_returns_pct, self.monthly_returns_usd, self.yearly_returns, self.ts_yearly_returns_usd, self.ts_yearly_returns_pct = self.__group_returns()
 
@@ -79,9 +76,9 @@ class Metrics():
         
         if not self.trading_log is None and not self.trading_log.empty:
             stats['Trade num'] = len(self.trading_log.index)
-            stats['Trade Win Rate'] = self.trading_log['%c'].map(lambda x: 1 if x > 0 else 0).sum() / stats['Trade num']
-            stats['Trade Loss Rate'] = self.trading_log['%c'].map(lambda x: 1 if x < 0 else 0).sum() / stats['Trade num']
-            stats['Trade Pass Rate'] = self.trading_log['%c'].map(lambda x: 1 if x == 0 else 0).sum() / stats['Trade num']
+            stats['Trade Win Rate'] = (self.trading_log['%c'] > 0).sum() / stats['Trade num']
+            stats['Trade Loss Rate'] = (self.trading_log['%c'] < 0).sum() / stats['Trade num']
+            stats['Trade Pass Rate'] = (self.trading_log['%c'] == 0).sum() / stats['Trade num']
             stats['Trade Win Avg (%c)'] = self.trading_log.loc[self.trading_log['%c'] > 0]['%c'].mean()
             stats['Trade Win Std (%c)'] = self.trading_log.loc[self.trading_log['%c'] > 0]['%c'].std()
             stats['Trade Loss Avg (%c)'] = self.trading_log.loc[self.trading_log['%c'] < 0]['%c'].mean()
@@ -104,42 +101,43 @@ class Metrics():
    
 
     def __group_returns(self):
+        growth = 1 + self.values['%']
+        months = self.values['year-month']
+        years = self.values['year']
+
+        grouped_m_returns_pct = (growth.groupby(months).prod() - 1).to_frame('%')
+        grouped_m_returns_usd = self.values['$'].groupby(months).sum().to_frame('$')
+        grouped_m_returns_pct = self.__pivot_months(grouped_m_returns_pct, '%')
+        grouped_m_returns_usd = self.__pivot_months(grouped_m_returns_usd, '$')
 
-        grouped_m_returns_pct = self.values[['%', 'year-month']].groupby('year-month').apply(lambda x: (1+x).prod() -1)
-        grouped_m_returns_pct['month_num'] = grouped_m_returns_pct.index.month
-        grouped_m_returns_pct['year'] = grouped_m_returns_pct.index.year
-        grouped_m_returns_pct = grouped_m_returns_pct.pivot_table(index = 'year', columns = 'month_num', values= '%')
-        grouped_m_returns_pct.columns = [calendar.month_name[x] for x in grouped_m_returns_pct.columns]
-        grouped_m_returns_pct.index.name = 'Year'
-        grouped_m_returns_usd = self.values[['$', 'year-month']].groupby('year-month').apply(lambda x: x.sum())
-        grouped_m_returns_usd['month_num'] = grouped_m_returns_usd.index.month
-        grouped_m_returns_usd['year'] = grouped_m_returns_usd.index.year
-        grouped_m_returns_usd = grouped_m_returns_usd.pivot_table(index = 'year', columns = 'month_num', values= '$')
-        grouped_m_returns_usd.columns = [calendar.month_name[x] for x in grouped_m_returns_usd.columns]
-        grouped_m_returns_usd.index.name = 'Year'
-
-        grouped_y_returns = self.values[['%', 'year']].groupby('year').apply(lambda x: (1+x).prod() - 1)
-        grouped_y_returns_vol = self.values[['%', 'year']].groupby('year').apply(lambda x: x.std() * np.sqrt(252))
-        grouped_y_returns['volatility'] = grouped_y_returns_vol['%']
+        grouped_y_returns = (growth.groupby(years).prod() - 1).to_frame('%')
+        grouped_y_returns['volatility'] = self.values['%'].groupby(years).std() * np.sqrt(252)
         grouped_y_returns['sharpe'] = grouped_y_returns['%'] / grouped_y_returns['volatility']
         grouped_y_returns.index = grouped_y_returns.index.year
         grouped_y_returns.columns = ['Return', 'Volatility', 'Sharpe']
         grouped_y_returns.index.name = 'Year' 
 
-        grouped_y_returns_usd = self.values[['$', 'year']].groupby('year').apply(lambda x: x.sum()) 
-        grouped_y_returns_usd.index = grouped_y_returns_usd.index.year
-        grouped_y_returns['PnL'] = grouped_y_returns_usd['$']
+        grouped_y_returns['PnL'] = self.values['$'].groupby(years).sum().values
         grouped_y_returns.loc['mean'] = grouped_y_returns.mean()
 
         grouped_y_ts_returns_usd = self.values.pivot_table(index = 'day_of_year', columns = 'year', values='$').fillna(0)
         grouped_y_ts_returns_pct = self.values.pivot_table(index = 'day_of_year', columns = 'year', values='%').fillna(0)
-        grouped_y_ts_returns_usd.columns = [x.year for x in grouped_y_ts_returns_usd.columns]
-        grouped_y_ts_returns_pct.columns = [x.year for x in grouped_y_ts_returns_pct.columns]
+        grouped_y_ts_returns_usd.columns = grouped_y_ts_returns_usd.columns.year.astype(np.int64).rename(None)
+        grouped_y_ts_returns_pct.columns = grouped_y_ts_returns_pct.columns.year.astype(np.int64).rename(None)
         grouped_y_ts_returns_usd = grouped_y_ts_returns_usd.cumsum()
         grouped_y_ts_returns_pct = (1+grouped_y_ts_returns_pct).cumprod()-1
 
         return grouped_m_returns_pct, grouped_m_returns_usd, grouped_y_returns, grouped_y_ts_returns_usd, grouped_y_ts_returns_pct
 
+    @staticmethod
+    def __pivot_months(grouped, column):
+        grouped['month_num'] = grouped.index.month
+        grouped['year'] = grouped.index.year
+        grouped = grouped.pivot_table(index = 'year', columns = 'month_num', values = column)
+        grouped.columns = [calendar.month_name[x] for x in grouped.columns]
+        grouped.index.name = 'Year'
+        return grouped
+
 
     def print(self):
         print()
@@ -174,6 +172,10 @@ class Metrics():
         pass
 
     def plot(self, plot_type = '$', start_year = None):
+        from matplotlib.gridspec import GridSpec
+        import matplotlib.pyplot as plt
+        import matplotlib as mpl
+
         fig = plt.figure()
         gs = GridSpec(2, 2, figure =fig)
         ax1 = fig.add_subplot(gs[0,:])
@@ -228,3 +230,92 @@ class Metrics():
         ax1.legend()
         plt.colorbar(s_m, ax = ax3)
         plt.show()
+
+
+class OnlineMetrics():
+    """
+    OnlineMetrics updates the portfolio level statistics of Metrics incrementally, one portfolio value at a time,
+    so they are available while the backtest runs (e.g. for a live dashboard) without a final pass over the values.
+    Returns, volatility and downside volatility are tracked with Welford's algorithm (sample standard deviation,
+    like pandas), drawdowns with a running maximum.
+
+    ...
+
+    Attributes
+    ----------
+    n : int
+        number of values seen
+    value : float
+        last value seen
+    drawdown : float
+        current drawdown (%)
+    statistics : dict
+        Cumulative Return, Annualized Return, Annualized Volatility, Sharpe, Sortino, Max Drawdown and Calmar,
+        keyed like Metrics.statistics
+
+    Methods
+    -------
+    update(value : float)
+        adds the latest portfolio value
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.value = None
+        self._first = None
+        self._growth = 1.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._down_n = 0
+        self._down_mean = 0.0
+        self._down_m2 = 0.0
+        self._max = -np.inf
+        self._max_dd_pct = 0.0
+        self._max_dd_usd = 0.0
+
+    @property
+    def drawdown(self):
+        return min(self.value / self._max - 1, 0) if self.n > 0 else 0
+
+    def update(self, value):
+        value = float(value)
+        r = 0.0 if self.value is None else value / self.value - 1
+        if self._first is None:
+            self._first = value
+        self.value = value
+        self.n += 1
+
+        self._growth *= 1 + r
+        delta = r - self._mean
+        self._mean += delta / self.n
+        self._m2 += delta * (r - self._mean)
+        if r < 0:
+            self._down_n += 1
+            delta = r - self._down_mean
+            self._down_mean += delta / self._down_n
+            self._down_m2 += delta * (r - self._down_mean)
+
+        self._max = max(self._max, value)
+        self._max_dd_pct = min(self._max_dd_pct, value / self._max - 1)
+        self._max_dd_usd = min(self._max_dd_usd, value - self._max)
+
+    @property
+    def statistics(self):
+        stats = {}
+        if self.n == 0:
+            return stats
+
+        vol = np.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else np.nan
+        down_vol = np.sqrt(self._down_m2 / (self._down_n - 1)) if self._down_n > 1 else np.nan
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            stats['Cumulative Return (%)'] = self._growth - 1
+            stats['Cumulative Return ($)'] = self.value - self._first
+            stats['Annualized Return (%)'] = self._growth ** (252 / self.n) - 1
+            stats['Annualized Volatility (%)'] = np.float64(vol * np.sqrt(252))
+            stats['Sharpe Ratio'] = stats['Annualized Return (%)'] / stats['Annualized Volatility (%)']
+            stats['Sortino Ratio'] = stats['Annualized Return (%)'] / np.float64(down_vol * np.sqrt(252))
+            stats['Max Drawdown (%)'] = self._max_dd_pct
+            stats['Max Drawdown ($)'] = self._max_dd_usd
+            stats['Calmar Ratio'] = stats['Annualized Return (%)'] / np.float64(abs(self._max_dd_pct))
+        return stats
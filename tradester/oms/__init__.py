@@ -1 +1,2 @@
 from .oms import *
+from .liquidity import *
@@ -0,0 +1,124 @@
+import numpy as np
+
+
+class LiquidityTracker():
+    """
+    The LiquidityTracker keeps a running adv_period volume sum and the latest open interest for every asset
+    the OMS has sized an order for, so participation caps are O(1) per order instead of a fresh mean over the
+    volume stream. Each asset's state is synced from its volume stream pointer, only the bars pushed since the
+    last sync are added (and the bars that fell out of the window subtracted). The sum is recomputed exactly
+    from the stream once every adv_period bars.
+
+    ...
+
+    Parameters
+    ----------
+    adv_period : int, optional (default : 21)
+        days for which to calculate average daily volume
+    adv_participation : float, optional (default : .10)
+        percentage of average daily volume for the asset traded
+    adv_oi : float, optional (default : .05)
+        percentage of open interest to trade with, futures only
+
+    Attributes
+    ----------
+    rows : dict
+        identifier -> row of the asset in the state arrays
+
+    Methods
+    -------
+    update(asset : tradester.finance.Asset)
+        syncs the asset's running volume sum and open interest with its price stream, returns its row
+    adv(asset : tradester.finance.Asset)
+        returns the average daily volume over the last adv_period bars
+    max_shares(asset : tradester.finance.Asset)
+        returns the maximum tradeable shares based on adv_participation and adv_oi if applicable
+    max_shares_all(assets : list)
+        returns an np.Array of max_shares for every asset in assets
+
+    Notes
+    -----
+    If the price streams are cached and the bars that left the window were already evicted, the sum is
+    recomputed from the last adv_period bars, so the cache must hold at least adv_period bars.
+
+    A NaN average daily volume or open interest (ex: a NaN volume bar in the window) gives no liquidity, that
+    part of the cap is 0.
+    """
+
+    def __init__(self, adv_period = 21, adv_participation = .10, adv_oi = .05):
+        self.adv_period = adv_period
+        self.adv_participation = adv_participation
+        self.adv_oi = adv_oi
+        self.rows = {}
+        self._streams = []
+        self._sums = np.zeros(0)
+        self._counts = np.zeros(0, dtype = np.int64)
+        self._seen = np.zeros(0, dtype = np.int64)
+        self._oi = np.zeros(0)
+        self._futures = np.zeros(0, dtype = bool)
+
+    def _add_row(self, asset):
+        row = len(self._streams)
+        if row == self._sums.size:
+            size = max(2 * row, 64)
+            self._sums = np.resize(self._sums, size)
+            self._counts = np.resize(self._counts, size)
+            self._seen = np.resize(self._seen, size)
+            self._oi = np.resize(self._oi, size)
+            self._futures = np.resize(self._futures, size)
+        self._streams.append(asset.price_stream)
+        self._sums[row] = 0
+        self._counts[row] = 0
+        self._seen[row] = 0
+        self._oi[row] = 0
+        self._futures[row] = asset.id_type == 'FUT'
+        self.rows[asset.identifier] = row
+        return row
+
+    def update(self, asset):
+        row = self.rows.get(asset.identifier)
+        if row is None or self._streams[row] is not asset.price_stream:
+            row = self._add_row(asset)
+
+        volume = asset.price_stream.volume
+        pointer = volume.pointer
+        new = pointer - self._seen[row]
+        if new > 0:
+            ts = volume.ts
+            period = self.adv_period
+            offset = pointer - len(ts)
+            start = max(self._seen[row] - period, 0) - offset
+            end = max(pointer - period, 0) - offset
+            if new >= period or start < 0 or self._seen[row] // period != pointer // period:
+                self._sums[row] = ts[-period:].sum()
+            else:
+                self._sums[row] += ts[len(ts) - new:].sum() - ts[start:end].sum()
+            self._counts[row] = min(pointer, period)
+            self._seen[row] = pointer
+
+        if self._futures[row]:
+            self._oi[row] = asset.price_stream.open_interest.v
+        return row
+
+    def adv(self, asset):
+        row = self.update(asset)
+        return self._sums[row] / self._counts[row] if self._counts[row] > 0 else 0
+
+    @staticmethod
+    def _shares(x):
+        # truncated like int(), NaN -> 0
+        return np.trunc(np.nan_to_num(x, nan = 0, posinf = 0, neginf = 0)).astype(np.int64)
+
+    def _max_shares(self, rows):
+        counts = self._counts[rows]
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            adv = self._shares(np.where(counts > 0, self._sums[rows] / counts * self.adv_participation, 0))
+        oi = self._shares(self._oi[rows] * self.adv_oi)
+        return np.where(self._futures[rows], np.maximum(oi, adv), adv)
+
+    def max_shares(self, asset):
+        row = self.update(asset)
+        return int(self._max_shares(np.array([row]))[0])
+
+    def max_shares_all(self, assets):
+        return self._max_shares(np.array([self.update(a) for a in assets], dtype = np.int64))
@@ -1,4 +1,5 @@
 from .order import Order
+from .liquidity import LiquidityTracker
 
 import numpy as np
 
@@ -7,6 +8,24 @@ STANDARD_FEES = {
     'SEC': 0.01,
 }
 
+ORDER_TYPE_CODES = {
+    'MARKET': 0,
+    'OPEN': 1,
+    'LIMIT': 2,
+    'LOF': 3,
+    'RANGE': 4,
+    'RANGE_BOUND_C': 5,
+    'INVERSE_BOUND_C': 6,
+    'RANGE_BOUND_O': 7,
+    'INVERSE_BOUND_O': 8,
+    'BEST_FILL': 9,
+    'WORST_FILL': 10,
+    'TRIANGULAR_C': 11,
+    'TRIANGULAR_O': 12,
+    'BAR_AVG': 13,
+    'TWAP': 14,
+}
+
 class OMS():
     """
     The Order Management System (OMS) is meant to the point of contact between a user defined strategy
@@ -25,6 +44,9 @@ class OMS():
         percentage of open interested to trade with
     fee structure : dict, optional
         fee structure for asset types to calculate trading comissions and fees
+    batch : boolean, optional (default : False)
+        if True, process() prices every single sided order on the book at once with NumPy instead of one at a
+        time, fills and cancellations are still applied in order book order so the results are identical
    
 
     Attributes
@@ -39,6 +61,8 @@ class OMS():
         a one sided order book (i.e. each contract can only have one entry)
     order_log : list
         a log of all orders and order actions during the runtime
+    liquidity : tradester.oms.LiquidityTracker
+        running average daily volume and open interest used by max_shares
     
     Methods
     -------
@@ -65,14 +89,16 @@ class OMS():
             TRIANGULAR_O -> fills at the average of high, low, and open
             BAR_AVG -> fills at the average of open, high, low, and close   
     max_shares(asset : tradester.finance.Asset)
-        returns the maximum tradeable shares based on adv_participation and adv_oi if applicable
+        returns the maximum tradeable shares based on adv_participation and adv_oi if applicable, see LiquidityTracker
     process()
-        processes all orders on the order_book to check for fills
+        processes all orders on the order_book to check for fills, in one vectorized pass if batch
          
     """
 
-    def __init__(self, adv_participation = .10, adv_period = 21, adv_oi = .05, fee_structure = None):
+    def __init__(self, adv_participation = .10, adv_period = 21, adv_oi = .05, fee_structure = None, batch = False):
         self.adv_participation = adv_participation
+        self.batch = batch
+        self.liquidity = LiquidityTracker(adv_period = adv_period, adv_participation = adv_participation, adv_oi = adv_oi)
         self.adv_period = adv_period
         self.adv_oi = adv_oi
         self.fee_structure = STANDARD_FEES if fee_structure is None else fee_structure 
@@ -174,13 +200,7 @@ class OMS():
                 )
     
     def max_shares(self, asset):
-        adv = int(asset.price_stream.volume.ts[-self.adv_period:].mean() * self.adv_participation)
-
-        if asset.id_type == 'FUT':
-            oi = int(asset.price_stream.open_interest.v * self.adv_oi)
-            adv = max(oi, adv)
-
-        return adv
+        return self.liquidity.max_shares(asset)
 
 
     def _process_single_order(self, identifier, order):
@@ -234,7 +254,7 @@ class OMS():
                     fill_price = limit
                 elif close >= limit:
                     order_fill = True
-                    fill_price == limit
+                    fill_price = limit
         elif order_type == 'LOF':
             limit = bands['LIMIT']
             if side == 1:
@@ -323,7 +343,7 @@ class OMS():
 
         if not order_fill and not order.canceled:
             if not info['time_in_force'] is None and info['time_in_force'] >= info['days_on']:
-                order.cancel()
+                order.cancel(self.manager.now)
                 self._remove_from_ob(identifier)
 
     def _process_complex_order(self, identifier, order):
@@ -403,7 +423,90 @@ class OMS():
 
 
 
+    @staticmethod
+    def _batch_fills(codes, side, limit, open, high, low, close):
+        buy = side == 1
+        with np.errstate(invalid = 'ignore'):
+            hit = np.where(buy, (low <= limit) | (close <= limit), (high >= limit) | (close >= limit))
+            up = close > open
+        hl = (high + low) / 2
+
+        prices = [
+            close,
+            open,
+            limit,
+            np.where(hit, limit, close),
+            hl,
+            np.where(buy, (low + close) / 2, (high + close) / 2),
+            np.where(buy, (high + close) / 2, (low + close) / 2),
+            np.where(buy, (low + open) / 2, (high + open) / 2),
+            np.where(buy, (high + open) / 2, (low + open) / 2),
+            np.where(buy, low, high),
+            np.where(buy, high, low),
+            (high + low + close) / 3,
+            (high + low + open) / 3,
+            (high + low + open + close) / 4,
+            np.where(
+                up,
+                ((open + low) / 2 + hl + (high + close) / 2) / 3,
+                ((open + high) / 2 + hl + (low + close) / 2) / 3,
+            ),
+        ]
+        fill_price = np.select([codes == c for c in range(len(prices))], prices, default = np.nan)
+        order_fill = (codes >= 0) & ((codes != ORDER_TYPE_CODES['LIMIT']) | hit)
+        return order_fill, fill_price
+
+    def _process_batch(self, orders):
+        singles = [k for k, (identifier, order) in enumerate(orders) if order.side != 0 and order.asset.tradeable]
+        n = len(singles)
+
+        codes = np.empty(n, dtype = np.int64)
+        side = np.empty(n)
+        limit = np.empty(n)
+        ohlc = np.empty((4, n))
+        units = []
+        for j, k in enumerate(singles):
+            order = orders[k][1]
+            price_stream = order.asset.price_stream
+            codes[j] = ORDER_TYPE_CODES.get(order.order_type, -1)
+            side[j] = order.side
+            limit[j] = order.bands.get('LIMIT', np.nan) if order.order_type in ('LIMIT', 'LOF') else np.nan
+            ohlc[0, j] = price_stream.open.v
+            ohlc[1, j] = price_stream.high.v
+            ohlc[2, j] = price_stream.low.v
+            ohlc[3, j] = price_stream.close.v
+            units.append(order.units)
+
+        max_shares = self.liquidity.max_shares_all([orders[k][1].asset for k in singles])
+
+        order_fill, fill_price = self._batch_fills(codes, side, limit, *ohlc)
+        filled_units = np.minimum(units, np.maximum(max_shares, 2)).tolist() if n > 0 else []
+        batch = dict(zip(singles, range(n)))
+
+        for k, (identifier, order) in enumerate(orders):
+            if order.side == 0:
+                self._process_complex_order(identifier, order)
+                continue
+
+            order.bump()
+            if k not in batch:
+                order.cancel(self.manager.now)
+                self._remove_from_ob(identifier)
+                continue
+
+            j = batch[k]
+            if order_fill[j]:
+                fee = self.fee_structure[order.id_type]
+                self._fill_order(order, fill_price[j], filled_units[j], fee * filled_units[j])
+            elif not order.canceled:
+                if not order.time_in_force is None and order.time_in_force >= order.days_on:
+                    order.cancel(self.manager.now)
+                    self._remove_from_ob(identifier)
+
     def process(self):
+        if self.batch:
+            self._process_batch(list(self.order_book.items()))
+            return
 
         for identifier, order in list(self.order_book.items()):
             if order.side != 0:
@@ -1,2 +1,4 @@
 from .portfolio import *
 from .position import *
+from .book import *
+from .recorder import *
@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class PositionBook():
+    """
+    The PositionBook holds the state of every position in flat arrays indexed by an integer asset id, so
+    membership and lookups are O(1) and the whole book can be marked to market with one NumPy expression.
+    Ids are handed out the first time an identifier is seen and are never reused.
+
+    ...
+
+    Attributes
+    ----------
+    ids : dict
+        identifier -> integer asset id
+    assets : list
+        asset of each id
+    units : np.Array
+        absolute units held per id, as filled by the OMS
+    side : np.Array
+        1 for long, -1 for short, 0 if flat
+    cost_basis : np.Array
+        cost basis per id
+    avg_px : np.Array
+        average price per id
+    multiplier : np.Array
+        contract multiplier per id
+    is_open : np.Array
+        True if the id has an open position
+    open_ids : np.Array
+        ids of the open positions, in id order
+
+    Methods
+    -------
+    id(asset : tradester.finance.Asset)
+        returns the id of the asset, assigning one if needed
+    open(asset : tradester.finance.Asset, side : int, units : float, cost_basis : float, avg_px : float)
+        opens (or replaces) the position of the asset
+    close(identifier : string)
+        flattens the position of identifier
+    info(identifier : string)
+        returns the position of identifier as a dictionary, like Position.info
+    mark(ids : np.Array)
+        returns the (market_value, pnl) arrays of ids at the current price
+    """
+
+    def __init__(self, capacity = 64):
+        self.ids = {}
+        self.assets = []
+        self.units = np.zeros(capacity)
+        self.side = np.zeros(capacity, dtype = np.int8)
+        self.cost_basis = np.zeros(capacity)
+        self.avg_px = np.zeros(capacity)
+        self.multiplier = np.ones(capacity)
+        self.is_open = np.zeros(capacity, dtype = bool)
+
+    def __contains__(self, identifier):
+        i = self.ids.get(identifier)
+        return i is not None and self.is_open[i]
+
+    def __len__(self):
+        return int(self.is_open[:len(self.assets)].sum())
+
+    @property
+    def open_ids(self):
+        return np.flatnonzero(self.is_open[:len(self.assets)])
+
+    @property
+    def identifiers(self):
+        return [self.assets[i].identifier for i in self.open_ids]
+
+    def _grow(self):
+        size = 2 * self.units.size
+        self.units = np.resize(self.units, size)
+        self.side = np.resize(self.side, size)
+        self.cost_basis = np.resize(self.cost_basis, size)
+        self.avg_px = np.resize(self.avg_px, size)
+        self.multiplier = np.resize(self.multiplier, size)
+        self.is_open = np.resize(self.is_open, size)
+        self.is_open[len(self.assets):] = False
+
+    def id(self, asset):
+        i = self.ids.get(asset.identifier)
+        if i is None:
+            i = len(self.assets)
+            if i == self.units.size:
+                self._grow()
+            self.ids[asset.identifier] = i
+            self.assets.append(asset)
+        else:
+            self.assets[i] = asset
+        return i
+
+    def open(self, asset, side, units, cost_basis, avg_px):
+        i = self.id(asset)
+        self.side[i] = side
+        self.units[i] = units
+        self.cost_basis[i] = cost_basis
+        self.avg_px[i] = avg_px
+        self.multiplier[i] = asset.price_stream.multiplier
+        self.is_open[i] = True
+        return i
+
+    def close(self, identifier):
+        i = self.ids[identifier]
+        self.is_open[i] = False
+        self.side[i] = 0
+        self.units[i] = 0
+        self.cost_basis[i] = 0
+        self.avg_px[i] = 0
+
+    def mark(self, ids):
+        price = np.array([self.assets[i].price_stream.market_value for i in ids], dtype = np.float64)
+        market_value = self.units[ids] * price * self.side[ids]
+        return market_value, market_value - self.cost_basis[ids]
+
+    def _info(self, i, market_value, pnl):
+        asset = self.assets[i]
+        return {
+            'id_type': asset.id_type,
+            'identifier': asset.identifier,
+            'side': int(self.side[i]),
+            'multiplier': self.multiplier[i],
+            'units': int(self.units[i]) if self.units[i] == int(self.units[i]) else float(self.units[i]),
+            'cost_basis': self.cost_basis[i],
+            'market_value': market_value,
+            'pnl': pnl,
+            'avg_px': self.avg_px[i],
+            'last': asset.price_stream.close.v,
+        }
+
+    def info(self, identifier):
+        i = self.ids[identifier]
+        market_value = self.units[i] * self.assets[i].price_stream.market_value * self.side[i]
+        return self._info(i, market_value, market_value - self.cost_basis[i])
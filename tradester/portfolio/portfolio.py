@@ -1,11 +1,79 @@
-from .position import Position
+from .book import PositionBook
+from .recorder import Recorder
 
 import pandas as pd
+import numpy as np
+
+
+HOLDINGS_FIELDS = {
+    'id_type': 'category',
+    'identifier': 'category',
+    'side': 'int8',
+    'multiplier': 'float64',
+    'units': 'float64',
+    'cost_basis': 'float64',
+    'market_value': 'float64',
+    'pnl': 'float64',
+    'avg_px': 'float64',
+    'last': 'float64',
+    'date': 'datetime',
+}
+
+VALUES_FIELDS = {
+    'date': 'datetime',
+    'value': 'float64',
+    'cash': 'float64',
+    'long_equity': 'float64',
+    'short_equity': 'float64',
+    'pnl': 'float64',
+}
+
+TRADING_LOG_FIELDS = {
+    'date': 'datetime',
+    'id_type': 'category',
+    'identifier': 'category',
+    'side': 'int8',
+    '%c': 'float64',
+    'gross': 'float64',
+    'per contract': 'float64',
+}
 
 
 class Portfolio():
+    """
+    The Portfolio holds cash and positions, and records holdings, values and the trading log in columnar
+    Recorders as the backtest runs.
+
+    ...
+
+    Parameters
+    ----------
+    starting_cash : float
+        cash at the start of the backtest
+    print_trades : boolean, optional (default : False)
+        print every trade and settlement
+    record_holdings : boolean, optional (default : True)
+        record every open position on each reconcile, if False only values and the trading log are kept
+    holdings_sample : int, optional (default : 1)
+        record holdings on every holdings_sample-th reconcile
+    spill_dir : string, optional
+        directory the recorders spill chunks of rows to as .npy files, kept in memory if None
+    chunk_rows : int, optional (default : 1,000,000)
+        rows buffered by a recorder before spilling
 
-    def __init__(self, starting_cash, print_trades = False):
+    Attributes
+    ----------
+    book : tradester.portfolio.PositionBook
+        array backed state of every position
+    holdings : tradester.portfolio.Recorder
+        one row per open position per reconcile
+    values : tradester.portfolio.Recorder
+        one row of portfolio info per reconcile
+    trading_log : tradester.portfolio.Recorder
+        one row per closed (or settled) trade
+    """
+
+    def __init__(self, starting_cash, print_trades = False, record_holdings = True, holdings_sample = 1, spill_dir = None, chunk_rows = 1000000):
         self._cash = starting_cash
         self._value = starting_cash
         self.print_trades = print_trades
@@ -13,10 +81,11 @@ class Portfolio():
         self._short_equity = 0
         self._pnl = 0
         self.manager = None
-        self._positions = {}
-        self.values = []
-        self.holdings = []
-        self.trading_log = []
+        self.book = PositionBook()
+        self.record_holdings = record_holdings
+        self.values = Recorder(VALUES_FIELDS, spill_dir = spill_dir, chunk_rows = chunk_rows, name = 'values')
+        self.holdings = Recorder(HOLDINGS_FIELDS, sample = holdings_sample, spill_dir = spill_dir, chunk_rows = chunk_rows, name = 'holdings')
+        self.trading_log = Recorder(TRADING_LOG_FIELDS, spill_dir = spill_dir, chunk_rows = chunk_rows, name = 'trading_log')
     
     @property
     def cash(self):
@@ -40,7 +109,7 @@ class Portfolio():
 
     @property
     def positions(self):
-        return {i: v.info for i, v in list(self._positions.items())}
+        return {i: self.book.info(i) for i in self.book.identifiers}
 
     @property
     def info(self):
@@ -55,21 +124,21 @@ class Portfolio():
     
     @property
     def holdings_df(self):
-        return pd.DataFrame(self.holdings)
+        return self.holdings.df
 
     @property
     def values_df(self):
-        return pd.DataFrame(self.values)
+        return self.values.df
     
     @property
     def trading_log_df(self):
-        return pd.DataFrame(self.trading_log)
+        return self.trading_log.df
     
     def get_position(self, contract):
-        if contract not in self._positions.keys():
+        if contract not in self.book:
             return {'units': 0, 'side': 0}
         else:
-            return self._positions[contract].info
+            return self.book.info(contract)
 
     def _connect(self, manager):
         self.manager = manager
@@ -87,8 +156,8 @@ class Portfolio():
         
         self._cash -= cost_basis
 
-        if not identifier in self.positions.keys():
-            self._positions[identifier] = Position(
+        if not identifier in self.book:
+            self.book.open(
                                             asset,
                                             1,
                                             units,
@@ -96,7 +165,8 @@ class Portfolio():
                                             cost_basis / multiplier / units
                                         )
         else:
-            current = self._positions.pop(identifier).info
+            current = self.book.info(identifier)
+            self.book.close(identifier)
             pos_delta = (current['side']*current['units']) + units
             cb_delta = current['cost_basis'] + cost_basis
 
@@ -119,7 +189,7 @@ class Portfolio():
 
             if pos_delta != 0:
                 side = 1 if pos_delta > 0 else -1
-                self._positions[identifier] = Position(
+                self.book.open(
                                                 asset,
                                                 side,
                                                 abs(pos_delta),
@@ -137,8 +207,8 @@ class Portfolio():
         
         self._cash -= cost_basis
 
-        if not identifier in self.positions.keys():
-            self._positions[identifier] = Position(
+        if not identifier in self.book:
+            self.book.open(
                                             asset,
                                             -1,
                                             units,
@@ -147,7 +217,8 @@ class Portfolio():
                                         )
 
         else:
-            current = self._positions.pop(identifier).info
+            current = self.book.info(identifier)
+            self.book.close(identifier)
             pos_delta = (current['side']*current['units']) - units 
             cb_delta = current['cost_basis'] + cost_basis
             
@@ -169,7 +240,7 @@ class Portfolio():
 
             if pos_delta != 0:
                 side = 1 if pos_delta > 0 else -1
-                self._positions[identifier] = Position(
+                self.book.open(
                                                 asset,
                                                 side,
                                                 abs(pos_delta),
@@ -178,47 +249,57 @@ class Portfolio():
                                             )
     
     def reconcile(self):
-        """Reconciles portfolio value at end of trading day"""
-        market_value = 0
-        long_equity = 0
-        short_equity = 0
-        pnl = 0
+        """Reconciles portfolio value at end of trading day, marking every open position to market at once"""
+        book = self.book
+        ids = book.open_ids
+        market_value, pnl = book.mark(ids)
+        tradeable = np.array([book.assets[i].tradeable for i in ids], dtype = bool)
 
-        for identifier, position in list(self._positions.items()):
-            asset = position.asset
+        if self.record_holdings:
+            assets = [book.assets[i] for i in ids]
+            self.holdings.extend({
+                'id_type': [a.id_type for a in assets],
+                'identifier': [a.identifier for a in assets],
+                'side': book.side[ids],
+                'multiplier': book.multiplier[ids],
+                'units': book.units[ids],
+                'cost_basis': book.cost_basis[ids],
+                'market_value': market_value,
+                'pnl': pnl,
+                'avg_px': book.avg_px[ids],
+                'last': np.array([a.price_stream.close.v for a in assets], dtype = np.float64),
+                'date': self.manager.now,
+            })
 
-            info = position.info
-            info['date'] = self.manager.now
-            self.holdings.append(info)
+        for k in np.flatnonzero(~tradeable):
+            i = ids[k]
+            asset = book.assets[i]
+            units = book.units[i]
+            side = book.side[i]
+            avg_px = book.avg_px[i]
+            multiplier = book.multiplier[i]
 
-            pnl += info['pnl']
+            if self.print_trades:
+                print('SETTLE', asset.identifier, units * side, round(market_value[k]))
 
-            if not asset.tradeable:
-                if self.print_trades:
-                    print('SETTLE', identifier, info['units'] * info['side'], round(info['market_value']))
+            book.close(asset.identifier)
+            self._cash += market_value[k]
+            new_avg = abs(market_value[k]) / multiplier / units
+            trade = {
+                'date': self.manager.now,
+                'id_type': asset.id_type,
+                'identifier': asset.identifier,
+                'side': 1,
+                '%c': (new_avg / avg_px-1)*side,
+                'gross': (new_avg - avg_px) * multiplier * units * side,
+                'per contract': (new_avg - avg_px) * multiplier * side
+            }
+            self.log_trade(trade)
 
-                del self._positions[identifier]
-                self._cash += info['market_value']
-                new_avg = abs(info['market_value']) / info['multiplier'] / info['units']
-                trade = {
-                    'date': self.manager.now,
-                    'id_type': asset.id_type,
-                    'identifier': asset.identifier,
-                    'side': 1,
-                    '%c': (new_avg / info['avg_px']-1)*info['side'],
-                    'gross': (new_avg - info['avg_px']) * info['multiplier'] * info['units'] * info['side'],
-                    'per contract': (new_avg - info['avg_px']) * info['multiplier'] * info['side']
-                }
-                self.log_trade(trade)
-            else:
-                if info['side'] == 1:
-                    long_equity += info['market_value']
-                else:
-                    short_equity += info['market_value']
-
-        self._long_equity = long_equity
-        self._short_equity = short_equity
-        self._pnl = pnl
+        side = book.side[ids]
+        self._long_equity = market_value[tradeable & (side == 1)].sum()
+        self._short_equity = market_value[tradeable & (side != 1)].sum()
+        self._pnl = pnl.sum()
         self._value = self.long_equity + self.short_equity + self.cash
 
         self.values.append(self.info)
@@ -0,0 +1,171 @@
+from glob import glob
+
+import pandas as pd
+import numpy as np
+import os
+
+
+class Recorder():
+    """
+    A Recorder is an append-only columnar log. Each field is kept in its own preallocated typed array that
+    doubles when full, string-like fields are interned to integer codes, and dates are stored as int64
+    nanoseconds, so recording a row costs a few array writes instead of a Python dict held until the end
+    of the run. Rows can optionally be spilled to .npy chunks on disk.
+
+    ...
+
+    Parameters
+    ----------
+    fields : dict
+        field name -> dtype, where dtype is a numpy dtype string, 'category' (interned) or 'datetime'
+    capacity : int, optional (default : 1024)
+        initial number of rows per array
+    sample : int, optional (default : 1)
+        only every sample-th call to append/extend is recorded
+    spill_dir : string, optional
+        directory to spill chunks of rows to as .npy files, kept in memory if None
+    chunk_rows : int, optional (default : 1,000,000)
+        number of buffered rows that triggers a spill, only used with spill_dir
+    name : string, optional (default : 'recorder')
+        prefix of the spilled chunk files
+
+    Attributes
+    ----------
+    categories : dict
+        field name -> list of the interned values of a 'category' field, the codes index into it
+    df : pd.DataFrame
+        every recorded row, 'category' fields are pd.Categorical and in memory numeric fields are views
+
+    Methods
+    -------
+    append(row : dict)
+        records one row
+    extend(columns : dict)
+        records len(columns) rows at once from arrays (or scalars broadcast to the rows)
+    clear()
+        drops every recorded row and spilled chunk
+    """
+
+    def __init__(self, fields, capacity = 1024, sample = 1, spill_dir = None, chunk_rows = 1000000, name = 'recorder'):
+        self.fields = fields
+        self.sample = sample
+        self.spill_dir = spill_dir
+        self.chunk_rows = chunk_rows
+        self.name = name
+        self.categories = {f: [] for f, t in fields.items() if t == 'category'}
+        self._codes = {f: {} for f in self.categories}
+        self._calls = 0
+        self._chunks = 0
+        self._spilled = 0
+        self._n = 0
+        self._columns = {f: np.empty(capacity, dtype = self._dtype(t)) for f, t in fields.items()}
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok = True)
+
+    @staticmethod
+    def _dtype(t):
+        if t == 'category':
+            return np.int32
+        if t == 'datetime':
+            return np.int64
+        return np.dtype(t)
+
+    def __len__(self):
+        return self._spilled + self._n
+
+    def _skip(self):
+        self._calls += 1
+        return (self._calls - 1) % self.sample != 0
+
+    def _reserve(self, n):
+        size = self._columns[next(iter(self._columns))].size
+        if n > size:
+            size = max(n, 2 * size)
+            for f, column in list(self._columns.items()):
+                self._columns[f] = np.resize(column, size)
+
+    def _intern(self, field, value):
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.categories[field])
+            self.categories[field].append(value)
+        return code
+
+    def _encode(self, field, value):
+        t = self.fields[field]
+        if t == 'category':
+            return self._intern(field, value)
+        if t == 'datetime':
+            return pd.Timestamp(value).value
+        if value is None:
+            return np.nan
+        return value
+
+    def append(self, row):
+        if self._skip():
+            return
+        self._reserve(self._n + 1)
+        for f, column in list(self._columns.items()):
+            column[self._n] = self._encode(f, row.get(f))
+        self._n += 1
+        self._check_spill()
+
+    def extend(self, columns):
+        if self._skip():
+            return
+        n = max([len(v) for v in columns.values() if np.ndim(v) > 0], default = 1)
+        if n == 0:
+            return
+        self._reserve(self._n + n)
+        for f, column in list(self._columns.items()):
+            value = columns.get(f)
+            if np.ndim(value) == 0:
+                value = self._encode(f, value)
+            elif self.fields[f] == 'category':
+                value = [self._intern(f, v) for v in value]
+            elif self.fields[f] == 'datetime':
+                value = pd.DatetimeIndex(value).asi8
+            column[self._n:self._n + n] = value
+        self._n += n
+        self._check_spill()
+
+    def _path(self, chunk, field):
+        return os.path.join(self.spill_dir, f'{self.name}_{chunk:05d}_{field}.npy')
+
+    def _check_spill(self):
+        if self.spill_dir is not None and self._n >= self.chunk_rows:
+            for f, column in list(self._columns.items()):
+                np.save(self._path(self._chunks, f), column[:self._n])
+            self._chunks += 1
+            self._spilled += self._n
+            self._n = 0
+
+    def column(self, field):
+        column = self._columns[field][:self._n]
+        if self._chunks == 0:
+            return column
+        spilled = [np.load(self._path(c, field), mmap_mode = 'r') for c in range(self._chunks)]
+        return np.concatenate(spilled + [column])
+
+    @property
+    def df(self):
+        data = {}
+        for f, t in list(self.fields.items()):
+            column = self.column(f)
+            if t == 'category':
+                data[f] = pd.Categorical.from_codes(column, categories = pd.Index(self.categories[f], dtype = object))
+            elif t == 'datetime':
+                data[f] = pd.DatetimeIndex(column.view('datetime64[ns]'))
+            else:
+                data[f] = column
+        return pd.DataFrame(data, copy = False)
+
+    def clear(self):
+        if self.spill_dir is not None:
+            for path in glob(os.path.join(self.spill_dir, f'{self.name}_*.npy')):
+                os.remove(path)
+        self._chunks = 0
+        self._spilled = 0
+        self._n = 0
+        self._calls = 0
@@ -0,0 +1,214 @@
+import numpy as np
+
+__all__ = ['FeatureStore']
+
+
+class FeatureStore():
+    """
+    A FeatureStore keeps the indicator values of a SignalGroup in preallocated arrays, so reading them does not
+    restack every indicator's history on every bar. Each identifier has one feature per attribute of every
+    signal it belongs to, in the order the signals were added. After a signal is refreshed, the values its
+    streams pushed are copied into:
+
+        history     a (time x feature) matrix per identifier, grown by doubling, whose leading rows are
+                    returned as views (column j is the ts of feature j)
+        panel       one (identifier x feature) array of the most recent values, features are matched across
+                    identifiers by name
+
+    ...
+
+    Parameters
+    ----------
+    history : Boolean, optional (default : True)
+        keep the (time x feature) matrices, only the panel is kept if False
+    capacity : Integer, optional (default : 5000)
+        initial rows of every matrix
+
+    Attributes
+    ----------
+    columns : list
+        feature names of the panel columns
+    identifiers : list
+        identifiers of the panel rows
+
+    Methods
+    -------
+    add(identifier : String, signal : Signal)
+        registers the features of signal for identifier
+    remove(identifier : String)
+        drops the features of identifier
+    write(signal : Signal)
+        copies the values pushed by signal since the last write
+    write_panel(signals : list)
+        write() of the PanelSlot signals of one PanelIndicator, the latest values are written in one assignment
+        per attribute (the counts of their streams are kept by the PanelIndicator's PanelColumns)
+    features(identifier : String)
+        returns the feature names of identifier
+    view(identifier : String, signal : Signal, optional)
+        returns the (time x feature) view of identifier, only the columns of signal if given
+    latest(identifiers : list, optional)
+        returns the (identifier x feature) array of the most recent values, NaN where an identifier lacks a feature
+    """
+
+    def __init__(self, history = True, capacity = 5000):
+        self.history = history
+        self.capacity = capacity
+        self.columns = []
+        self.identifiers = []
+        self._column_index = {}
+        self._row = {}
+        self._panel = np.empty((0, 0))
+        self._features = {}
+        self._matrices = {}
+        self._counts = {}
+        self._panel_columns = {}
+        self._slices = {}
+        self._signals = {}
+        self._panel_index = {}
+
+    @staticmethod
+    def _attributes(signal):
+        attributes = getattr(signal.indicator, 'attributes', None)
+        if attributes is None or not all([hasattr(getattr(signal.indicator, a, None), 'pointer') for a in attributes]):
+            raise ValueError(f'{signal.indicator_name} does not keep its values in Streams and can not be stored')
+        return list(attributes)
+
+    def __name(self, identifier, signal, attribute, n_attributes):
+        name = signal.indicator_name if n_attributes == 1 else f'{signal.indicator_name}.{attribute.strip("_")}'
+        taken, k, unique = self._features[identifier], 1, name
+        while unique in taken:
+            unique = f'{name}_{k}'
+            k += 1
+        return unique
+
+    def __grow_panel(self):
+        panel = np.full((len(self.identifiers), len(self.columns)), np.nan)
+        panel[:self._panel.shape[0], :self._panel.shape[1]] = self._panel
+        self._panel = panel
+
+    def add(self, identifier, signal):
+        attributes = self._attributes(signal)
+        if identifier not in self._features:
+            self._features[identifier] = []
+            self._counts[identifier] = np.zeros(0, dtype = np.int64)
+            self._panel_columns[identifier] = np.zeros(0, dtype = np.int64)
+            self._row[identifier] = len(self.identifiers)
+            self.identifiers.append(identifier)
+        lo = len(self._features[identifier])
+        names = [self.__name(identifier, signal, a, len(attributes)) for a in attributes]
+        for name in names:
+            self._features[identifier].append(name)
+            if name not in self._column_index:
+                self._column_index[name] = len(self.columns)
+                self.columns.append(name)
+        hi = len(self._features[identifier])
+        self._counts[identifier] = np.concatenate([self._counts[identifier], np.zeros(hi - lo, dtype = np.int64)])
+        self._panel_columns[identifier] = np.array([self._column_index[n] for n in self._features[identifier]], dtype = np.int64)
+        if self.history:
+            matrix = self._matrices.get(identifier)
+            rows = self.capacity if matrix is None else matrix.shape[0]
+            grown = np.full((rows, hi), np.nan)
+            if matrix is not None:
+                grown[:, :lo] = matrix
+            self._matrices[identifier] = grown
+        self._slices[(identifier, id(signal))] = (lo, hi)
+        self._panel_index = {}
+        self._signals.setdefault(id(signal), (signal, attributes, []))[2].append(identifier)
+        self.__grow_panel()
+
+    def remove(self, identifier):
+        if identifier not in self._features:
+            return
+        self._panel_index = {}
+        for key in [k for k in self._slices if k[0] == identifier]:
+            del self._slices[key]
+            signal, attributes, identifiers = self._signals[key[1]]
+            identifiers.remove(identifier)
+            if len(identifiers) == 0:
+                del self._signals[key[1]]
+        del self._features[identifier], self._counts[identifier], self._panel_columns[identifier]
+        self._matrices.pop(identifier, None)
+        self._panel[self._row[identifier]] = np.nan
+
+    def __copy(self, identifier, j, count, n, ts):
+        matrix = self._matrices[identifier]
+        if n > matrix.shape[0]:
+            grown = np.full((max(2 * matrix.shape[0], n), matrix.shape[1]), np.nan)
+            grown[:matrix.shape[0]] = matrix
+            self._matrices[identifier] = matrix = grown
+        first = max(count, n - len(ts))
+        matrix[first:n, j] = ts[len(ts) - (n - first):]
+
+    def write(self, signal):
+        entry = self._signals.get(id(signal))
+        if entry is None:
+            return
+        _, attributes, identifiers = entry
+        streams = [getattr(signal.indicator, a) for a in attributes]
+        for identifier in identifiers:
+            lo, _ = self._slices[(identifier, id(signal))]
+            counts = self._counts[identifier]
+            row = self._row[identifier]
+            for k, stream in enumerate(streams):
+                j = lo + k
+                n = stream.pointer
+                if n <= counts[j]:
+                    continue
+                if self.history:
+                    self.__copy(identifier, j, counts[j], n, stream.ts)
+                counts[j] = n
+                self._panel[row, self._panel_columns[identifier][j]] = stream.v
+
+    def __panel_index(self, indicator, signals):
+        key = tuple([id(s) for s in signals])
+        cached = self._panel_index.get(id(indicator))
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        signals = [s for s in signals if id(s) in self._signals]
+        identifiers = [self._signals[id(s)][2][0] for s in signals]
+        los = np.array([self._slices[(i, id(s))][0] for i, s in zip(identifiers, signals)], dtype = np.int64)
+        ks = np.array([s.indicator.k for s in signals], dtype = np.int64)
+        rows = np.array([self._row[i] for i in identifiers], dtype = np.int64)
+        columns = [np.array([self._panel_columns[i][j + q] for i, j in zip(identifiers, los)], dtype = np.int64) for q in range(len(indicator.attributes))]
+        index = (identifiers, los, ks, rows, columns)
+        self._panel_index[id(indicator)] = (key, index)
+        return index
+
+    def write_panel(self, signals):
+        if len(signals) == 0:
+            return
+        indicator = signals[0].indicator.panel
+        identifiers, los, ks, rows, columns = self.__panel_index(indicator, signals)
+        for q, a in enumerate(indicator.attributes):
+            values = indicator.columns[a]
+            n = values.counts[ks]
+            if self.history:
+                for m, identifier in enumerate(identifiers):
+                    j, counts = los[m] + q, self._counts[identifier]
+                    if n[m] > counts[j]:
+                        self.__copy(identifier, j, counts[j], n[m], values.ts(ks[m]))
+                        counts[j] = n[m]
+            has = n > 0
+            self._panel[rows[has], columns[q][has]] = values.last(ks[has])
+
+    def features(self, identifier):
+        return list(self._features.get(identifier, []))
+
+    def view(self, identifier, signal = None):
+        if not self.history:
+            raise ValueError('The FeatureStore does not keep history, see latest()')
+        counts = self._counts[identifier]
+        rows = int(counts.max()) if len(counts) > 0 else 0
+        matrix = self._matrices[identifier]
+        if signal is None:
+            return matrix[:rows]
+        lo, hi = self._slices[(identifier, id(signal))]
+        return matrix[:int(counts[lo:hi].max()), lo:hi]
+
+    def latest(self, identifiers = None):
+        if identifiers is None:
+            return self._panel
+        rows = np.array([self._row.get(i, -1) for i in identifiers], dtype = np.int64)
+        latest = self._panel[np.maximum(rows, 0)] if len(self._panel) > 0 else np.full((len(rows), len(self.columns)), np.nan)
+        latest[rows < 0] = np.nan
+        return latest
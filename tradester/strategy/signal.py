@@ -1,4 +1,7 @@
-from numba import jit
+from tradester.feeds.active import PanelSlot
+
+from .features import FeatureStore
+
 import numpy as np
 
 
@@ -17,8 +20,40 @@ class Signal():
 
 
 class SignalGroup():
-
-    def __init__(self):
+    """
+    A SignalGroup refreshes the signals of the active assets and returns their indicator values. The PanelSlots
+    of a PanelIndicator are refreshed together, with one PanelIndicator.push per bar.
+
+    ...
+
+    Parameters
+    ----------
+    features : String, None, optional (default : None)
+        'history' keeps every identifier's indicator values in a (time x feature) matrix that get_indicators
+        and get_indicator_tree return views of, 'latest' only keeps the (identifier x feature) panel of the
+        current values, see FeatureStore. If None the values are stacked from the indicator streams when asked for.
+        The features of an identifier are in the order its signals were added
+
+    Attributes
+    ----------
+    store : FeatureStore, None
+        the feature store if features is not None
+
+    Methods
+    -------
+    get_indicators(assets : list)
+        returns {identifier : (time x feature) array} of the signals of assets
+    get_indicator_tree(assets : list)
+        returns {identifier : {group : {indicator name : (time x attribute) array}}}
+    latest(assets : list)
+        returns the (asset x feature) array of the current values, columns are store.columns
+    """
+
+    def __init__(self, features = None):
+        if features not in [None, 'history', 'latest']:
+            raise ValueError(f"features must be in [None, 'history', 'latest'], not {features}")
+        self.features = features
+        self.store = FeatureStore(history = features == 'history') if features is not None else None
         self.group = {}
         self.tuple_map = {}
         self.asset_map = {}
@@ -27,21 +62,36 @@ class SignalGroup():
 
     def _get_signals(self, assets):
         #create a cache component for older indicators
-        new = []
+        new = {}
         for a in assets:
             if self.tuple_map.get(a) is not None:
                 for item in self.tuple_map[a]:
-                    new.append(item)
+                    if item in self.group:
+                        new[item] = None
 
-        return list(set(new))
+        return list(new)
         
     def get_indicators(self, assets = None):
+        if self.features == 'history':
+            signals = {}
+            for k in self._get_signals(assets):
+                for s in self.group[k]:
+                    for c in s.identifiers:
+                        signals.setdefault(c, {})[id(s)] = s
+            indicators = {}
+            for c, touched in signals.items():
+                if len(touched) == len(self.asset_map.get(c, [])):
+                    indicators[c] = self.store.view(c)
+                else:
+                    indicators[c] = np.column_stack(tuple([self.store.view(c, s) for s in self.asset_map[c] if id(s) in touched]))
+            return indicators
+
         temp_dict = {}
         for k in self._get_signals(assets):
             for s in self.group[k]:
                 for c in s.identifiers:
                     ts = s.indicator.ts
-                    if c in list(temp_dict.keys()):
+                    if c in temp_dict:
                         if isinstance(ts, list):
                             for t in ts:
                                 temp_dict[c].append(t)
@@ -60,6 +110,11 @@ class SignalGroup():
                     
         return {k : np.column_stack(tuple(v)) for k, v in list(temp_dict.items())}
 
+    def latest(self, assets = None):
+        if self.store is None:
+            raise ValueError("latest() needs a SignalGroup with features = 'history' or 'latest'")
+        return self.store.latest(assets)
+
    
     def get_indicator_tree(self, assets = None):
         temp_dict = {}
@@ -70,14 +125,17 @@ class SignalGroup():
                     c = a
                     g = s.grouping if s.grouping is not None else 'None'
                     name = s.indicator_name
-                    ts = s.indicator.ts
 
                     #for c in s.identifiers:
-                    if c not in list(temp_dict.keys()):
+                    if c not in temp_dict:
                         temp_dict[c] = {}
-                    if g not in list(temp_dict[c].keys()):
+                    if g not in temp_dict[c]:
                         temp_dict[c][g] = {}
 
+                    if self.features == 'history':
+                        temp_dict[c][g][name] = self.store.view(c, s)
+                        continue
+                    ts = s.indicator.ts
                     if isinstance(ts, list):
                         temp_dict[c][g][name] = np.column_stack(tuple(ts))
                     elif isinstance(ts, dict):
@@ -102,6 +160,8 @@ class SignalGroup():
                 self.asset_map[identifier] = [self.group[signal.identifiers][len(self.group[signal.identifiers])-1]]
             else:
                 self.asset_map[identifier].append(self.group[signal.identifiers][len(self.group[signal.identifiers]) - 1])
+            if self.store is not None:
+                self.store.add(identifier, signal)
     
     def set_inactive(self, assets):
         new_assets = [a for a in assets if a not in self.inactive_tree.keys()]
@@ -121,7 +181,7 @@ class SignalGroup():
                     if isinstance(ts, list):
                         indicator_tree[a][g][name] = np.column_stack(ts)
                     elif isinstance(ts, dict):
-                        indicator_tree[a][g][name] = np.column_stack(ts.values())
+                        indicator_tree[a][g][name] = np.column_stack(tuple(ts.values()))
                     else:
                         indicator_tree[a][g][name] = np.column_stack([ts])
 
@@ -133,11 +193,26 @@ class SignalGroup():
             if a in self.asset_map.keys():
                 del self.asset_map[a]
                 del self.tuple_map[a]
+            if self.store is not None:
+                self.store.remove(a)
         for t in tuples:
             if t in self.group.keys():
                 del self.group[t]
 
     def refresh(self, assets = None):
-        for k in self._get_signals(assets):
-            for i in self.group[k]:
+        signals = [i for k in self._get_signals(assets) for i in self.group[k]]
+        panels = {}
+        for i in signals:
+            if isinstance(i.indicator, PanelSlot):
+                panels.setdefault(id(i.indicator.panel), []).append(i)
+        for i in signals:
+            if not isinstance(i.indicator, PanelSlot):
                 i.refresh()
+                if self.store is not None:
+                    self.store.write(i)
+                continue
+            slots = panels.pop(id(i.indicator.panel), None)
+            if slots is not None:
+                i.indicator.panel.push([s.indicator.k for s in slots])
+                if self.store is not None:
+                    self.store.write_panel(slots)
@@ -1,4 +1,4 @@
-from tradester.feeds.active import IndicatorGroup, Stream
+from tradester.feeds.active import IndicatorGroup, Stream, PanelIndicator
 
 from .signal import Signal, SignalGroup
 
@@ -6,14 +6,16 @@ from .signal import Signal, SignalGroup
 
 class Strategy():
 
-    def __init__(self, universes):
+    def __init__(self, universes, features = None):
         self.universes = {u.name : u for u in universes}
         self.manager = None
         self.oms = None
         self.portfolio = None
         self.top_down = { }
         self.covariance_map = { }
-        self.indicators = SignalGroup()
+        self.indicators = SignalGroup(features = features)
+        self.panels = { }
+        self.sources = []
     
     @property
     def active_assets(self):
@@ -39,10 +41,13 @@ class Strategy():
                 assets.append(a)
         return assets
 
-    def _connect(self, manager, oms, portfolio):
+    def _connect(self, manager, oms, portfolio, sources = None):
         self.manager = manager
         self.oms = oms
         self.portfolio = portfolio
+        self.sources = [] if sources is None else list(sources)
+        for panel in self.panels.values():
+            panel.set_sources(self.sources)
     
     def refresh(self, assets):
         for i in list(self.top_down.values()):
@@ -54,6 +59,14 @@ class Strategy():
     def add(self, indicator, identifiers, base = 'indicators', group = None, name = None):
         if base == 'indicators':
             self.indicators._add(Signal(indicator, identifiers, grouping = group, name = name))
+        elif base == 'panel':
+            if not isinstance(indicator, PanelIndicator):
+                raise ValueError("Only a PanelIndicator can be added with base = 'panel'")
+            identifiers = [a.identifier for a in indicator.assets] if identifiers is None else list(identifiers)
+            name = indicator.__class__.__name__ if name is None else name
+            indicator.share(self.panels).set_sources(self.sources)
+            for identifier, slot in zip(identifiers, indicator.slots):
+                self.indicators._add(Signal(slot, (identifier, ), grouping = group, name = name))
         elif base == 'top_down':
             if not group in self.top_down.keys():
                 self.top_down[group] = IndicatorGroup(group_type = 'dict')
@@ -71,7 +84,6 @@ class Strategy():
         if not callable(get_trades):
             raise NotImplementedError("You must implement a self.get_trades() method, if you do not define your own trade method")
         trades = self.get_trades()
-        positions = self.portfolio.positions
 
         for c, info in list(trades.items()):
             asset = info['asset']
@@ -1,4 +1,7 @@
 from .svconfig import *
+from .compilation import *
 from .series import *
+from .rolling import *
+from .kernels import *
 from .graphs import *
 from .normalizers import *
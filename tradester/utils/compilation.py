@@ -0,0 +1,115 @@
+"""
+Deferred numba compilation. Importing numba takes longer than the rest of tradester, and every process used to
+compile its jitted functions again on first call. Functions decorated with lazy_jit only import numba and
+compile when they are first called (or warmed up), and with cache = True the compiled code is written next to
+the source so later processes, and pool workers, load it instead of compiling.
+
+    python -m tradester.utils.compilation
+
+compiles (or loads) every registered function ahead of a parameter sweep.
+"""
+
+from importlib import import_module
+from threading import RLock
+from time import perf_counter
+
+import functools
+
+__all__ = ['lazy_jit', 'register_warmup', 'warmup', 'WARMUP_MODULES']
+
+# modules whose lazy_jit functions and warmups are compiled by warmup()
+WARMUP_MODULES = ['tradester.utils.series', 'tradester.utils.kernels', 'tradester.feeds.static.fetch']
+
+_lock = RLock()
+_warmups = []
+
+
+class LazyJit():
+    """
+    A function that is compiled with numba.jit(**options) on its first call. When it compiles, the lazy_jit
+    functions it calls are compiled first (so numba sees dispatchers), and the name of the function in its
+    module is replaced by the dispatcher so later calls skip the wrapper.
+
+    ...
+
+    Parameters
+    ----------
+    function : function
+        the python function
+    options : dict
+        keyword arguments of numba.jit
+
+    Attributes
+    ----------
+    dispatcher : numba Dispatcher, None
+        the compiled function, None until compile()
+
+    Methods
+    -------
+    compile()
+        imports numba and returns the dispatcher
+    """
+
+    def __init__(self, function, options):
+        functools.update_wrapper(self, function)
+        self.function = function
+        self.options = options
+        self.dispatcher = None
+
+    def compile(self):
+        if self.dispatcher is not None:
+            return self.dispatcher
+        with _lock:
+            if self.dispatcher is None:
+                from numba import jit
+                scope = self.function.__globals__
+                for name in self.function.__code__.co_names:
+                    value = scope.get(name)
+                    if isinstance(value, LazyJit):
+                        scope[name] = value.compile()
+                dispatcher = jit(**self.options)(self.function)
+                if scope.get(self.function.__name__) is self:
+                    scope[self.function.__name__] = dispatcher
+                self.dispatcher = dispatcher
+        return self.dispatcher
+
+    def __call__(self, *args, **kwargs):
+        return self.compile()(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<LazyJit {self.function.__module__}.{self.function.__qualname__}>'
+
+
+def lazy_jit(**options):
+    """decorator, numba.jit(**options) deferred to the first call of the function, see LazyJit"""
+    def decorator(function):
+        return LazyJit(function, options)
+    return decorator
+
+
+def register_warmup(function):
+    """decorator, registers a function that calls lazy_jit functions with the argument types they are used with"""
+    _warmups.append(function)
+    return function
+
+
+def warmup(verbose = False):
+    """
+    Compiles every lazy_jit function of WARMUP_MODULES by running the registered warmups, loading them from the
+    on-disk cache when it is up to date. Returns the seconds it took.
+    """
+    start = perf_counter()
+    for module in WARMUP_MODULES:
+        import_module(module)
+    for function in list(_warmups):
+        t = perf_counter()
+        function()
+        if verbose:
+            print(f'{function.__module__}.{function.__name__}: {perf_counter() - t:.2f}s')
+    return perf_counter() - start
+
+
+if __name__ == '__main__':
+    # run as a script this module is __main__, the warmups are registered on tradester.utils.compilation
+    from tradester.utils.compilation import warmup
+    print(f'Compiled tradester kernels in {warmup(verbose = True):.2f}s')
@@ -1,8 +1,9 @@
-import matplotlib.pyplot as plt
 import numpy as np
 
 
 def graph_states(stateful, name = None):
+    import matplotlib.pyplot as plt
+
     labels, data = [*zip(*stateful.items())]
     plt.boxplot(data)
     plt.xticks(range(1, len(labels)+1), labels)
@@ -0,0 +1,912 @@
+"""
+Batched numba kernels for indicators. Every kernel takes a (time x series) array, or a single series, and runs
+each column with nogil, cache = True compiled loops. The full series forms (rolling_mean, ewma, ...) return an
+array of the input's shape, the single step forms (RollingKernel, EWMKernel, ...) hold the state of every series
+and are pushed one row (one value per series) at a time. A full series form is its step form pushed over every
+row, so both return the same values. NaN values are skipped the way pandas skips them, and the defaults match
+pandas (rolling min_periods = window, ddof = 1, ewm adjust = True).
+"""
+
+from .compilation import lazy_jit, register_warmup
+
+import numpy as np
+
+__all__ = [
+    'rolling_moments', 'rolling_sum', 'rolling_mean', 'rolling_var', 'rolling_std', 'rolling_min', 'rolling_max', 'rolling_rank',
+    'rolling_slope', 'rolling_cov', 'rolling_corr', 'bollinger', 'ewma', 'ewm_var', 'ewm_std', 'true_range',
+    'atr', 'rsi', 'cross_rank', 'ewm_alpha', 'RollingKernel', 'RollingPairKernel', 'EWMKernel', 'ATRKernel',
+    'RSIKernel',
+]
+
+# comoment state rows: count, mean of a, mean of b, m2 of a, m2 of b, comoment of a and b
+_C, _MA, _MB, _M2A, _M2B, _CAB = range(6)
+
+
+def _as_2d(x):
+    x = np.asarray(x, dtype = np.float64)
+    if x.ndim == 1:
+        return np.ascontiguousarray(x.reshape(-1, 1)), True
+    if x.ndim != 2:
+        raise ValueError(f'Kernels take a series or a (time x series) array, not an array of shape {x.shape}')
+    return np.ascontiguousarray(x), False
+
+
+def _shape(x, squeeze):
+    return x[:, 0] if squeeze else x
+
+
+def _row(x, n):
+    x = np.asarray(x, dtype = np.float64)
+    return np.ascontiguousarray(np.broadcast_to(x, (n,)))
+
+
+def ewm_alpha(com = None, span = None, halflife = None, alpha = None):
+    """the smoothing factor of pandas ewm from exactly one of com, span, halflife or alpha"""
+    if sum([p is not None for p in [com, span, halflife, alpha]]) != 1:
+        raise ValueError('Exactly one of com, span, halflife or alpha must be given')
+    if com is not None:
+        return 1 / (1 + com)
+    if span is not None:
+        return 2 / (span + 1)
+    if halflife is not None:
+        return 1 - np.exp(np.log(0.5) / halflife)
+    return alpha
+
+
+# comoments
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _comoments_push(buffer_a, buffer_b, stats, pushed, a, b):
+    window = buffer_a.shape[0]
+    i = pushed[0]
+    pos = i % window
+    for k in range(a.shape[0]):
+        if i >= window:
+            xa = buffer_a[pos, k]
+            xb = buffer_b[pos, k]
+            if xa == xa and xb == xb:
+                c = stats[_C, k]
+                if c <= 1:
+                    stats[:, k] = 0.0
+                else:
+                    ma = stats[_MA, k] - (xa - stats[_MA, k]) / (c - 1)
+                    mb = stats[_MB, k] - (xb - stats[_MB, k]) / (c - 1)
+                    stats[_M2A, k] -= (xa - ma) * (xa - stats[_MA, k])
+                    stats[_M2B, k] -= (xb - mb) * (xb - stats[_MB, k])
+                    stats[_CAB, k] -= (xa - ma) * (xb - stats[_MB, k])
+                    stats[_MA, k] = ma
+                    stats[_MB, k] = mb
+                    stats[_C, k] = c - 1
+        xa = a[k]
+        xb = b[k]
+        buffer_a[pos, k] = xa
+        buffer_b[pos, k] = xb
+        if xa == xa and xb == xb:
+            c = stats[_C, k] + 1
+            da = xa - stats[_MA, k]
+            db = xb - stats[_MB, k]
+            stats[_MA, k] += da / c
+            stats[_MB, k] += db / c
+            stats[_M2A, k] += da * (xa - stats[_MA, k])
+            stats[_M2B, k] += db * (xb - stats[_MB, k])
+            stats[_CAB, k] += da * (xb - stats[_MB, k])
+            stats[_C, k] = c
+        if (i + 1) % window == 0:
+            # recompute exactly from the window once per window so rounding error can not build up
+            c = 0.0
+            sa = 0.0
+            sb = 0.0
+            for j in range(window):
+                if buffer_a[j, k] == buffer_a[j, k] and buffer_b[j, k] == buffer_b[j, k]:
+                    c += 1
+                    sa += buffer_a[j, k]
+                    sb += buffer_b[j, k]
+            ma = sa / c if c > 0 else 0.0
+            mb = sb / c if c > 0 else 0.0
+            m2a = 0.0
+            m2b = 0.0
+            cab = 0.0
+            for j in range(window):
+                if buffer_a[j, k] == buffer_a[j, k] and buffer_b[j, k] == buffer_b[j, k]:
+                    m2a += (buffer_a[j, k] - ma) ** 2
+                    m2b += (buffer_b[j, k] - mb) ** 2
+                    cab += (buffer_a[j, k] - ma) * (buffer_b[j, k] - mb)
+            stats[_C, k] = c
+            stats[_MA, k] = ma
+            stats[_MB, k] = mb
+            stats[_M2A, k] = m2a
+            stats[_M2B, k] = m2b
+            stats[_CAB, k] = cab
+    pushed[0] = i + 1
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _comoments_run(a, b, window, timed, keep):
+    n, m = b.shape
+    buffer_a = np.full((window, m), np.nan)
+    buffer_b = np.full((window, m), np.nan)
+    stats = np.zeros((6, m))
+    pushed = np.zeros(1, dtype = np.int64)
+    out = np.empty((keep.shape[0], n, m))
+    row = np.empty(m)
+    for i in range(n):
+        if timed:
+            row[:] = float(i)
+            _comoments_push(buffer_a, buffer_b, stats, pushed, row, b[i])
+        else:
+            _comoments_push(buffer_a, buffer_b, stats, pushed, a[i], b[i])
+        for j in range(keep.shape[0]):
+            out[j, i, :] = stats[keep[j]]
+    return out
+
+
+# the comoment state rows each statistic is computed from
+_NEEDS = {
+    'sum': [_C, _MB],
+    'mean': [_C, _MB],
+    'var': [_C, _M2B],
+    'std': [_C, _M2B],
+    'cov': [_C, _CAB],
+    'corr': [_C, _M2A, _M2B, _CAB],
+    'slope': [_C, _M2A, _CAB],
+}
+
+
+def _comoments(a, b, window, timed, names):
+    """runs the comoments over every row, returns {state row : (time x series) array} of the rows names need"""
+    keep = sorted(set([r for name in names for r in _NEEDS[name]]))
+    out = _comoments_run(a, b, int(window), timed, np.array(keep, dtype = np.int64))
+    return dict(zip(keep, out))
+
+
+def _moment(stats, name, min_periods, ddof = 1):
+    c = stats[_C]
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        if name == 'sum':
+            v = stats[_MB] * c
+        elif name == 'mean':
+            v = np.array(stats[_MB])
+        elif name in ['var', 'std']:
+            v = np.maximum(stats[_M2B], 0) / (c - ddof)
+            v[c <= ddof] = np.nan
+            if name == 'std':
+                v = np.sqrt(v)
+        elif name == 'cov':
+            v = stats[_CAB] / (c - ddof)
+            v[c <= ddof] = np.nan
+        elif name == 'corr':
+            d = np.sqrt(np.maximum(stats[_M2A], 0) * np.maximum(stats[_M2B], 0))
+            v = np.where(d > 0, stats[_CAB] / d, np.nan)
+        elif name == 'slope':
+            v = np.where(stats[_M2A] > 0, stats[_CAB] / stats[_M2A], np.nan)
+    return np.where(c >= max(min_periods, 1), v, np.nan)
+
+
+def _rolling(x, window, min_periods, name, ddof = 1, y = None):
+    x, squeeze = _as_2d(x)
+    if y is None:
+        stats = _comoments(x, x, window, name == 'slope', [name])
+    else:
+        y, _ = _as_2d(y)
+        stats = _comoments(x, y, window, False, [name])
+    return _shape(_moment(stats, name, window if min_periods is None else min_periods, ddof), squeeze)
+
+
+def rolling_moments(x, window, names = ['sum', 'mean', 'std'], min_periods = None, ddof = 1):
+    """the rolling statistics names (sum, mean, var, std, slope) computed in one pass, as a tuple in the order of names"""
+    x, squeeze = _as_2d(x)
+    stats = _comoments(x, x, window, 'slope' in names, names)
+    min_periods = window if min_periods is None else min_periods
+    return tuple([_shape(_moment(stats, name, min_periods, ddof), squeeze) for name in names])
+
+
+def rolling_sum(x, window, min_periods = None):
+    """rolling sum over the last window values, x.rolling(window, min_periods).sum()"""
+    return _rolling(x, window, min_periods, 'sum')
+
+
+def rolling_mean(x, window, min_periods = None):
+    """rolling mean over the last window values, x.rolling(window, min_periods).mean()"""
+    return _rolling(x, window, min_periods, 'mean')
+
+
+def rolling_var(x, window, min_periods = None, ddof = 1):
+    """rolling variance over the last window values, x.rolling(window, min_periods).var(ddof)"""
+    return _rolling(x, window, min_periods, 'var', ddof = ddof)
+
+
+def rolling_std(x, window, min_periods = None, ddof = 1):
+    """rolling standard deviation over the last window values, x.rolling(window, min_periods).std(ddof)"""
+    return _rolling(x, window, min_periods, 'std', ddof = ddof)
+
+
+def rolling_slope(x, window, min_periods = None):
+    """rolling least squares slope of x against time over the last window values"""
+    return _rolling(x, window, min_periods, 'slope')
+
+
+def rolling_cov(x, y, window, min_periods = None, ddof = 1):
+    """rolling covariance of every column of x with the same column of y, x.rolling(window).cov(y)"""
+    return _rolling(x, window, min_periods, 'cov', ddof = ddof, y = y)
+
+
+def rolling_corr(x, y, window, min_periods = None):
+    """rolling correlation of every column of x with the same column of y, x.rolling(window).corr(y)"""
+    return _rolling(x, window, min_periods, 'corr', y = y)
+
+
+def bollinger(x, window, k = 2, min_periods = None, ddof = 1):
+    """returns the (middle, upper, lower) Bollinger bands, the rolling mean +/- k rolling standard deviations"""
+    x, squeeze = _as_2d(x)
+    stats = _comoments(x, x, window, False, ['mean', 'std'])
+    min_periods = window if min_periods is None else min_periods
+    mean = _moment(stats, 'mean', min_periods)
+    std = _moment(stats, 'std', min_periods, ddof)
+    return _shape(mean, squeeze), _shape(mean + k * std, squeeze), _shape(mean - k * std, squeeze)
+
+
+# min, max and rank
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _window_push(buffer, counts, i, x):
+    """writes row i into the ring buffer of the last window rows, counts are the non NaN values in the window"""
+    pos = i % buffer.shape[0]
+    for k in range(x.shape[0]):
+        old = buffer[pos, k]
+        if old == old:
+            counts[k] -= 1
+        buffer[pos, k] = x[k]
+        if x[k] == x[k]:
+            counts[k] += 1
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _extrema_push(buffer, queue, ends, i, is_max):
+    """
+    once row i is in the ring buffer, drops the index that left the window and the indices whose value is
+    dominated by row i from the monotonic queues (ring of indices, ends holds the head and size of every
+    column), then appends i, so every push is amortized O(1)
+    """
+    window = buffer.shape[0]
+    pos = i % window
+    for k in range(buffer.shape[1]):
+        head = ends[0, k]
+        size = ends[1, k]
+        if size > 0 and queue[head, k] <= i - window:
+            head = head + 1 if head + 1 < window else 0
+            size -= 1
+        v = buffer[pos, k]
+        if v == v:
+            while size > 0:
+                back = buffer[queue[(head + size - 1) % window, k] % window, k]
+                if (is_max and back <= v) or (not is_max and back >= v):
+                    size -= 1
+                else:
+                    break
+            queue[(head + size) % window, k] = i
+            size += 1
+        ends[0, k] = head
+        ends[1, k] = size
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _extrema_value(buffer, queue, ends, counts, min_periods):
+    window, m = buffer.shape
+    out = np.full(m, np.nan)
+    for k in range(m):
+        if ends[1, k] > 0 and counts[k] >= min_periods:
+            out[k] = buffer[queue[ends[0, k], k] % window, k]
+    return out
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _rolling_extrema(x, window, min_periods, is_max):
+    n, m = x.shape
+    out = np.empty((n, m))
+    buffer = np.full((window, m), np.nan)
+    counts = np.zeros(m)
+    queue = np.empty((window, m), dtype = np.int64)
+    ends = np.zeros((2, m), dtype = np.int64)
+    for i in range(n):
+        _window_push(buffer, counts, i, x[i])
+        _extrema_push(buffer, queue, ends, i, is_max)
+        out[i] = _extrema_value(buffer, queue, ends, counts, min_periods)
+    return out
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _sorted_push(ordered, counts, old, new):
+    """removes old and inserts new (NaN is skipped) in the sorted window of every series, row k of ordered holds counts[k] values"""
+    for k in range(new.shape[0]):
+        row = ordered[k]
+        c = int(counts[k])
+        if old[k] == old[k]:
+            j = np.searchsorted(row[:c], old[k])
+            for r in range(j, c - 1):
+                row[r] = row[r + 1]
+            c -= 1
+        if new[k] == new[k]:
+            j = np.searchsorted(row[:c], new[k])
+            for r in range(c, j, -1):
+                row[r] = row[r - 1]
+            row[j] = new[k]
+            c += 1
+        counts[k] = c
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _sorted_rank(ordered, counts, current, min_periods):
+    """rank (average of ties, from 1) of current within the sorted window of every series, with binary searches"""
+    out = np.full(current.shape[0], np.nan)
+    for k in range(current.shape[0]):
+        c = int(counts[k])
+        if current[k] == current[k] and c >= min_periods:
+            less = np.searchsorted(ordered[k, :c], current[k], side = 'left')
+            equal = np.searchsorted(ordered[k, :c], current[k], side = 'right') - less
+            out[k] = less + (equal + 1) / 2
+    return out
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _rolling_rank(x, window, min_periods):
+    n, m = x.shape
+    out = np.empty((n, m))
+    buffer = np.full((window, m), np.nan)
+    counts = np.zeros(m)
+    ordered = np.empty((m, window))
+    sorted_counts = np.zeros(m)
+    for i in range(n):
+        _sorted_push(ordered, sorted_counts, buffer[i % window], x[i])
+        _window_push(buffer, counts, i, x[i])
+        out[i] = _sorted_rank(ordered, sorted_counts, x[i], min_periods)
+    return out
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _cross_rank(x):
+    n, m = x.shape
+    out = np.full((n, m), np.nan)
+    for i in range(n):
+        row = x[i]
+        order = np.argsort(row)
+        j = 0
+        while j < m and row[order[j]] == row[order[j]]:
+            e = j
+            while e + 1 < m and row[order[e + 1]] == row[order[j]]:
+                e += 1
+            for r in range(j, e + 1):
+                out[i, order[r]] = (j + e) / 2 + 1
+            j = e + 1
+    return out
+
+
+def rolling_min(x, window, min_periods = None):
+    """rolling minimum over the last window values, x.rolling(window, min_periods).min()"""
+    x, squeeze = _as_2d(x)
+    return _shape(_rolling_extrema(x, int(window), max(window if min_periods is None else min_periods, 1), False), squeeze)
+
+
+def rolling_max(x, window, min_periods = None):
+    """rolling maximum over the last window values, x.rolling(window, min_periods).max()"""
+    x, squeeze = _as_2d(x)
+    return _shape(_rolling_extrema(x, int(window), max(window if min_periods is None else min_periods, 1), True), squeeze)
+
+
+def rolling_rank(x, window, min_periods = None):
+    """rank (average of ties, from 1) of every value within its last window values, x.rolling(window).rank()"""
+    x, squeeze = _as_2d(x)
+    return _shape(_rolling_rank(x, int(window), max(window if min_periods is None else min_periods, 1)), squeeze)
+
+
+def cross_rank(x):
+    """rank (average of ties, from 1) of every value within its row, NaN is not ranked, df.rank(axis = 1)"""
+    x = np.asarray(x, dtype = np.float64)
+    if x.ndim == 1:
+        return _cross_rank(np.ascontiguousarray(x.reshape(1, -1)))[0]
+    return _cross_rank(np.ascontiguousarray(x))
+
+
+# exponentially weighted moments
+
+# ewm state rows: mean of x, mean of y, covariance, sum of weights, sum of squared weights, old weight, observations
+_EX, _EY, _ECOV, _EWT, _EWT2, _EOLD, _ENOBS = range(7)
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _ewm_push(state, x, y, alpha, adjust, ignore_na):
+    factor = 1 - alpha
+    new_wt = 1.0 if adjust else alpha
+    for k in range(x.shape[0]):
+        cx = x[k]
+        cy = y[k]
+        observed = cx == cx and cy == cy
+        if observed:
+            state[_ENOBS, k] += 1
+        if state[_EWT, k] == 0:
+            # first value
+            if observed:
+                state[_EX, k] = cx
+                state[_EY, k] = cy
+                state[_ECOV, k] = 0.0
+                state[_EWT, k] = 1.0
+                state[_EWT2, k] = 1.0
+                state[_EOLD, k] = 1.0
+            continue
+        if observed or not ignore_na:
+            state[_EWT, k] *= factor
+            state[_EWT2, k] *= factor * factor
+            state[_EOLD, k] *= factor
+            if observed:
+                old_x = state[_EX, k]
+                old_y = state[_EY, k]
+                old_wt = state[_EOLD, k]
+                total = old_wt + new_wt
+                if old_x != cx:
+                    state[_EX, k] = (old_wt * old_x + new_wt * cx) / total
+                if old_y != cy:
+                    state[_EY, k] = (old_wt * old_y + new_wt * cy) / total
+                state[_ECOV, k] = (old_wt * (state[_ECOV, k] + (old_x - state[_EX, k]) * (old_y - state[_EY, k])) + new_wt * (cx - state[_EX, k]) * (cy - state[_EY, k])) / total
+                state[_EWT, k] += new_wt
+                state[_EWT2, k] += new_wt * new_wt
+                state[_EOLD, k] += new_wt
+                if not adjust:
+                    state[_EWT, k] /= state[_EOLD, k]
+                    state[_EWT2, k] /= state[_EOLD, k] * state[_EOLD, k]
+                    state[_EOLD, k] = 1.0
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _ewm_run(x, y, alpha, adjust, ignore_na, keep):
+    n, m = x.shape
+    state = np.zeros((7, m))
+    out = np.empty((keep.shape[0], n, m))
+    for i in range(n):
+        _ewm_push(state, x[i], y[i], alpha, adjust, ignore_na)
+        for j in range(keep.shape[0]):
+            out[j, i, :] = state[keep[j]]
+    return out
+
+
+def _ewm_states(x, alpha, adjust, ignore_na, name):
+    """runs the ewm over every row, returns {state row : (time x series) array} of the rows name needs"""
+    keep = [_EX, _EWT, _ENOBS] if name == 'mean' else [_ECOV, _EWT, _EWT2, _ENOBS]
+    out = _ewm_run(x, x, alpha, adjust, ignore_na, np.array(keep, dtype = np.int64))
+    return dict(zip(keep, out))
+
+
+def _ewm_moment(state, name, min_periods, bias = False):
+    observed = (state[_ENOBS] >= max(min_periods, 1)) & (state[_EWT] > 0)
+    if name == 'mean':
+        return np.where(observed, state[_EX], np.nan)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        v = np.array(state[_ECOV])
+        if not bias:
+            numerator = state[_EWT] * state[_EWT]
+            denominator = numerator - state[_EWT2]
+            v = np.where(denominator > 0, numerator / denominator * v, np.nan)
+        if name == 'std':
+            v = np.sqrt(np.maximum(v, 0))
+    return np.where(observed, v, np.nan)
+
+
+def _ewm(x, name, com, span, halflife, alpha, adjust, ignore_na, min_periods, bias = False):
+    x, squeeze = _as_2d(x)
+    state = _ewm_states(x, ewm_alpha(com, span, halflife, alpha), adjust, ignore_na, name)
+    return _shape(_ewm_moment(state, name, min_periods, bias), squeeze)
+
+
+def ewma(x, com = None, span = None, halflife = None, alpha = None, adjust = True, ignore_na = False, min_periods = 0):
+    """exponentially weighted mean, x.ewm(...).mean()"""
+    return _ewm(x, 'mean', com, span, halflife, alpha, adjust, ignore_na, min_periods)
+
+
+def ewm_var(x, com = None, span = None, halflife = None, alpha = None, adjust = True, ignore_na = False, min_periods = 0, bias = False):
+    """exponentially weighted variance, x.ewm(...).var(bias)"""
+    return _ewm(x, 'var', com, span, halflife, alpha, adjust, ignore_na, min_periods, bias)
+
+
+def ewm_std(x, com = None, span = None, halflife = None, alpha = None, adjust = True, ignore_na = False, min_periods = 0, bias = False):
+    """exponentially weighted standard deviation, x.ewm(...).std(bias)"""
+    return _ewm(x, 'std', com, span, halflife, alpha, adjust, ignore_na, min_periods, bias)
+
+
+# true range, ATR and RSI
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _true_range_push(previous, high, low, close):
+    out = np.empty(high.shape[0])
+    for k in range(high.shape[0]):
+        tr = high[k] - low[k]
+        p = previous[k]
+        if p == p:
+            if tr != tr or abs(high[k] - p) > tr:
+                tr = abs(high[k] - p)
+            if tr != tr or abs(low[k] - p) > tr:
+                tr = abs(low[k] - p)
+        out[k] = tr
+        previous[k] = close[k]
+    return out
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _changes_push(previous, close):
+    gains = np.empty(close.shape[0])
+    losses = np.empty(close.shape[0])
+    for k in range(close.shape[0]):
+        d = close[k] - previous[k]
+        gains[k] = max(d, 0.0) if d == d else np.nan
+        losses[k] = max(-d, 0.0) if d == d else np.nan
+        previous[k] = close[k]
+    return gains, losses
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _true_range_run(high, low, close):
+    n, m = high.shape
+    previous = np.full(m, np.nan)
+    out = np.empty((n, m))
+    for i in range(n):
+        out[i] = _true_range_push(previous, high[i], low[i], close[i])
+    return out
+
+
+@lazy_jit(nopython = True, nogil = True, cache = True)
+def _changes_run(close):
+    n, m = close.shape
+    previous = np.full(m, np.nan)
+    gains = np.empty((n, m))
+    losses = np.empty((n, m))
+    for i in range(n):
+        gains[i], losses[i] = _changes_push(previous, close[i])
+    return gains, losses
+
+
+def _rsi(gain, loss):
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return np.where(loss > 0, 100 - 100 / (1 + gain / loss), np.where(gain > 0, 100.0, np.nan))
+
+
+def true_range(high, low, close):
+    """max(high - low, |high - previous close|, |low - previous close|), high - low on the first bar"""
+    high, squeeze = _as_2d(high)
+    return _shape(_true_range_run(high, _as_2d(low)[0], _as_2d(close)[0]), squeeze)
+
+
+def atr(high, low, close, window = 14, min_periods = None):
+    """Wilder's average true range, true_range(...).ewm(alpha = 1 / window, adjust = False, min_periods = window).mean()"""
+    tr = _as_2d(true_range(high, low, close))[0]
+    state = _ewm_states(tr, 1 / window, False, False, 'mean')
+    return _shape(_ewm_moment(state, 'mean', window if min_periods is None else min_periods), np.ndim(high) == 1)
+
+
+def rsi(close, window = 14, min_periods = None):
+    """Wilder's relative strength index, from the ewm(alpha = 1 / window, adjust = False) of the gains and losses"""
+    close, squeeze = _as_2d(close)
+    gains, losses = _changes_run(close)
+    min_periods = window if min_periods is None else min_periods
+    gain = _ewm_moment(_ewm_states(gains, 1 / window, False, False, 'mean'), 'mean', min_periods)
+    loss = _ewm_moment(_ewm_states(losses, 1 / window, False, False, 'mean'), 'mean', min_periods)
+    return _shape(_rsi(gain, loss), squeeze)
+
+
+# single step forms
+
+class RollingKernel():
+    """
+    Single step form of the rolling kernels: holds the last window values of n series and their moments, and is
+    pushed one value per series at a time. After a push, every attribute is the value the full series form
+    returns for that row. min and max are kept in monotonic queues and rank in a sorted window (from the first
+    time it is read), so no statistic rescans the window on a push.
+
+    ...
+
+    Parameters
+    ----------
+    window : Integer
+        window length
+    n : Integer, optional (default : 1)
+        number of series
+    min_periods : Integer, optional (default : window)
+        values needed in the window for a result
+    ddof : Integer, optional (default : 1)
+        delta degrees of freedom of var and std
+
+    Attributes
+    ----------
+    count : np.Array
+        values in the window of every series
+    sum, mean, var, std, min, max, rank, slope : np.Array
+        the rolling statistic of every series, see rolling_sum, ..., rolling_slope
+
+    Methods
+    -------
+    push(x : float, np.Array)
+        adds the next value of every series
+    bollinger(k : float)
+        returns the (middle, upper, lower) bands
+    """
+
+    def __init__(self, window, n = 1, min_periods = None, ddof = 1):
+        self.window = int(window)
+        self.n = n
+        self.min_periods = window if min_periods is None else min_periods
+        self.ddof = ddof
+        self._times = np.full((self.window, n), np.nan)
+        self._values = np.full((self.window, n), np.nan)
+        self._stats = np.zeros((6, n))
+        self._pushed = np.zeros(1, dtype = np.int64)
+        self._last = np.full(n, np.nan)
+        self._queues = [np.empty((self.window, n), dtype = np.int64) for _ in range(2)]
+        self._ends = [np.zeros((2, n), dtype = np.int64) for _ in range(2)]
+        self._ordered = None
+        self._ordered_counts = None
+
+    def push(self, x):
+        x = _row(x, self.n)
+        i = int(self._pushed[0])
+        if self._ordered is not None:
+            _sorted_push(self._ordered, self._ordered_counts, self._values[i % self.window], x)
+        _comoments_push(self._times, self._values, self._stats, self._pushed, np.full(self.n, float(i)), x)
+        for is_max in range(2):
+            _extrema_push(self._values, self._queues[is_max], self._ends[is_max], i, is_max == 1)
+        self._last = x
+        return self
+
+    @property
+    def count(self):
+        return self._stats[_C].copy()
+
+    @property
+    def sum(self):
+        return _moment(self._stats, 'sum', self.min_periods)
+
+    @property
+    def mean(self):
+        return _moment(self._stats, 'mean', self.min_periods)
+
+    @property
+    def var(self):
+        return _moment(self._stats, 'var', self.min_periods, self.ddof)
+
+    @property
+    def std(self):
+        return _moment(self._stats, 'std', self.min_periods, self.ddof)
+
+    @property
+    def slope(self):
+        return _moment(self._stats, 'slope', self.min_periods)
+
+    @property
+    def min(self):
+        return _extrema_value(self._values, self._queues[0], self._ends[0], self._stats[_C], max(self.min_periods, 1))
+
+    @property
+    def max(self):
+        return _extrema_value(self._values, self._queues[1], self._ends[1], self._stats[_C], max(self.min_periods, 1))
+
+    @property
+    def rank(self):
+        if self._ordered is None:
+            # the sorted windows are only kept once rank is asked for
+            self._ordered = np.ascontiguousarray(np.sort(self._values.T, axis = 1))
+            self._ordered_counts = (self._values == self._values).sum(axis = 0).astype(np.float64)
+        return _sorted_rank(self._ordered, self._ordered_counts, self._last, max(self.min_periods, 1))
+
+    def bollinger(self, k = 2):
+        mean, std = self.mean, self.std
+        return mean, mean + k * std, mean - k * std
+
+
+class RollingPairKernel():
+    """
+    Single step form of rolling_cov and rolling_corr for n pairs of series
+
+    ...
+
+    Parameters
+    ----------
+    window : Integer
+        window length
+    n : Integer, optional (default : 1)
+        number of pairs
+    min_periods : Integer, optional (default : window)
+        pairs needed in the window for a result
+    ddof : Integer, optional (default : 1)
+        delta degrees of freedom of cov
+
+    Attributes
+    ----------
+    cov, corr : np.Array
+        the rolling covariance and correlation of every pair
+
+    Methods
+    -------
+    push(x : float, np.Array, y : float, np.Array)
+        adds the next value of every pair
+    """
+
+    def __init__(self, window, n = 1, min_periods = None, ddof = 1):
+        self.window = int(window)
+        self.n = n
+        self.min_periods = window if min_periods is None else min_periods
+        self.ddof = ddof
+        self._x = np.full((self.window, n), np.nan)
+        self._y = np.full((self.window, n), np.nan)
+        self._stats = np.zeros((6, n))
+        self._pushed = np.zeros(1, dtype = np.int64)
+
+    def push(self, x, y):
+        _comoments_push(self._x, self._y, self._stats, self._pushed, _row(x, self.n), _row(y, self.n))
+        return self
+
+    @property
+    def cov(self):
+        return _moment(self._stats, 'cov', self.min_periods, self.ddof)
+
+    @property
+    def corr(self):
+        return _moment(self._stats, 'corr', self.min_periods)
+
+
+class EWMKernel():
+    """
+    Single step form of ewma, ewm_var and ewm_std for n series
+
+    ...
+
+    Parameters
+    ----------
+    n : Integer, optional (default : 1)
+        number of series
+    com, span, halflife, alpha : float, optional
+        exactly one of them, see ewm_alpha
+    adjust : Boolean, optional (default : True)
+        see pandas ewm
+    ignore_na : Boolean, optional (default : False)
+        see pandas ewm
+    min_periods : Integer, optional (default : 0)
+        observations needed for a result
+    bias : Boolean, optional (default : False)
+        biased var and std
+
+    Attributes
+    ----------
+    mean, var, std : np.Array
+        the exponentially weighted statistic of every series
+
+    Methods
+    -------
+    push(x : float, np.Array)
+        adds the next value of every series
+    """
+
+    def __init__(self, n = 1, com = None, span = None, halflife = None, alpha = None, adjust = True, ignore_na = False, min_periods = 0, bias = False):
+        self.n = n
+        self.alpha = ewm_alpha(com, span, halflife, alpha)
+        self.adjust = adjust
+        self.ignore_na = ignore_na
+        self.min_periods = min_periods
+        self.bias = bias
+        self._state = np.zeros((7, n))
+
+    def push(self, x):
+        x = _row(x, self.n)
+        _ewm_push(self._state, x, x, self.alpha, self.adjust, self.ignore_na)
+        return self
+
+    @property
+    def mean(self):
+        return _ewm_moment(self._state, 'mean', self.min_periods)
+
+    @property
+    def var(self):
+        return _ewm_moment(self._state, 'var', self.min_periods, self.bias)
+
+    @property
+    def std(self):
+        return _ewm_moment(self._state, 'std', self.min_periods, self.bias)
+
+
+class ATRKernel():
+    """
+    Single step form of true_range and atr for n series
+
+    ...
+
+    Parameters
+    ----------
+    window : Integer, optional (default : 14)
+        see atr
+    n : Integer, optional (default : 1)
+        number of series
+    min_periods : Integer, optional (default : window)
+        see atr
+
+    Attributes
+    ----------
+    true_range, atr : np.Array
+        the true range of the last bar and the average true range of every series
+
+    Methods
+    -------
+    push(high : float, np.Array, low : float, np.Array, close : float, np.Array)
+        adds the next bar of every series
+    """
+
+    def __init__(self, window = 14, n = 1, min_periods = None):
+        self.n = n
+        self.min_periods = window if min_periods is None else min_periods
+        self._ewm = EWMKernel(n, alpha = 1 / window, adjust = False, min_periods = self.min_periods)
+        self._previous = np.full(n, np.nan)
+        self.true_range = np.full(n, np.nan)
+
+    def push(self, high, low, close):
+        self.true_range = _true_range_push(self._previous, _row(high, self.n), _row(low, self.n), _row(close, self.n))
+        self._ewm.push(self.true_range)
+        return self
+
+    @property
+    def atr(self):
+        return self._ewm.mean
+
+
+class RSIKernel():
+    """
+    Single step form of rsi for n series
+
+    ...
+
+    Parameters
+    ----------
+    window : Integer, optional (default : 14)
+        see rsi
+    n : Integer, optional (default : 1)
+        number of series
+    min_periods : Integer, optional (default : window)
+        see rsi
+
+    Attributes
+    ----------
+    rsi : np.Array
+        the relative strength index of every series
+
+    Methods
+    -------
+    push(close : float, np.Array)
+        adds the next close of every series
+    """
+
+    def __init__(self, window = 14, n = 1, min_periods = None):
+        self.n = n
+        self.min_periods = window if min_periods is None else min_periods
+        self._gains = EWMKernel(n, alpha = 1 / window, adjust = False, min_periods = self.min_periods)
+        self._losses = EWMKernel(n, alpha = 1 / window, adjust = False, min_periods = self.min_periods)
+        self._previous = np.full(n, np.nan)
+
+    def push(self, close):
+        gains, losses = _changes_push(self._previous, _row(close, self.n))
+        self._gains.push(gains)
+        self._losses.push(losses)
+        return self
+
+    @property
+    def rsi(self):
+        return _rsi(self._gains.mean, self._losses.mean)
+
+
+@register_warmup
+def _warmup():
+    x = np.arange(1.0, 13.0).reshape(6, 2)
+    for f in [rolling_mean, rolling_var, rolling_slope, rolling_min, rolling_max, rolling_rank]:
+        f(x, 3)
+    rolling_corr(x, x[::-1], 3)
+    cross_rank(x)
+    ewm_std(x, span = 3)
+    atr(x + 1, x - 1, x, 3)
+    rsi(x, 3)
+    rolling = RollingKernel(3, 2).push(x[0])
+    [rolling.std, rolling.slope, rolling.min, rolling.max, rolling.rank]
+    RollingPairKernel(3, 2).push(x[0], x[1]).corr
+    EWMKernel(2, span = 3).push(x[0]).std
+    ATRKernel(3, 2).push(x[0] + 1, x[0] - 1, x[0]).atr
+    RSIKernel(3, 2).push(x[0]).rsi
@@ -1,25 +1,77 @@
-from tradester.utils import get_max, get_min, get_std, get_mean
+from tradester.utils import get_max, get_min, get_std, get_mean, rolling_mean_std, rolling_min_max
+from tradester.utils.rolling import RollingMoments, RollingExtrema
 import numpy as np
 
 
 class Normalizer():
+    """
+    Base class for normalizers. normalize(x) works on the full history x of an indicator. A stateful normalizer
+    also keeps rolling state so update(x) normalizes one new value in O(1), and normalize_all(x) fills a whole
+    history in one vectorized pass (and leaves the state ready to continue with update).
+
+    ...
+
+    Parameters
+    ----------
+    roll_period : Integer, None
+        trailing window to normalize over, if None the full history
+    min_period : Integer, None
+        number of values needed before normalizing
+
+    Attributes
+    ----------
+    stateful : Boolean
+        True if the normalizer implements update, normalize_all and spawn
+    value : float
+        last value returned by update
+
+    Methods
+    -------
+    normalize(x : np.Array)
+        returns the normalized last value of x
+    update(x : float)
+        pushes x onto the rolling state and returns its normalized value, a nan or None x returns the last value
+    normalize_all(x : np.Array)
+        returns the array of update() results for every value of x
+    spawn()
+        returns a new normalizer with the same parameters and empty state
+    """
+    stateful = False
 
     def __init__(self, roll_period, min_period):
         self.roll_period = roll_period
         self.min_period = min_period
 
+    def spawn(self):
+        return self.__class__(roll_period = self.roll_period, min_period = self.min_period)
+
+    def reset(self):
+        raise NotImplementedError("A stateful normalizer must implement reset()")
+
+    def update(self, x):
+        raise NotImplementedError("A stateful normalizer must implement update(x)")
+
+    def normalize_all(self, x):
+        raise NotImplementedError("A stateful normalizer must implement normalize_all(x)")
+
 
 class MeanStdNormalizer(Normalizer):
-    
+    stateful = True
+
     def __init__(self, roll_period = None, min_period = None):
         super().__init__(roll_period, min_period)
+        self.reset()
+
+    def reset(self):
+        self.value = 0
+        self._moments = RollingMoments(self.roll_period)
 
     def normalize(self, x):
+        p = len(x)
 
         if self.min_period is not None:
             if len(x) < self.min_period:
                 return 0
-            p = len(x)
 
         if self.roll_period is not None:
             p = self.roll_period
@@ -36,25 +88,89 @@ class MeanStdNormalizer(Normalizer):
 
         return (x[-1] - mu) / std
 
+    def update(self, x):
+        if x is None or x != x:
+            return self.value
+        m = self._moments
+        m.push(x)
+
+        if self.min_period is not None and m.count < self.min_period:
+            self.value = 0
+        elif np.isclose(m.sum, 0) or np.isclose(m.std, 0):
+            self.value = 0
+        else:
+            self.value = (x - m.mean) / m.std
+        return self.value
+
+    def normalize_all(self, x):
+        x = np.ascontiguousarray(x, dtype = np.float64)
+        sums, means, stds = rolling_mean_std(x, 0 if self.roll_period is None else self.roll_period)
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            out = (x - means) / stds
+        out[np.isclose(sums, 0) | np.isclose(stds, 0)] = 0
+        if self.min_period is not None:
+            out[:self.min_period - 1] = 0
+
+        self._moments.load(x)
+        self.value = out[-1] if len(out) > 0 else 0
+        return out
+
+
 class RankNormalizer(Normalizer):
+    stateful = True
 
     def __init__(self, roll_period = None, min_period = None):
         super().__init__(roll_period, min_period)
+        self.reset()
+
+    def reset(self):
+        self.value = 0.5
+        self._extrema = RollingExtrema(self.roll_period)
 
     def normalize(self, x):
+        p = len(x)
+
         if self.min_period is not None:
             if len(x) < self.min_period:
                 return 0.5
-            p = len(x)
 
         if self.roll_period is not None:
             p = self.roll_period
             x = x[-p:]
-            
+
         mx = get_max(x, p)
         mn = get_min(x, p)
 
         if np.isclose(mx-mn,0):
             return 0.5
-        
-        return (x - mn) / (mx - mn)
+
+        return (x[-1] - mn) / (mx - mn)
+
+    def update(self, x):
+        if x is None or x != x:
+            return self.value
+        e = self._extrema
+        e.push(x)
+
+        if self.min_period is not None and e.count < self.min_period:
+            self.value = 0.5
+        elif np.isclose(e.max - e.min, 0):
+            self.value = 0.5
+        else:
+            self.value = (x - e.min) / (e.max - e.min)
+        return self.value
+
+    def normalize_all(self, x):
+        x = np.ascontiguousarray(x, dtype = np.float64)
+        mins, maxs = rolling_min_max(x, 0 if self.roll_period is None else self.roll_period)
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            out = (x - mins) / (maxs - mins)
+        out[np.isclose(maxs - mins, 0)] = 0.5
+        if self.min_period is not None:
+            out[:self.min_period - 1] = 0.5
+
+        self._extrema.load(x)
+        self.value = out[-1] if len(out) > 0 else 0.5
+        return out
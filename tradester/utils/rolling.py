@@ -0,0 +1,242 @@
+from collections import deque
+
+import numpy as np
+
+
+class RollingMoments():
+    """
+    Running count, sum, mean and variance over the last period values (or every value if period is None), updated
+    in O(1) per push with Welford's algorithm. The window is kept in a ring buffer and the moments are recomputed
+    exactly from it once every period pushes so rounding error cannot build up.
+
+    ...
+
+    Parameters
+    ----------
+    period : Integer, None
+        window length, if None the moments are expanding
+
+    Attributes
+    ----------
+    count : Integer
+        number of values pushed
+    n : Integer
+        number of values in the window
+    sum : float
+        sum of the window
+    mean : float
+        mean of the window (np.mean)
+    var : float
+        population variance of the window (np.var)
+    std : float
+        population standard deviation of the window (np.std)
+    window : np.Array
+        the values in the window, oldest first
+
+    Methods
+    -------
+    push(x : float)
+        adds x to the window, evicting the oldest value if the window is full
+    load(values : np.Array)
+        resets the state to the one after pushing every value in values, in O(window)
+    reset()
+        clears the window
+    """
+
+    def __init__(self, period = None):
+        self.period = period
+        self.reset()
+
+    def load(self, values):
+        values = np.asarray(values, dtype = np.float64)
+        self.reset()
+        if self.period is None:
+            self.count = self.n = len(values)
+            if self.n > 0:
+                self._mean = values.mean()
+                self._m2 = ((values - self._mean) ** 2).sum()
+            return
+        tail = values[max(len(values) - self.period, 0):]
+        for x in tail:
+            self.push(x)
+        self.count = len(values)
+
+    def reset(self):
+        self.count = 0
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._head = 0
+        self._buffer = np.empty(self.period) if self.period is not None else None
+
+    @property
+    def sum(self):
+        return self._mean * self.n
+
+    @property
+    def mean(self):
+        return self._mean if self.n > 0 else np.nan
+
+    @property
+    def var(self):
+        return max(self._m2, 0.0) / self.n if self.n > 0 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    @property
+    def window(self):
+        if self.period is None:
+            raise ValueError('An expanding RollingMoments does not keep its window')
+        if self.n < self.period:
+            return self._buffer[:self.n]
+        return np.concatenate([self._buffer[self._head:], self._buffer[:self._head]])
+
+    def push(self, x):
+        x = float(x)
+        self.count += 1
+        if self.period is None or self.n < self.period:
+            self.n += 1
+            delta = x - self._mean
+            self._mean += delta / self.n
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self._buffer[self._head]
+            mean = self._mean + (x - old) / self.n
+            self._m2 += (x - old) * (x - mean + old - self._mean)
+            self._mean = mean
+
+        if self.period is not None:
+            self._buffer[self._head] = x
+            self._head = self._head + 1 if self._head + 1 < self.period else 0
+            if self._head == 0 and self.n == self.period:
+                self._mean = self._buffer.mean()
+                self._m2 = ((self._buffer - self._mean) ** 2).sum()
+
+
+class RollingExtrema():
+    """
+    Running minimum and maximum over the last period values (or every value if period is None), kept with two
+    monotonic deques so each push is amortized O(1).
+
+    ...
+
+    Parameters
+    ----------
+    period : Integer, None
+        window length, if None the extrema are expanding
+
+    Attributes
+    ----------
+    count : Integer
+        number of values pushed
+    min : float
+        minimum of the window, nan if empty
+    max : float
+        maximum of the window, nan if empty
+
+    Methods
+    -------
+    push(x : float)
+        adds x to the window, evicting the oldest value if the window is full
+    load(values : np.Array)
+        resets the state to the one after pushing every value in values, in O(window)
+    reset()
+        clears the window
+    """
+
+    def __init__(self, period = None):
+        self.period = period
+        self.reset()
+
+    def load(self, values):
+        values = np.asarray(values, dtype = np.float64)
+        self.reset()
+        if self.period is None:
+            if len(values) > 0:
+                self._min.append((0, values.min()))
+                self._max.append((0, values.max()))
+            self.count = len(values)
+            return
+        start = max(len(values) - self.period, 0)
+        self.count = start
+        for x in values[start:]:
+            self.push(x)
+
+    def reset(self):
+        self.count = 0
+        self._min = deque()
+        self._max = deque()
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else np.nan
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else np.nan
+
+    def push(self, x):
+        x = float(x)
+        i = self.count
+        self.count += 1
+
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((i, x))
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((i, x))
+
+        if self.period is not None:
+            expired = i - self.period
+            if self._min[0][0] <= expired:
+                self._min.popleft()
+            if self._max[0][0] <= expired:
+                self._max.popleft()
+
+
+class ExponentialAverage():
+    """
+    Running exponential moving average with alpha = 2 / (period + 1), seeded with the first value. Produces the
+    last value of tradester.utils.vectorized_ema over the same data.
+
+    ...
+
+    Parameters
+    ----------
+    period : Integer
+        span of the average
+
+    Attributes
+    ----------
+    count : Integer
+        number of values pushed
+    value : float
+        current average, nan if empty
+
+    Methods
+    -------
+    push(x : float)
+        updates the average with x
+    reset()
+        clears the average
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.value = np.nan
+
+    def push(self, x):
+        x = float(x)
+        if self.count == 0:
+            self.value = x
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        self.count += 1
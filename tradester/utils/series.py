@@ -1,15 +1,16 @@
-from numba import jit, vectorize, float32, int32
+from .compilation import lazy_jit, register_warmup
+from .kernels import rolling_moments, rolling_min, rolling_max
 import numpy as np
 
 
 def chunk_up(l , n):
    for i in range(0, len(l), n):
         yield l[i:i+n] 
-@jit(nopython = True, nogil = True)
+@lazy_jit(nopython = True, nogil = True, cache = True)
 def cum_sum(x):
     return np.cumsum(x)
 
-@jit(nopython = True, nogil = True)
+@lazy_jit(nopython = True, nogil = True, cache = True)
 def vectorized_ema(data, window):
     alpha = 2/(window+1)
     alpha_rev = 1-alpha
@@ -26,23 +27,43 @@ def vectorized_ema(data, window):
 
     return out
 
-@jit(nopython = True, nogil = True)
+@lazy_jit(nopython = True, nogil = True, cache = True)
 def get_sum(s, p):
     return s[-p:].sum()
 
-@jit(nopython = True, nogil = True)
+@lazy_jit(nopython = True, nogil = True, cache = True)
 def get_mean(s, p):
     return s[-p:].mean()
 
-@jit(nopython = True, nogil = True)
+@lazy_jit(nopython = True, nogil = True, cache = True)
 def get_std(s, p):
     return s[-p:].std()
 
-@jit(nopython = True, nogil = True)
+@lazy_jit(nopython = True, nogil = True, cache = True)
 def get_min(s, p):
     return s[-p:].min()
 
-@jit(nopython = True, nogil = True)
+@lazy_jit(nopython = True, nogil = True, cache = True)
 def get_max(s, p):
     return s[-p:].max()
 
+def rolling_mean_std(s, p):
+    """rolling sum, mean and population std of s over the last p values (expanding if p <= 0), same as RollingMoments"""
+    s = np.asarray(s, dtype = np.float64)
+    window = p if p > 0 else max(len(s), 1)
+    return rolling_moments(s, window, ['sum', 'mean', 'std'], min_periods = 1, ddof = 0)
+
+def rolling_min_max(s, p):
+    """rolling min and max of s over the last p values (expanding if p <= 0), see tradester.utils.kernels"""
+    s = np.asarray(s, dtype = np.float64)
+    window = p if p > 0 else max(len(s), 1)
+    return rolling_min(s, window, 1), rolling_max(s, window, 1)
+
+
+@register_warmup
+def _warmup():
+    s = np.arange(1.0, 9.0)
+    cum_sum(s)
+    vectorized_ema(s, 3)
+    for f in [get_sum, get_mean, get_std, get_min, get_max, rolling_mean_std, rolling_min_max]:
+        f(s, 3)
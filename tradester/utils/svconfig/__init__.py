@@ -1,3 +1,3 @@
-from .connector import connector
+from .connector import connector, set_pool_settings, dispose_engines
 from .create_credentials import create_credentials
 from .set_default import set_default
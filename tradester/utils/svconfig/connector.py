@@ -1,67 +1,189 @@
 import os
 import json
-import sqlalchemy
+import threading
 
-try: 
-    import mysql.connector as mysql
-except:
-    pass
+from contextlib import contextmanager
+from urllib.parse import quote_plus
 
-try:
-    import psycopg2
-except: 
-    pass
 
-try:
-    import pyodbc
-except:
-    pass
+DIALECTS = {
+    'postgres': 'postgresql+psycopg2',
+}
+
+POOL_SETTINGS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_recycle': 3600,
+    'pool_pre_ping': True,
+}
+
+_credentials = {}
+_engines = {}
+_arrow = {}
+# guards the creation of engines and the idle ADBC pools, PrefetchPipeline connects from several threads
+_lock = threading.Lock()
+
+
+def _path(name):
+    return os.path.expanduser('~').replace('\\', '/') + '/' + name + '.json'
+
+
+def _load(name):
+    """returns the json file ~/name.json, cached until the file changes on disk"""
+    path = _path(name)
+    mtime = os.stat(path).st_mtime
+    cached = _credentials.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'r') as f:
+            cached = (mtime, json.load(f))
+        _credentials[path] = cached
+    return cached[1]
+
+
+def set_pool_settings(**settings):
+    """
+    updates the keyword arguments (pool_size, max_overflow, pool_recycle, pool_pre_ping, ...) passed to
+    sqlalchemy.create_engine, engines that already exist are disposed so the next call rebuilds them
+    """
+    POOL_SETTINGS.update(settings)
+    dispose_engines()
+
+
+def dispose_engines(close = True):
+    """
+    disposes every pooled engine and ADBC connection of this process, close = False only drops the pools (e.g.
+    after a fork)
+    """
+    with _lock:
+        for engine in list(_engines.values()):
+            engine.dispose(close = close)
+        _engines.clear()
+        for idle in list(_arrow.values()):
+            while close and len(idle) > 0:
+                idle.pop().close()
+        _arrow.clear()
+
+
+def _after_fork():
+    # the lock may have been held by another thread of the parent, the child starts with a fresh one
+    global _lock
+    _lock = threading.Lock()
+    dispose_engines(close = False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child = _after_fork)
 
 
 class connector():
     """
-    Serves as point of reference for connection to internal database, currently supports mysql and postgres
+    Serves as point of reference for connection to internal database, currently supports mysql and postgres.
+    Credentials are read from disk once per process (and again only if the file changes), and every credential
+    set shares one pooled sqlalchemy engine per process, so constructing connectors and opening connections is
+    cheap. Child processes (e.g. a multiprocessing.Pool) build their own engines after a fork.
     
     ...
     Parameters
     ----------
     cred_name : string, optional
         name of credentials to connect from, if None uses 'default' (see: set_default())
+
+    Methods
+    -------
+    cnx()
+        returns a pooled DBAPI connection, close() returns it to the pool
+    connect()
+        context manager yielding cnx() and returning it to the pool on exit
+    engine()
+        returns the pooled sqlalchemy engine of the credentials
+    arrow()
+        context manager yielding a pooled ADBC (Arrow) connection, postgres only
+
+    See Also
+    --------
+    set_pool_settings(**settings)
     """
     def __init__(self, cred_name = None):
         if cred_name is None:
-            with open(os.path.expanduser('~').replace('\\', '/') + '/default.json') as df:
-                cred_name = json.load(df)['default']
-        with open(os.path.expanduser('~').replace('\\','/') + '/' + cred_name + '.json', 'r') as f:
-            self.credentials = json.load(f)
+            cred_name = _load('default')['default']
+        self.credentials = _load(cred_name)
         self.user = self.credentials['user']
         self.password = self.credentials['password']
         self.host = self.credentials['host']
         self.port = self.credentials['port']
         self.db = self.credentials['database']
         self.s_type = self.credentials['s_type']
+        self._key = json.dumps(self.credentials, sort_keys = True)
 
     def get_credentials(self):
         return self.credentials
 
     def cnx(self):
         """
-        returns connection relative to type of server type, either a mysql.connector or psycopg2
+        returns a pooled DBAPI connection relative to type of server type, either a mysql.connector, psycopg2 or
+        pyodbc connection
         """
-        if self.credentials['s_type'] == 'postgres':
-            return psycopg2.connect(**{x:v for x, v in self.credentials.items() if x != 's_type'})
-        elif self.credentials['s_type'] == 'mysql':
-            return mysql.connect(**{x:v for x, v in self.credentials.items() if x != 's_type'})
-        elif self.credentials['s_type'] == 'mssql+pyodbc':
-            return pyodbc.connect(f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={self.credentials['host']};DATABASE={self.credentials['database']};UID={self.credentials['user']};PWD={self.credentials['password']}")
+        return self.engine().raw_connection()
 
-    def engine(self):
+    @contextmanager
+    def connect(self):
         """
-        return sqlalchemy engine object using the connection parameters 
+        yields a pooled DBAPI connection and returns it to the pool when the block exits
         """
-        if self.credentials['s_type'] == 'mssql+pyodbc':
-            import urllib
-            params = urllib.parse.quote_plus(f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={self.credentials['host']};DATABASE={self.credentials['database']};UID={self.credentials['user']};PWD={self.credentials['password']}")
-            return sqlalchemy.create_engine("mssql+pyodbc:///?odbc_connect=%s" % params)
+        cnx = self.cnx()
+        try:
+            yield cnx
+        finally:
+            cnx.close()
+
+    def __url(self, arrow = False):
+        if self.s_type == 'mssql+pyodbc':
+            params = quote_plus(f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={self.host};DATABASE={self.db};UID={self.user};PWD={self.password}")
+            return "mssql+pyodbc:///?odbc_connect=%s" % params
+        elif self.s_type == 'mysql':
+            return f"mysql+mysqlconnector://{quote_plus(self.user)}:{quote_plus(self.password)}@{self.host}:{self.port}/{self.db}"
+        elif arrow:
+            return f"postgresql://{quote_plus(self.user)}:{quote_plus(self.password)}@{self.host}:{self.port}/{self.db}"
         else:
-            return sqlalchemy.create_engine(f"{self.s_type}://{self.user}:{self.password}@{self.host}:{self.port}/{self.db}")
+            return f"{DIALECTS.get(self.s_type, self.s_type)}://{quote_plus(self.user)}:{quote_plus(self.password)}@{self.host}:{self.port}/{self.db}"
+
+    def engine(self):
+        """
+        return the pooled sqlalchemy engine object using the connection parameters, one per credential set and process
+        """
+        engine = _engines.get(self._key)
+        if engine is None:
+            with _lock:
+                engine = _engines.get(self._key)
+                if engine is None:
+                    # sqlalchemy and the driver of the dialect are only imported once an engine is needed
+                    import sqlalchemy
+                    engine = sqlalchemy.create_engine(self.__url(), **POOL_SETTINGS)
+                    _engines[self._key] = engine
+        return engine
+
+    @contextmanager
+    def arrow(self):
+        """
+        yields a pooled adbc_driver_postgresql connection and returns it to the pool when the block exits, at most
+        pool_size idle connections are kept per credential set and process, a connection whose block raised is
+        closed
+        """
+        with _lock:
+            idle = _arrow.setdefault(self._key, [])
+        try:
+            cnx = idle.pop()
+        except IndexError:
+            import adbc_driver_postgresql.dbapi as adbc
+            cnx = adbc.connect(self.__url(arrow = True))
+        try:
+            yield cnx
+        except:
+            cnx.close()
+            raise
+        with _lock:
+            keep = len(idle) < POOL_SETTINGS.get('pool_size', 5)
+            if keep:
+                idle.append(cnx)
+        if not keep:
+            cnx.close()